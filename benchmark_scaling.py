@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark de escala dos motores de geração e resolução de puzzles.
+
+Para cada tamanho (itens x atributos) mede tempo médio e pico de memória
+(tracemalloc) de:
+  - geracao:      generate_unique_puzzle (pistas preguiçosas + propagação + minimização);
+  - propagacao:   resolver o puzzle gerado com o motor de propagação;
+  - backtracking: resolver o mesmo puzzle com o solucionador original;
+  - candidatas:   materializar todas as pistas com generate_candidate_clues.
+
+O backtracking materializa o produto cartesiano dos valores de cada item; quando
+esse produto passa de --max-product o tamanho é marcado como inviável em vez de
+esgotar a memória da máquina.
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from puzzle_factory import VOCABULARY_BANK, sample_domain, sample_solution
+from zebra_dataset_gen import (generate_unique_puzzle, generate_candidate_clues,
+                               solve_puzzle_backtracking)
+from zebra_propagation import build_state
+
+DEFAULT_SIZES = ["3x3", "4x4", "5x5", "6x6", "8x6", "8x8", "10x6", "10x8"]
+
+
+def parse_size(text):
+    dimension, n_attributes = text.lower().split("x")
+    return int(dimension), int(n_attributes)
+
+
+def measure(func, *args, **kwargs):
+    """Executa func uma vez e retorna (resultado, segundos, pico de memória em bytes)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def benchmark_size(dimension, n_attributes, repeats, rng, timeout, max_product):
+    """Mede os motores para um tamanho; retorna {motor: {"time", "memory", "runs", "status"}}."""
+    bank = list(VOCABULARY_BANK.items())
+    results = {name: {"time": 0.0, "memory": 0, "runs": 0, "status": "ok"}
+               for name in ("geracao", "propagacao", "backtracking", "candidatas")}
+
+    def record(name, elapsed, peak):
+        entry = results[name]
+        entry["time"] += elapsed
+        entry["memory"] = max(entry["memory"], peak)
+        entry["runs"] += 1
+
+    backtracking_viable = dimension ** n_attributes <= max_product
+    if not backtracking_viable:
+        results["backtracking"]["status"] = "inviável"
+
+    for _ in range(repeats):
+        domain = sample_domain(bank, dimension, n_attributes, rng)
+        if domain is None:
+            raise ValueError(f"O banco de vocabulário não comporta {dimension}x{n_attributes}.")
+        solution = sample_solution(domain, dimension, rng)
+        clue_counts = {"easy": dimension, "medium": dimension, "hard": dimension}
+
+        puzzle, elapsed, peak = measure(generate_unique_puzzle, solution, domain, clue_counts, rng)
+        record("geracao", elapsed, peak)
+        if puzzle is None:
+            continue
+        constraints = puzzle["constraints"]
+
+        def solve_propagation():
+            return build_state(domain, constraints, dimension=dimension).solve()
+        _, elapsed, peak = measure(solve_propagation)
+        record("propagacao", elapsed, peak)
+
+        if backtracking_viable and results["backtracking"]["status"] == "ok":
+            (found, _), elapsed, peak = measure(solve_puzzle_backtracking, domain, constraints, {},
+                                                dimension, timeout)
+            record("backtracking", elapsed, peak)
+            if found is None:
+                results["backtracking"]["status"] = "timeout"
+
+        _, elapsed, peak = measure(generate_candidate_clues, solution, domain)
+        record("candidatas", elapsed, peak)
+
+    for entry in results.values():
+        if entry["runs"]:
+            entry["time"] /= entry["runs"]
+    return results
+
+
+def print_table(rows):
+    print(f"{'tamanho':>8} {'motor':>13} {'tempo médio':>12} {'pico memória':>13}  status")
+    for size, results in rows:
+        for name, entry in results.items():
+            if entry["runs"]:
+                time_text = f"{entry['time'] * 1000:.1f} ms"
+                memory_text = f"{entry['memory'] / 1024:.0f} KiB"
+            else:
+                time_text = memory_text = "-"
+            print(f"{size:>8} {name:>13} {time_text:>12} {memory_text:>13}  {entry['status']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de escala por dimensão (tempo e memória por motor).")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES,
+                        help="Tamanhos no formato ITENSxATRIBUTOS (ex.: 8x6)")
+    parser.add_argument("--repeats", type=int, default=3, help="Puzzles medidos por tamanho")
+    parser.add_argument("--seed", type=int, default=0, help="Semente dos puzzles")
+    parser.add_argument("--timeout", type=float, default=10, help="Tempo limite do backtracking (s)")
+    parser.add_argument("--max-product", type=int, default=10 ** 5,
+                        help="Maior produto cartesiano por item tentado pelo backtracking")
+    parser.add_argument("--json", type=str, default=None, help="Arquivo para salvar os resultados em JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rows = []
+    for size in args.sizes:
+        dimension, n_attributes = parse_size(size)
+        rows.append((size, benchmark_size(dimension, n_attributes, args.repeats, rng,
+                                          args.timeout, args.max_product)))
+        print(f"{size} concluído.")
+    print_table(rows)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(dict(rows), f, indent=2, ensure_ascii=False)
+        print(f"Resultados salvos em '{args.json}'.")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,34 +1,528 @@
 import requests
+from requests.adapters import HTTPAdapter
+import asyncio
+import contextlib
 import json
-import traceback
+import os
+import random
+import threading
+import time
 
-OLLAMA_API_URL = "http://localhost:11434/api/generate"
+import llm_cache
+import llm_telemetry
+
+try:
+    import aiohttp
+except ImportError:  # dependência opcional: sem ela o cliente assíncrono usa threads
+    aiohttp = None
+
+# OLLAMA_API_URL no ambiente aponta o cliente para outro servidor (ex.: mock_ollama.py);
+# OLLAMA_API_URLS (separados por vírgula) distribui as chamadas entre vários servidores
+OLLAMA_API_URL = os.environ.get("OLLAMA_API_URL", "http://localhost:11434/api/generate")
+OLLAMA_API_URLS = [u.strip() for u in os.environ.get("OLLAMA_API_URLS", "").split(",") if u.strip()]
+MODEL = "mistral-small:24b-instruct-2501-q4_K_M"
 DEBUG = True
 
-def call_llm(prompt, show_tokens=True, temperature=0.2):
+# Por quanto tempo o Ollama mantém o modelo carregado após cada chamada (o padrão
+# do servidor, 5 min, descarrega o modelo em pausas longas do pipeline, como a
+# geração local de puzzles). Com o modelo residente, o servidor também reaproveita
+# o cache de contexto (KV) do prefixo comum entre prompts consecutivos.
+KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+
+# Timeouts separados: CONNECT_TIMEOUT para abrir a conexão e READ_TIMEOUT para cada
+# leitura do stream (o intervalo máximo entre dois pedaços da resposta, não a geração
+# inteira, que em respostas longas passa facilmente de 30 s)
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 120
+
+# Novas tentativas para falhas transitórias (conexão, timeout, HTTP 5xx/429), com
+# espera exponencial e jitter: uniforme entre 0 e min(BACKOFF_MAX, BACKOFF_BASE * 2^n)
+MAX_RETRIES = 3
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+# Disjuntor: após CIRCUIT_FAILURE_THRESHOLD falhas transitórias seguidas as chamadas
+# falham na hora (LLMCircuitOpenError) por CIRCUIT_RESET_TIMEOUT segundos; depois
+# disso uma única chamada de teste decide se o circuito fecha ou abre de novo
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 30.0
+
+# Verificação de saúde dos servidores do pool (GET /api/version)
+HEALTH_CHECK_TIMEOUT = 2.0
+
+# Pool de conexões HTTP compartilhado por todas as chamadas (keep-alive).
+# POOL_CONNECTIONS: quantos hosts distintos mantêm um pool; POOL_MAXSIZE: conexões
+# simultâneas por host. Com POOL_BLOCK, chamadas além do limite esperam uma conexão livre.
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 16
+POOL_BLOCK = True
+
+_session = None
+_session_lock = threading.Lock()
+
+def configure_session(pool_connections=None, pool_maxsize=None, pool_block=None):
+    """
+    Ajusta os limites do pool e recria a sessão compartilhada na próxima chamada.
+    Valores None mantêm a configuração atual.
+    """
+    global POOL_CONNECTIONS, POOL_MAXSIZE, POOL_BLOCK
+    if pool_connections is not None:
+        POOL_CONNECTIONS = pool_connections
+    if pool_maxsize is not None:
+        POOL_MAXSIZE = pool_maxsize
+    if pool_block is not None:
+        POOL_BLOCK = pool_block
+    close_session()
+
+def get_session():
+    """Retorna a sessão HTTP do módulo, criando-a (com o pool configurado) no primeiro uso."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                                      pool_block=POOL_BLOCK)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+def close_session():
+    """Fecha as conexões abertas da sessão compartilhada."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+# ======================================================
+# ERROS
+# ======================================================
+
+class LLMError(Exception):
+    """Falha ao obter uma resposta da LLM. `retryable` indica se vale tentar de novo."""
+    retryable = True
+
+class LLMConnectionError(LLMError):
+    """Servidor inacessível ou conexão interrompida."""
+
+class LLMTimeoutError(LLMError):
+    """Conexão ou leitura do stream excedeu o timeout."""
+
+class LLMHTTPError(LLMError):
+    """A API respondeu com status diferente de 200."""
+
+    def __init__(self, status, body=""):
+        super().__init__(f"Erro na API: Código {status}")
+        self.status = status
+        self.body = body
+        self.retryable = status >= 500 or status in (408, 429)
+
+class LLMStreamError(LLMError):
+    """O Ollama reportou um erro no meio do stream."""
+
+class LLMValidationError(LLMError):
+    """A resposta se mostrou inválida durante o stream e a geração foi interrompida."""
+    retryable = False
+
+class LLMCircuitOpenError(LLMError):
+    """O disjuntor está aberto: o servidor falhou seguidamente e as chamadas são recusadas."""
+    retryable = False
+
+class CircuitBreaker:
+    """
+    Disjuntor de um servidor: fechado, aberto (recusa chamadas) e meio-aberto
+    (deixa passar uma chamada de teste após reset_timeout).
+    """
+
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT, name=""):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "fechado"
+        if self._trial or time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "meio-aberto"
+        return "aberto"
+
+    def allows(self):
+        """Se uma chamada seria aceita agora (sem ocupar a vaga de teste do meio-aberto)."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            return not self._trial and time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def before_call(self):
+        """Levanta LLMCircuitOpenError se a chamada não deve ser feita agora."""
+        with self._lock:
+            if self.opened_at is None:
+                return
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            if remaining > 0 or self._trial:
+                server = f"Servidor da LLM {self.name}" if self.name else "Servidor da LLM"
+                raise LLMCircuitOpenError(
+                    f"{server} indisponível após {self.failures} falhas seguidas "
+                    f"(nova tentativa em {max(remaining, 0):.0f}s).")
+            self._trial = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._trial = False
+
+    def release_trial(self):
+        """Libera a vaga de teste do meio-aberto sem registrar resultado (chamada abortada)."""
+        with self._lock:
+            self._trial = False
+
+    def reset(self):
+        self.record_success()
+
+# ======================================================
+# POOL DE SERVIDORES
+# ======================================================
+
+class Endpoint:
+    """Um servidor Ollama do pool: URL, requisições em andamento, saúde e disjuntor próprio."""
+
+    def __init__(self, url):
+        self.url = url
+        self.outstanding = 0
+        self.healthy = True
+        self.breaker = CircuitBreaker(name=url)
+        self.stats = {"requests": 0, "failures": 0}
+
+    @property
+    def base_url(self):
+        return self.url.split("/api/")[0]
+
+    def available(self):
+        return self.healthy and self.breaker.allows()
+
+    def __repr__(self):
+        return (f"Endpoint({self.url!r}, em andamento={self.outstanding}, "
+                f"saudável={self.healthy}, disjuntor={self.breaker.state})")
+
+class EndpointPool:
+    """
+    Distribui as chamadas entre vários servidores: cada requisição vai para o
+    servidor disponível com menos requisições em andamento (empates em rodízio).
+    Servidores com o disjuntor aberto ou reprovados na verificação de saúde ficam
+    de fora até se recuperarem; quando uma requisição falha, a próxima tentativa
+    vai para outro servidor.
+    """
+
+    def __init__(self, urls):
+        if not urls:
+            raise ValueError("O pool precisa de pelo menos um servidor.")
+        self.endpoints = [Endpoint(url) for url in urls]
+        self._next = 0
+        self._lock = threading.Lock()
+        self._health_thread = None
+        self._health_stop = threading.Event()
+
+    def acquire(self):
+        """Escolhe um servidor e conta a requisição como em andamento; levanta LLMCircuitOpenError se nenhum servir."""
+        with self._lock:
+            n = len(self.endpoints)
+            order = [self.endpoints[(self._next + k) % n] for k in range(n)]
+            self._next = (self._next + 1) % n
+            candidates = sorted((e for e in order if e.available()), key=lambda e: e.outstanding)
+            if not candidates:
+                if n == 1:
+                    # Um único servidor: a mensagem do próprio disjuntor diz quando tentar de novo
+                    self.endpoints[0].breaker.before_call()
+                raise LLMCircuitOpenError(f"Nenhum dos {n} servidores da LLM está disponível.")
+            endpoint = candidates[0]
+            endpoint.breaker.before_call()
+            endpoint.outstanding += 1
+            endpoint.stats["requests"] += 1
+            return endpoint
+
+    def release(self, endpoint):
+        with self._lock:
+            endpoint.outstanding -= 1
+
+    def has_alternative(self, endpoint):
+        """Se há outro servidor disponível além de `endpoint` (para trocar sem esperar)."""
+        return any(e is not endpoint and e.available() for e in self.endpoints)
+
+    def check_health(self, timeout=None):
+        """Consulta /api/version de cada servidor e atualiza a saúde; retorna {url: saudável}."""
+        timeout = HEALTH_CHECK_TIMEOUT if timeout is None else timeout
+        for endpoint in self.endpoints:
+            try:
+                with get_session().get(endpoint.base_url + "/api/version", timeout=timeout) as response:
+                    healthy = response.status_code == 200
+            except requests.exceptions.RequestException:
+                healthy = False
+            if healthy and (not endpoint.healthy or endpoint.breaker.state != "fechado"):
+                # Voltou a responder: libera o servidor sem esperar o disjuntor
+                endpoint.breaker.reset()
+            if endpoint.healthy != healthy:
+                print(f"Servidor da LLM {endpoint.url} {'voltou' if healthy else 'não responde à verificação de saúde'}.")
+            endpoint.healthy = healthy
+        return {e.url: e.healthy for e in self.endpoints}
+
+    def start_health_checks(self, interval=10.0):
+        """Verifica a saúde dos servidores a cada `interval` segundos numa thread em segundo plano."""
+        if self._health_thread is not None:
+            return
+        self._health_stop.clear()
+
+        def loop():
+            while not self._health_stop.wait(interval):
+                self.check_health()
+
+        self._health_thread = threading.Thread(target=loop, daemon=True)
+        self._health_thread.start()
+
+    def stop_health_checks(self):
+        self._health_stop.set()
+        self._health_thread = None
+
+    def summary(self):
+        return "\n".join(f"{e.url}: {e.stats['requests']} requisições, {e.stats['failures']} falhas, "
+                         f"{'saudável' if e.healthy else 'fora do ar'}, disjuntor {e.breaker.state}"
+                         for e in self.endpoints)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def configure_endpoints(urls, health_check_interval=None):
+    """
+    Define os servidores usados pelas chamadas (lista de URLs de /api/generate).
+    Com health_check_interval, verifica a saúde deles periodicamente.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.stop_health_checks()
+        _pool = EndpointPool(list(urls))
+    if health_check_interval:
+        _pool.check_health()
+        _pool.start_health_checks(health_check_interval)
+    return _pool
+
+def get_pool():
+    """Pool de servidores do módulo (OLLAMA_API_URLS, ou apenas OLLAMA_API_URL, no primeiro uso)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = EndpointPool(OLLAMA_API_URLS or [OLLAMA_API_URL])
+    return _pool
+
+def backoff_delay(attempt, base=None, cap=None):
+    """Espera antes da nova tentativa `attempt` (0, 1, ...): exponencial com jitter completo."""
+    base = BACKOFF_BASE if base is None else base
+    cap = BACKOFF_MAX if cap is None else cap
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+def _retry_or_raise(error, attempt, retries, endpoint):
+    """
+    Registra a falha no disjuntor do servidor e devolve a espera até a próxima
+    tentativa (ou relança). Se outro servidor do pool está disponível, a nova
+    tentativa vai para ele sem espera.
+    """
+    if not error.retryable:
+        # O servidor respondeu: não conta como indisponibilidade
+        endpoint.breaker.record_success()
+        raise error
+    endpoint.breaker.record_failure()
+    endpoint.stats["failures"] += 1
+    if attempt >= retries:
+        raise error
+    if get_pool().has_alternative(endpoint):
+        print(f"{error} Nova tentativa ({attempt + 2}/{retries + 1}) em outro servidor...")
+        return 0.0
+    delay = backoff_delay(attempt)
+    print(f"{error} Nova tentativa ({attempt + 2}/{retries + 1}) em {delay:.1f}s...")
+    return delay
+
+def _run_validator(validator, token):
+    """
+    Passa um pedaço do stream ao validador. Qualquer outra exceção levantada por
+    ele vira LLMValidationError, para que a chamada termine com um resultado
+    registrado no disjuntor.
+    """
+    try:
+        validator(token)
+    except LLMValidationError:
+        raise
+    except Exception as e:
+        raise LLMValidationError(f"Erro no validador da resposta: {e!r}") from e
+
+def _start_metrics(data, attempt, endpoint=None):
+    """Registro de telemetria de uma requisição (ver llm_telemetry)."""
+    return {"model": data["model"], "prompt_chars": len(data["prompt"]), "attempt": attempt,
+            "endpoint": endpoint.url if endpoint is not None else None, "cached": False,
+            "_start": time.perf_counter()}
+
+def _mark_token(metrics):
+    if "ttft_s" not in metrics:
+        metrics["ttft_s"] = time.perf_counter() - metrics["_start"]
+
+def _finish_metrics(metrics, error=None):
+    metrics["wall_s"] = time.perf_counter() - metrics.pop("_start")
+    metrics["ok"] = error is None
+    if error is not None:
+        metrics["error"] = type(error).__name__
+    llm_telemetry.get_telemetry().record(metrics)
+
+def _record_cache_hit(data):
+    llm_telemetry.get_telemetry().record({"model": data["model"], "prompt_chars": len(data["prompt"]),
+                                          "cached": True, "ok": True, "wall_s": 0.0})
+
+# ======================================================
+# CLIENTE SÍNCRONO
+# ======================================================
+
+def build_payload(prompt, temperature=0.2, seed=None, format=None, model=None):
+    """
+    Corpo da requisição /api/generate (em modo stream). `format` ativa a saída
+    estruturada do Ollama: "json" ou um JSON Schema (dict) que a resposta deve seguir.
+    `model` (padrão: MODEL) escolhe o modelo.
+    """
+    data = {
+        "model": model or MODEL,
+        "prompt": prompt,
+        "stream": True,
+        "temperature": temperature,
+        "keep_alive": KEEP_ALIVE
+    }
+    if seed is not None:
+        data["options"] = {"seed": seed}
+    if format is not None:
+        data["format"] = format
+    return data
+
+def preload_model(model=None):
+    """
+    Carrega o modelo em todos os servidores do pool (requisição sem prompt, como
+    documentado pelo Ollama), para a primeira chamada real não pagar a carga.
+    Retorna quantos servidores responderam; falhas só são informadas.
+    """
+    data = {"model": model or MODEL, "keep_alive": KEEP_ALIVE}
+    loaded = 0
+    for endpoint in get_pool().endpoints:
+        try:
+            with get_session().post(endpoint.url, json=data, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)) as response:
+                if response.status_code == 200:
+                    loaded += 1
+                else:
+                    print(f"Não foi possível pré-carregar o modelo em {endpoint.url}: Código {response.status_code}")
+        except requests.exceptions.RequestException as e:
+            print(f"Não foi possível pré-carregar o modelo em {endpoint.url}: {e}")
+    return loaded
+
+def _cache_for(temperature, seed, use_cache):
+    """Cache a usar na chamada (None se desligado, ignorado ou resposta não determinística)."""
+    if use_cache is False or not llm_cache.CACHE_ENABLED:
+        return None
+    if use_cache is None and not llm_cache.is_cacheable(temperature, seed):
+        return None
+    return llm_cache.get_cache()
+
+def _cache_put(cache, data, text):
+    """Grava a resposta no cache; uma falha de disco não invalida a resposta já recebida."""
+    try:
+        cache.put(data, text)
+    except OSError as e:
+        print(f"Não foi possível gravar a resposta no cache da LLM: {e}")
+
+def call_llm(prompt, show_tokens=True, temperature=0.2, seed=None, use_cache=None, retries=None,
+             format=None, validator=None, model=None):
     """
     Chama a API do Ollama para gerar uma resposta à partir do prompt fornecido.
     A resposta é processada de forma a juntar os tokens recebidos via stream.
-    Retorna o texto gerado.
+    Retorna o texto gerado; em caso de falha levanta uma subclasse de LLMError
+    (depois de esgotar as novas tentativas, se a falha for transitória).
     
     Args:
         prompt (str): O prompt para a LLM
         show_tokens (bool): Se deve mostrar os tokens sendo gerados
         temperature (float): Temperatura para geração (0.0 a 1.0)
+        seed (int): Semente de amostragem repassada ao Ollama (opcional)
+        use_cache (bool): None usa o cache em disco só para chamadas com semente
+            (ver llm_cache.is_cacheable); True força o uso; False ignora o cache
+        retries (int): Novas tentativas para falhas transitórias (padrão: MAX_RETRIES)
+        format (str | dict): Saída estruturada do Ollama ("json" ou JSON Schema)
+        validator (callable): Chamado com cada pedaço do stream; se levantar
+            LLMValidationError a conexão é fechada na hora, o que interrompe a geração
+        model (str): Modelo a usar (padrão: MODEL)
     """
-    data = {
-        "model": "mistral-small:24b-instruct-2501-q4_K_M",
-        "prompt": prompt,
-        "stream": True,
-        "temperature": temperature
-    }
-    
+    data = build_payload(prompt, temperature, seed, format, model)
+    cache = _cache_for(temperature, seed, use_cache)
+    if cache is not None:
+        cached = cache.get(data)
+        if cached is not None:
+            if DEBUG:
+                print("DEBUG: Resposta obtida do cache.")
+            _record_cache_hit(data)
+            return cached
+
+    retries = MAX_RETRIES if retries is None else retries
+    pool = get_pool()
+    for attempt in range(retries + 1):
+        error = None
+        endpoint = pool.acquire()
+        metrics = _start_metrics(data, attempt, endpoint)
+        try:
+            text = _post_generate(data, show_tokens, validator, metrics, endpoint.url)
+        except LLMError as e:
+            error = e
+        except BaseException:
+            endpoint.breaker.release_trial()  # ex.: KeyboardInterrupt
+            raise
+        finally:
+            pool.release(endpoint)
+        _finish_metrics(metrics, error)
+        if error is not None:
+            time.sleep(_retry_or_raise(error, attempt, retries, endpoint))
+            continue
+        endpoint.breaker.record_success()
+        if cache is not None:
+            _cache_put(cache, data, text)
+        return text
+
+def _post_generate(data, show_tokens, validator=None, metrics=None, url=None):
+    """
+    Faz uma requisição em stream e retorna o texto; levanta LLMError em caso de falha.
+    `metrics` (de _start_metrics) recebe o tempo até o primeiro token e as
+    contagens e durações do último pedaço do stream. `url` (padrão: o primeiro
+    servidor do pool) é o /api/generate a usar.
+    """
+    metrics = metrics if metrics is not None else _start_metrics(data, 0)
+    url = url or get_pool().endpoints[0].url
     if DEBUG:
-        print(f"DEBUG: Enviando prompt para a API. Tamanho do prompt: {len(prompt)} caracteres.")
+        print(f"DEBUG: Enviando prompt para a API. Tamanho do prompt: {len(data['prompt'])} caracteres.")
     
     try:
-        response = requests.post(OLLAMA_API_URL, json=data, stream=True, timeout=30)
-        if response.status_code == 200:
+        response = get_session().post(url, json=data, stream=True,
+                                      timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+        # O "with" libera a conexão de volta para o pool ao final da leitura
+        with response:
+            if response.status_code != 200:
+                if DEBUG:
+                    print(f"DEBUG: Resposta da API: {response.text}")
+                raise LLMHTTPError(response.status_code, response.text)
             full_response = ""
             print("\nGerando resposta da LLM:", end=" ", flush=True)
             for line in response.iter_lines():
@@ -39,20 +533,173 @@ def call_llm(prompt, show_tokens=True, temperature=0.2):
                         if DEBUG:
                             print(f"\nDEBUG: Erro ao decodificar JSON: {e}")
                         continue
+                    if 'error' in json_response:
+                        raise LLMStreamError(f"Erro no stream da LLM: {json_response['error']}")
+                    if json_response.get('done'):
+                        llm_telemetry.apply_final_chunk(metrics, json_response)
                     if 'response' in json_response:
                         token = json_response['response']
+                        if token:
+                            _mark_token(metrics)
                         full_response += token
                         if show_tokens:
                             print(token, end="", flush=True)
+                        if validator is not None:
+                            try:
+                                _run_validator(validator, token)
+                            except LLMValidationError:
+                                # Sair do "with" fecha a conexão sem drenar o stream
+                                print()
+                                raise
             print()  # Nova linha ao final
             return full_response.strip()
-        else:
-            print(f"Erro na API: Código {response.status_code}")
-            if DEBUG:
-                print(f"DEBUG: Resposta da API: {response.text}")
-            return prompt
-    except Exception as e:
-        print(f"Erro na chamada à LLM: {str(e)}")
-        if DEBUG:
-            traceback.print_exc()
-        return prompt
\ No newline at end of file
+    except requests.exceptions.Timeout as e:
+        raise LLMTimeoutError(f"Timeout na chamada à LLM: {e}") from e
+    except requests.exceptions.RequestException as e:
+        raise LLMConnectionError(f"Erro de conexão com a LLM: {e}") from e
+
+# ======================================================
+# CLIENTE ASSÍNCRONO
+# ======================================================
+
+def _aiohttp_timeout():
+    return aiohttp.ClientTimeout(total=None, sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT)
+
+async def _call_llm_aiohttp(session, data, validator=None, metrics=None, url=None):
+    """Uma chamada em stream via aiohttp; mesmo contrato de _post_generate (sem imprimir tokens)."""
+    metrics = metrics if metrics is not None else _start_metrics(data, 0)
+    url = url or get_pool().endpoints[0].url
+    try:
+        async with session.post(url, json=data) as response:
+            if response.status != 200:
+                text = await response.text()
+                if DEBUG:
+                    print(f"DEBUG: Resposta da API: {text}")
+                raise LLMHTTPError(response.status, text)
+            full_response = ""
+            async for line in response.content:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    json_response = json.loads(line)
+                except Exception as e:
+                    if DEBUG:
+                        print(f"\nDEBUG: Erro ao decodificar JSON: {e}")
+                    continue
+                if 'error' in json_response:
+                    raise LLMStreamError(f"Erro no stream da LLM: {json_response['error']}")
+                if json_response.get('done'):
+                    llm_telemetry.apply_final_chunk(metrics, json_response)
+                token = json_response.get('response', '')
+                if token:
+                    _mark_token(metrics)
+                full_response += token
+                if validator is not None and token:
+                    try:
+                        _run_validator(validator, token)
+                    except LLMValidationError:
+                        response.close()  # descarta a conexão: o Ollama interrompe a geração
+                        raise
+            return full_response.strip()
+    except asyncio.TimeoutError as e:
+        raise LLMTimeoutError("Timeout na chamada à LLM.") from e
+    except aiohttp.ClientError as e:
+        raise LLMConnectionError(f"Erro de conexão com a LLM: {e}") from e
+
+async def _send_async(session, data, validator, metrics, url):
+    if aiohttp is None:
+        return await asyncio.to_thread(_post_generate, data, False, validator, metrics, url)
+    if session is None:
+        async with aiohttp.ClientSession(timeout=_aiohttp_timeout()) as own_session:
+            return await _call_llm_aiohttp(own_session, data, validator, metrics, url)
+    return await _call_llm_aiohttp(session, data, validator, metrics, url)
+
+async def call_llm_async(prompt, temperature=0.2, seed=None, session=None, semaphore=None,
+                         use_cache=None, retries=None, format=None, validator=None, model=None):
+    """
+    Versão assíncrona de call_llm. Com aiohttp instalado usa a sessão dada (ou uma
+    temporária); sem aiohttp faz a requisição em uma thread. O semáforo, se dado,
+    limita quantas chamadas ficam em andamento ao mesmo tempo; acertos no cache e
+    esperas entre tentativas não o ocupam. Os demais argumentos seguem call_llm.
+    """
+    data = build_payload(prompt, temperature, seed, format, model)
+    cache = _cache_for(temperature, seed, use_cache)
+    if cache is not None:
+        cached = cache.get(data)
+        if cached is not None:
+            _record_cache_hit(data)
+            return cached
+
+    retries = MAX_RETRIES if retries is None else retries
+    pool = get_pool()
+    for attempt in range(retries + 1):
+        error = None
+        metrics = None
+        try:
+            # A falha atravessa o "async with" para que um AdaptiveLimiter a perceba
+            async with semaphore if semaphore is not None else contextlib.nullcontext():
+                # O servidor é escolhido e o relógio começa só com a vaga no semáforo:
+                # a espera na fila não conta como requisição em andamento nem no TTFT
+                endpoint = pool.acquire()
+                metrics = _start_metrics(data, attempt, endpoint)
+                try:
+                    text = await _send_async(session, data, validator, metrics, endpoint.url)
+                except LLMError:
+                    raise
+                except BaseException:
+                    endpoint.breaker.release_trial()  # ex.: tarefa cancelada
+                    raise
+                finally:
+                    pool.release(endpoint)
+        except LLMError as e:
+            if metrics is None:
+                raise  # nenhum servidor disponível (LLMCircuitOpenError)
+            error = e
+        _finish_metrics(metrics, error)
+        if error is not None:
+            await asyncio.sleep(_retry_or_raise(error, attempt, retries, endpoint))
+            continue
+        endpoint.breaker.record_success()
+        if cache is not None:
+            _cache_put(cache, data, text)
+        return text
+
+async def gather_llm(prompts, concurrency=4, temperature=0.2, seeds=None, use_cache=None,
+                     return_exceptions=False, formats=None, validators=None, limiter=None):
+    """
+    Executa vários prompts com no máximo `concurrency` chamadas simultâneas e
+    retorna as respostas na mesma ordem dos prompts. `seeds`, `formats` e
+    `validators` (opcionais) trazem um valor por prompt, como em call_llm. Com
+    return_exceptions, uma chamada que falhou aparece na lista como a própria
+    exceção (LLMError) em vez de interromper as demais.
+    `limiter` (um AdaptiveLimiter, ver llm_concurrency) substitui o limite fixo: o
+    número de chamadas simultâneas passa a ser ajustado pela vazão e pela latência
+    observadas, até o max_limit dele. Passe a mesma instância em lotes sucessivos
+    para manter o limite aprendido.
+    """
+    prompts = list(prompts)
+    seeds = list(seeds) if seeds is not None else [None] * len(prompts)
+    formats = list(formats) if formats is not None else [None] * len(prompts)
+    validators = list(validators) if validators is not None else [None] * len(prompts)
+    semaphore = limiter if limiter is not None else asyncio.Semaphore(max(1, concurrency))
+    if limiter is not None:
+        concurrency = limiter.max_limit
+
+    async def run_all(session):
+        return await asyncio.gather(*(call_llm_async(p, temperature, s, session, semaphore, use_cache,
+                                                     format=f, validator=v)
+                                      for p, s, f, v in zip(prompts, seeds, formats, validators)),
+                                    return_exceptions=return_exceptions)
+
+    if aiohttp is None:
+        return await run_all(None)
+    connector = aiohttp.TCPConnector(limit=max(1, concurrency), limit_per_host=POOL_MAXSIZE)
+    async with aiohttp.ClientSession(connector=connector, timeout=_aiohttp_timeout()) as session:
+        return await run_all(session)
+
+def gather_llm_sync(prompts, concurrency=4, temperature=0.2, seeds=None, use_cache=None,
+                    return_exceptions=False, formats=None, validators=None, limiter=None):
+    """Atalho síncrono para gather_llm, para scripts sem laço de eventos próprio."""
+    return asyncio.run(gather_llm(prompts, concurrency, temperature, seeds, use_cache, return_exceptions,
+                                  formats, validators, limiter))
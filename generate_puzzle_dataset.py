@@ -2,9 +2,11 @@
 import sys
 import json
 import argparse
-from call_llm import call_llm
+import random
+from call_llm import call_llm, LLMError
 from puzzle_examples import generate_puzzle
 from zebra_gen import solve_puzzle, generate_enunciado
+from puzzle_factory import add_factory_arguments, run_from_args
 from tqdm import tqdm
 
 def get_attributes_and_values(theme, dimension):
@@ -57,11 +59,27 @@ def compute_constraints_distribution(constraints):
     return dist
 
 def main():
+    # O modo é lido primeiro: cada modo tem seus próprios argumentos
+    mode_parser = argparse.ArgumentParser(add_help=False)
+    mode_parser.add_argument("--mode", choices=["llm", "factory"], default="llm",
+                             help="'llm' gera um puzzle com chain-of-thought; 'factory' gera puzzles em massa sem LLM")
+    mode_args, _ = mode_parser.parse_known_args()
+
+    if mode_args.mode == "factory":
+        parser = argparse.ArgumentParser(
+            description="Gera puzzles únicos e mínimos em massa, sem LLM.", parents=[mode_parser]
+        )
+        add_factory_arguments(parser)
+        run_from_args(parser.parse_args())
+        return
+
     parser = argparse.ArgumentParser(
-        description="Gera puzzle, resolve e cria dataset com chain-of-thought."
+        description="Gera puzzle, resolve e cria dataset com chain-of-thought.", parents=[mode_parser]
     )
     parser.add_argument("--theme", type=str, default="Culinária", help="Tema do puzzle (ex: Culinária)")
     parser.add_argument("--dimension", type=int, default=5, help="Dimensão do puzzle (número de itens)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Semente do puzzle (padrão: um puzzle diferente a cada execução)")
     args = parser.parse_args()
 
     theme = args.theme
@@ -76,7 +94,8 @@ def main():
     pbar.update(1)
 
     # Passo 2: Gerar o puzzle e resolver (com otimizações na geração de restrições)
-    puzzle = generate_puzzle(dimension, attributes, values)
+    rng = random.Random(args.seed) if args.seed is not None else random.Random()
+    puzzle = generate_puzzle(dimension, attributes, values, rng)
     # Inclui o tema no nome do puzzle para deixar explícito.
     puzzle.name = f"Puzzle '{theme}' {dimension}x{len(attributes)}"
     
@@ -103,7 +122,12 @@ def main():
         "Por favor, forneça as respostas para ambas as perguntas, detalhando os passos lógicos e dedutivos para chegar à solução completa."
     )
     
-    chain_of_thought = call_llm(prompt)
+    try:
+        chain_of_thought = call_llm(prompt)
+    except LLMError as e:
+        print(f"Falha ao obter a chain-of-thought da LLM: {e}")
+        pbar.close()
+        return
     pbar.set_description("Chain-of-thought obtida")
     pbar.update(1)
     
@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-from call_llm import call_llm
+from call_llm import call_llm, LLMError
 from puzzle_examples import ZEBRA_PUZZLE
 
 def get_statement(puzzle):
@@ -51,7 +51,11 @@ def main():
         "Por fim, forneça as respostas para ambas as perguntas, explicando detalhadamente os passos dedutivos e a lógica utilizada para chegar a uma solução completa do puzzle."
     )
     
-    resposta = call_llm(prompt)
+    try:
+        resposta = call_llm(prompt)
+    except LLMError as e:
+        print(f"Falha na chamada à LLM: {e}")
+        return
     print("Resposta da LLM para a versão melhorada do puzzle:")
     print(resposta)
 
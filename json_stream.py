@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Parser JSON incremental, alimentado pedaço a pedaço (os tokens do stream da LLM).
+
+A cada pedaço, feed() devolve os eventos completados até ali, com o caminho do
+elemento dentro do documento (tupla de chaves e índices):
+
+    ("start", caminho, dict | list)   um objeto ou lista foi aberto
+    ("value", caminho, valor)         um escalar (texto, número, booleano, null) terminou
+    ("end", caminho, contêiner)       um objeto ou lista foi fechado (já montado)
+
+Isso permite validar a resposta enquanto ela é gerada e interromper a geração
+assim que ela se mostra inválida. Texto antes do primeiro "{" ou "[" e depois do
+fim do documento é ignorado. Erros de sintaxe levantam ValueError.
+"""
+import json
+
+_WHITESPACE = " \t\r\n"
+_LITERAL_CHARS = set("0123456789+-.eEtruefalsn")
+
+
+class IncrementalJSONParser:
+    """Monta o documento JSON incrementalmente e emite eventos de início, valor e fim."""
+
+    def __init__(self):
+        # Cada nível: [contêiner, caminho, chave pendente, estado]; estados: "key",
+        # "colon", "value", "comma" (em listas, "value" e "comma")
+        self.stack = []
+        self.result = None
+        self.done = False
+        self._string = None
+        self._escape = None
+        self._literal = None
+
+    def feed(self, text):
+        events = []
+        for ch in text:
+            if self.done:
+                break
+            self._char(ch, events)
+        return events
+
+    def _char(self, ch, events):
+        if self._string is not None:
+            self._string_char(ch, events)
+            return
+        if self._literal is not None:
+            if ch in _LITERAL_CHARS:
+                self._literal.append(ch)
+                return
+            self._end_literal(events)
+            if self.done:
+                return
+        if not self.stack:
+            if ch in "{[":
+                self._open(ch, events)
+            return  # texto fora do documento
+        if ch in _WHITESPACE:
+            return
+        frame = self.stack[-1]
+        container, _, _, state = frame
+        if ch == '"':
+            if state not in ("key", "value"):
+                raise ValueError(f"Texto inesperado no estado '{state}'.")
+            self._string = []
+        elif ch in "{[":
+            if state != "value":
+                raise ValueError(f"'{ch}' inesperado no estado '{state}'.")
+            self._open(ch, events)
+        elif ch in "}]":
+            if (ch == "}") != isinstance(container, dict):
+                raise ValueError(f"'{ch}' não fecha o contêiner aberto.")
+            empty = not container
+            if state != "comma" and not (empty and state in ("key", "value")):
+                raise ValueError(f"'{ch}' inesperado no estado '{state}'.")
+            self._close(events)
+        elif ch == ":":
+            if state != "colon":
+                raise ValueError("':' inesperado.")
+            frame[3] = "value"
+        elif ch == ",":
+            if state != "comma":
+                raise ValueError("',' inesperada.")
+            frame[3] = "key" if isinstance(container, dict) else "value"
+        elif ch in _LITERAL_CHARS:
+            if state != "value":
+                raise ValueError(f"'{ch}' inesperado no estado '{state}'.")
+            self._literal = [ch]
+        else:
+            raise ValueError(f"Caractere inesperado: {ch!r}.")
+
+    def _string_char(self, ch, events):
+        if self._escape is not None:
+            self._escape.append(ch)
+            if self._escape[0] != "u" or len(self._escape) == 5:
+                self._string.append("\\" + "".join(self._escape))
+                self._escape = None
+            return
+        if ch == "\\":
+            self._escape = []
+        elif ch == '"':
+            raw = "".join(self._string)
+            self._string = None
+            try:
+                text = json.loads('"' + raw + '"')
+            except ValueError as e:
+                raise ValueError(f"Texto JSON inválido: {e}") from e
+            frame = self.stack[-1]
+            if frame[3] == "key":
+                frame[2] = text
+                frame[3] = "colon"
+            else:
+                self._value(text, events)
+        else:
+            self._string.append(ch)
+
+    def _end_literal(self, events):
+        raw = "".join(self._literal)
+        self._literal = None
+        try:
+            value = json.loads(raw)
+        except ValueError as e:
+            raise ValueError(f"Literal JSON inválido: {raw!r}") from e
+        self._value(value, events)
+
+    def _child_path(self):
+        container, path, key, _ = self.stack[-1]
+        return path + ((key,) if isinstance(container, dict) else (len(container),))
+
+    def _open(self, ch, events):
+        container = {} if ch == "{" else []
+        path = self._child_path() if self.stack else ()
+        self.stack.append([container, path, None, "key" if ch == "{" else "value"])
+        events.append(("start", path, container))
+
+    def _close(self, events):
+        container, path, _, _ = self.stack.pop()
+        events.append(("end", path, container))
+        self._attach(container)
+
+    def _value(self, value, events):
+        events.append(("value", self._child_path(), value))
+        self._attach(value)
+
+    def _attach(self, value):
+        if not self.stack:
+            self.result = value
+            self.done = True
+            return
+        frame = self.stack[-1]
+        container = frame[0]
+        if isinstance(container, dict):
+            container[frame[2]] = value
+            frame[2] = None
+        else:
+            container.append(value)
+        frame[3] = "comma"
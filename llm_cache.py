@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Cache em disco das respostas da LLM, endereçado pelo conteúdo da requisição.
+
+A chave é o SHA-256 de (modelo, prompt, temperatura, opções), então a mesma
+requisição feita de novo (uma re-execução após falha, uma nova tentativa com o
+mesmo prompt, chamadas determinísticas) é respondida do disco sem passar pela GPU.
+Por padrão só chamadas com semente vão para o cache: sem semente, repetir a
+chamada é pedir outra resposta (ex.: nova tentativa após uma resposta inválida).
+
+Cada resposta fica em <diretório>/<2 primeiros hex>/<chave>.json, gravada de forma
+atômica (arquivo temporário + os.replace). Quando o tamanho total passa de
+max_bytes, as entradas usadas há mais tempo (mtime, atualizado a cada acerto)
+são removidas.
+
+Variáveis de ambiente: LLM_CACHE=0 desliga o cache; LLM_CACHE_DIR muda o diretório.
+"""
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+DEFAULT_CACHE_DIR = os.environ.get("LLM_CACHE_DIR", ".llm_cache")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+CACHE_ENABLED = os.environ.get("LLM_CACHE", "1") not in ("0", "false", "no")
+
+
+def cache_key(payload):
+    """Chave do conteúdo: modelo, prompt, temperatura e opções da requisição."""
+    material = {
+        "model": payload.get("model"),
+        "prompt": payload.get("prompt"),
+        "temperature": payload.get("temperature"),
+        "options": payload.get("options") or {},
+        "format": payload.get("format"),
+    }
+    encoded = json.dumps(material, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def is_cacheable(temperature, seed=None):
+    """
+    Só respostas com semente vão para o cache. Mesmo com temperatura baixa, uma
+    chamada sem semente é repetida justamente para obter outra resposta.
+    """
+    return seed is not None
+
+
+class LLMCache:
+    """Cache em disco com gravação atômica, despejo por tamanho e estatísticas."""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._size = None
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, payload):
+        """Resposta guardada para a requisição, ou None."""
+        path = self._path(cache_key(payload))
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        try:
+            os.utime(path)  # marca como usada recentemente para o despejo
+        except OSError:
+            pass
+        with self._lock:
+            self.stats["hits"] += 1
+        return record.get("response")
+
+    def put(self, payload, response):
+        """Grava a resposta de forma atômica e despeja entradas antigas se preciso."""
+        key = cache_key(payload)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        record = {"key": key, "model": payload.get("model"), "created": time.time(), "response": response}
+        data = json.dumps(record, ensure_ascii=False).encode("utf-8")
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self.stats["writes"] += 1
+            if self._size is not None:
+                self._size += len(data) - previous
+        if self.size() > self.max_bytes:
+            self.evict()
+
+    def _entries(self):
+        """Lista (mtime, tamanho, caminho) de todas as entradas."""
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for shard in os.listdir(self.directory):
+            shard_dir = os.path.join(self.directory, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(shard_dir, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def size(self):
+        """Tamanho total em bytes (calculado uma vez e mantido incrementalmente)."""
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            return self._size
+
+    def evict(self, target_bytes=None):
+        """Remove as entradas usadas há mais tempo até o total caber em target_bytes (padrão: 90% do limite)."""
+        target = target_bytes if target_bytes is not None else int(self.max_bytes * 0.9)
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                self.stats["evictions"] += 1
+            self._size = total
+
+    def clear(self):
+        self.evict(target_bytes=0)
+
+    def summary(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        rate = self.stats["hits"] / lookups if lookups else 0.0
+        return (f"Cache LLM: {self.stats['hits']} acertos, {self.stats['misses']} falhas "
+                f"({rate:.0%}), {self.stats['writes']} gravações, {self.stats['evictions']} despejos, "
+                f"{self.size() / (1024 * 1024):.1f} MiB em '{self.directory}'.")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Cache compartilhado do processo (criado no primeiro uso)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache()
+    return _cache
+
+
+def configure_cache(directory=None, max_bytes=None, enabled=None):
+    """Troca o diretório ou o limite do cache compartilhado, ou o liga/desliga."""
+    global _cache, CACHE_ENABLED
+    if enabled is not None:
+        CACHE_ENABLED = enabled
+    if directory is not None or max_bytes is not None:
+        with _cache_lock:
+            _cache = LLMCache(directory or DEFAULT_CACHE_DIR, max_bytes or DEFAULT_MAX_BYTES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspeciona ou limpa o cache em disco das respostas da LLM.")
+    parser.add_argument("--dir", type=str, default=DEFAULT_CACHE_DIR, help="Diretório do cache")
+    parser.add_argument("--clear", action="store_true", help="Remove todas as entradas")
+    parser.add_argument("--max-mb", type=float, default=None, help="Despeja entradas até caber neste tamanho")
+    args = parser.parse_args()
+
+    cache = LLMCache(args.dir)
+    if args.clear:
+        cache.clear()
+    elif args.max_mb is not None:
+        cache.evict(int(args.max_mb * 1024 * 1024))
+    print(f"{len(cache._entries())} respostas, {cache.size() / (1024 * 1024):.1f} MiB em '{args.dir}'.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Controle adaptativo do número de chamadas simultâneas à LLM (AIMD).
+
+AdaptiveLimiter substitui o asyncio.Semaphore de gather_llm: cada chamada entra
+com "async with limiter" e, ao sair, informa a latência e se terminou com uma
+falha transitória (exceções com retryable=True, como timeout ou HTTP 503).
+
+A cada janela de chamadas concluídas o limite é ajustado:
+  - aumento aditivo (+1) enquanto a vazão (chamadas/s de tempo ocupado) melhora;
+  - se um aumento não trouxe ganho de vazão, volta 1 (o joelho da curva foi passado)
+    e só volta a sondar depois de algumas janelas;
+  - redução multiplicativa (x decrease) quando a latência média passa de
+    latency_tolerance vezes a menor latência média já vista, ou na hora, a cada
+    falha transitória (uma vez por janela).
+
+O limiter não usa primitivas presas a um laço de eventos, então a mesma instância
+pode ser reaproveitada em várias chamadas a gather_llm_sync (cada uma com seu
+asyncio.run) e o limite aprendido passa de um lote para o outro.
+"""
+import asyncio
+import time
+
+
+class AdaptiveLimiter:
+    """Limite de chamadas simultâneas ajustado por AIMD a partir da vazão e da latência."""
+
+    def __init__(self, max_limit=16, initial=2, min_limit=1, increase=1, decrease=0.7,
+                 latency_tolerance=2.0, improvement=0.05, probe_every=4):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.improvement = improvement
+        self.probe_every = probe_every
+        self.in_flight = 0
+        self.min_latency = None
+        self.last_throughput = None
+        self.throughput = None
+        self.history = []
+        self.stats = {"completed": 0, "errors": 0, "increases": 0, "decreases": 0}
+        self._waiters = []
+        self._started = {}
+        self._busy_since = None
+        self._last_action = None
+        self._holds = 0
+        self._reset_window()
+
+    @property
+    def current_limit(self):
+        return max(self.min_limit, int(self.limit))
+
+    def _reset_window(self):
+        self._window_count = 0
+        self._window_latency = 0.0
+        self._window_busy = 0.0
+        self._window_error = False
+        if self._busy_since is not None:
+            self._busy_since = time.perf_counter()
+
+    # ------------------------------------------------------------------
+    # Entrada e saída das chamadas
+    # ------------------------------------------------------------------
+
+    async def __aenter__(self):
+        while self.in_flight >= self.current_limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        if self.in_flight == 0:
+            self._busy_since = time.perf_counter()
+        self.in_flight += 1
+        self._started[asyncio.current_task()] = time.perf_counter()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        now = time.perf_counter()
+        started = self._started.pop(asyncio.current_task(), now)
+        self.in_flight -= 1
+        if self.in_flight == 0 and self._busy_since is not None:
+            self._window_busy += now - self._busy_since
+            self._busy_since = None
+        if exc is None:
+            self._on_success(now - started)
+        elif getattr(exc, "retryable", False):
+            self._on_error()
+        self._wake()
+        return False
+
+    def _wake(self):
+        free = self.current_limit - self.in_flight
+        for waiter in list(self._waiters):
+            if free <= 0:
+                break
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    # ------------------------------------------------------------------
+    # Ajuste do limite
+    # ------------------------------------------------------------------
+
+    def _busy_time(self):
+        busy = self._window_busy
+        if self._busy_since is not None:
+            busy += time.perf_counter() - self._busy_since
+        return busy
+
+    def _on_success(self, latency):
+        self.stats["completed"] += 1
+        self._window_count += 1
+        self._window_latency += latency
+        if self._window_count >= max(3, self.current_limit):
+            self._end_window()
+
+    def _on_error(self):
+        self.stats["errors"] += 1
+        if not self._window_error:
+            self._window_error = True
+            self._adjust("falha", max(self.min_limit, self.limit * self.decrease))
+            # Depois de uma redução a vazão anterior não serve de comparação
+            self.last_throughput = None
+
+    def _end_window(self):
+        busy = self._busy_time()
+        latency = self._window_latency / self._window_count
+        throughput = self._window_count / busy if busy > 0 else None
+        self.throughput = throughput
+        if self.min_latency is None or latency < self.min_latency:
+            self.min_latency = latency
+
+        if self._window_error:
+            action, limit = "falha", self.limit
+        elif latency > self.latency_tolerance * self.min_latency:
+            action, limit = "latência", max(self.min_limit, self.limit * self.decrease)
+            self.last_throughput = None
+        elif throughput is not None and (self.last_throughput is None
+                                         or throughput > self.last_throughput * (1 + self.improvement)):
+            action, limit = "aumento", min(self.max_limit, self.limit + self.increase)
+        elif self._last_action == "aumento":
+            action, limit = "recuo", max(self.min_limit, self.limit - self.increase)
+        else:
+            self._holds += 1
+            if self._holds >= self.probe_every:
+                action, limit = "sondagem", min(self.max_limit, self.limit + self.increase)
+            else:
+                action, limit = "mantém", self.limit
+        if throughput is not None and action not in ("latência", "falha"):
+            self.last_throughput = throughput
+        self._adjust(action, limit, latency)
+        self._reset_window()
+
+    def _adjust(self, action, limit, latency=None):
+        previous = self.current_limit
+        self.limit = float(limit)
+        if self.current_limit > previous:
+            self.stats["increases"] += 1
+        elif self.current_limit < previous:
+            self.stats["decreases"] += 1
+        if action != "mantém":
+            self._holds = 0
+        self._last_action = action
+        self.history.append({"time": time.time(), "action": action, "limit": self.current_limit,
+                             "throughput": self.throughput, "latency": latency})
+        self._wake()
+
+    def summary(self):
+        throughput = f"{self.throughput:.2f} chamadas/s" if self.throughput else "vazão ainda não medida"
+        return (f"Concorrência adaptativa: limite {self.current_limit} (de {self.min_limit} a {self.max_limit}), "
+                f"{throughput}, {self.stats['completed']} chamadas, {self.stats['errors']} falhas, "
+                f"{self.stats['increases']} aumentos e {self.stats['decreases']} reduções.")
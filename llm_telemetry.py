@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Telemetria das chamadas à LLM: tokens, tempo até o primeiro token e tokens/s.
+
+O último pedaço do stream do Ollama traz prompt_eval_count, eval_count e as
+durações (em nanossegundos) de carga do modelo, processamento do prompt e
+decodificação. call_llm junta isso ao tempo até o primeiro token e ao tempo de
+parede medidos no cliente e registra uma entrada por requisição:
+
+    {"stage", "model", "ok", "error", "cached", "attempt", "prompt_chars",
+     "prompt_tokens", "eval_tokens", "load_s", "prompt_eval_s", "eval_s",
+     "total_s", "ttft_s", "wall_s", "tokens_per_s", "time"}
+
+As entradas são agregadas por etapa do pipeline, definida com
+
+    with llm_telemetry.stage("dominios"):
+        ...
+
+(a etapa vale também para tarefas asyncio e threads criadas dentro do bloco), e
+podem ser exportadas em JSON Lines (uma linha por chamada, gravada na hora) ou
+no formato textfile do Prometheus (node_exporter --collector.textfile).
+"""
+import argparse
+import contextlib
+import contextvars
+import json
+import os
+import tempfile
+import threading
+import time
+
+DEFAULT_STAGE = "geral"
+_stage = contextvars.ContextVar("llm_stage", default=DEFAULT_STAGE)
+
+# Campos de duração do Ollama (nanossegundos) -> campos do registro (segundos)
+_OLLAMA_DURATIONS = {"load_duration": "load_s", "prompt_eval_duration": "prompt_eval_s",
+                     "eval_duration": "eval_s", "total_duration": "total_s"}
+_OLLAMA_COUNTS = {"prompt_eval_count": "prompt_tokens", "eval_count": "eval_tokens"}
+
+# Somas exportadas por etapa: campo do registro -> (métrica Prometheus, ajuda)
+_SUMS = {
+    "prompt_tokens": ("llm_prompt_tokens_total", "Tokens de prompt processados."),
+    "eval_tokens": ("llm_eval_tokens_total", "Tokens gerados."),
+    "load_s": ("llm_load_seconds_total", "Tempo de carga do modelo."),
+    "prompt_eval_s": ("llm_prompt_eval_seconds_total", "Tempo de processamento do prompt."),
+    "eval_s": ("llm_eval_seconds_total", "Tempo de decodificação."),
+    "wall_s": ("llm_wall_seconds_total", "Tempo de parede das chamadas, medido no cliente."),
+}
+
+
+def current_stage():
+    return _stage.get()
+
+
+@contextlib.contextmanager
+def stage(name):
+    """Atribui as chamadas feitas dentro do bloco à etapa `name`."""
+    token = _stage.set(name)
+    try:
+        yield
+    finally:
+        _stage.reset(token)
+
+
+def apply_final_chunk(metrics, chunk):
+    """Copia contagens e durações do último pedaço do stream do Ollama para `metrics`."""
+    for key, field in _OLLAMA_COUNTS.items():
+        if key in chunk:
+            metrics[field] = chunk[key]
+    for key, field in _OLLAMA_DURATIONS.items():
+        if key in chunk:
+            metrics[field] = chunk[key] / 1e9
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Telemetry:
+    """Registro das chamadas, com agregação por etapa e exportação."""
+
+    def __init__(self, jsonl_path=None):
+        self.jsonl_path = jsonl_path
+        self.records = []
+        self._lock = threading.Lock()
+
+    def record(self, metrics):
+        """Completa e guarda o registro de uma chamada (e o grava no JSONL, se configurado)."""
+        record = dict(metrics)
+        record.setdefault("stage", current_stage())
+        record.setdefault("time", time.time())
+        if record.get("eval_tokens") and record.get("eval_s"):
+            record["tokens_per_s"] = record["eval_tokens"] / record["eval_s"]
+        with self._lock:
+            self.records.append(record)
+            if self.jsonl_path:
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return record
+
+    def by_stage(self):
+        """Agregados por etapa: chamadas, erros, acertos no cache, somas, TTFT e tokens/s."""
+        with self._lock:
+            records = list(self.records)
+        return aggregate(records)
+
+    def summary(self):
+        return format_summary(self.by_stage())
+
+    def write_prometheus(self, path):
+        write_prometheus(self.by_stage(), path)
+
+
+def aggregate(records):
+    stages = {}
+    for r in records:
+        s = stages.setdefault(r.get("stage", DEFAULT_STAGE), {
+            "calls": 0, "errors": 0, "cached": 0, "ttft": [], **{field: 0.0 for field in _SUMS}})
+        s["calls"] += 1
+        if not r.get("ok", True):
+            s["errors"] += 1
+        if r.get("cached"):
+            s["cached"] += 1
+        for field in _SUMS:
+            s[field] += r.get(field) or 0
+        if r.get("ttft_s") is not None:
+            s["ttft"].append(r["ttft_s"])
+    for s in stages.values():
+        ttft = s.pop("ttft")
+        s["ttft_count"] = len(ttft)
+        s["ttft_sum"] = sum(ttft)
+        s["ttft_p50"] = _percentile(ttft, 0.5)
+        s["ttft_p95"] = _percentile(ttft, 0.95)
+        s["tokens_per_s"] = s["eval_tokens"] / s["eval_s"] if s["eval_s"] else None
+        s["prompt_tokens_per_s"] = s["prompt_tokens"] / s["prompt_eval_s"] if s["prompt_eval_s"] else None
+    return stages
+
+
+def format_summary(stages):
+    lines = []
+    for name, s in sorted(stages.items()):
+        tps = f"{s['tokens_per_s']:.1f} tok/s" if s["tokens_per_s"] else "- tok/s"
+        ttft = f"TTFT p50 {s['ttft_p50']:.2f}s p95 {s['ttft_p95']:.2f}s" if s["ttft_count"] else "TTFT -"
+        lines.append(
+            f"[{name}] {s['calls']} chamadas ({s['errors']} erros, {s['cached']} do cache), "
+            f"{int(s['prompt_tokens'])} tokens de prompt, {int(s['eval_tokens'])} gerados, {tps}, {ttft}; "
+            f"carga {s['load_s']:.1f}s, prompt {s['prompt_eval_s']:.1f}s, decodificação {s['eval_s']:.1f}s, "
+            f"parede {s['wall_s']:.1f}s")
+    return "\n".join(lines) if lines else "Nenhuma chamada à LLM registrada."
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def write_prometheus(stages, path):
+    """Grava os agregados no formato textfile do Prometheus, de forma atômica."""
+    out = []
+
+    def metric(name, kind, help_text, samples):
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} {kind}")
+        for stage_name, value in samples:
+            out.append(f'{name}{{stage="{_label(stage_name)}"}} {value}')
+
+    items = sorted(stages.items())
+    metric("llm_calls_total", "counter", "Requisições à LLM.", [(n, s["calls"]) for n, s in items])
+    metric("llm_errors_total", "counter", "Requisições à LLM que falharam.", [(n, s["errors"]) for n, s in items])
+    metric("llm_cache_hits_total", "counter", "Respostas servidas do cache em disco.",
+           [(n, s["cached"]) for n, s in items])
+    for field, (name, help_text) in _SUMS.items():
+        metric(name, "counter", help_text, [(n, s[field]) for n, s in items])
+    metric("llm_ttft_seconds_sum", "counter", "Soma dos tempos até o primeiro token.",
+           [(n, s["ttft_sum"]) for n, s in items])
+    metric("llm_ttft_seconds_count", "counter", "Chamadas com tempo até o primeiro token medido.",
+           [(n, s["ttft_count"]) for n, s in items])
+    metric("llm_tokens_per_second", "gauge", "Velocidade média de decodificação.",
+           [(n, s["tokens_per_s"]) for n, s in items if s["tokens_per_s"] is not None])
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write("\n".join(out) + "\n")
+    os.replace(tmp_path, path)
+
+
+_telemetry = Telemetry()
+
+
+def get_telemetry():
+    """Telemetria compartilhada do processo."""
+    return _telemetry
+
+
+def configure_telemetry(jsonl_path=None):
+    """Passa a gravar cada chamada em `jsonl_path` (os registros anteriores são mantidos)."""
+    _telemetry.jsonl_path = jsonl_path
+
+
+def load_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resume por etapa a telemetria das chamadas à LLM (JSON Lines).")
+    parser.add_argument("inputs", nargs="+", help="Arquivos JSON Lines gravados pelo pipeline")
+    parser.add_argument("--prometheus", type=str, default=None, help="Também grava os agregados neste textfile")
+    args = parser.parse_args()
+
+    records = [r for path in args.inputs for r in load_jsonl(path)]
+    stages = aggregate(records)
+    print(format_summary(stages))
+    if args.prometheus:
+        write_prometheus(stages, args.prometheus)
+        print(f"Métricas gravadas em '{args.prometheus}'.")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,9 @@ import random
 import requests
 import json
 import traceback
-from call_llm import call_llm
+from call_llm import gather_llm_sync
+import llm_telemetry
+from llm_concurrency import AdaptiveLimiter
 # Lista de temas
 themes = [
     "Pokemon! O nome dos pokemons deve ser um dos atributos.",
@@ -26,9 +28,19 @@ Aqui estão alguns temas já gerados:
 print("Gerando temas...")
 generated_themes = []
 qtd_themes = 50
+max_concurrency = 8  # Máximo de chamadas simultâneas à LLM
 
-for i in range(qtd_themes):
-    theme = call_llm(prompt, temperature=1.4)
+# As chamadas são independentes: todas são feitas em paralelo, e quantas ficam em
+# andamento ao mesmo tempo é ajustado pela vazão e latência observadas
+limiter = AdaptiveLimiter(max_limit=max_concurrency)
+with llm_telemetry.stage("temas"):
+    responses = gather_llm_sync([prompt] * qtd_themes, temperature=1.4, return_exceptions=True,
+                                limiter=limiter)
+for theme in responses:
+    # Com return_exceptions=True qualquer falha vem na lista, não só LLMError
+    if isinstance(theme, BaseException):
+        print(f"Tema não gerado: {theme}")
+        continue
     generated_themes.append(theme)
     themes.append(theme)  # Adiciona o tema gerado à lista original
     print(f'    "{theme}",')  # Formatação para fácil cópia/cola
@@ -41,4 +53,6 @@ with open("puzzle_themes.json", "w", encoding="utf-8") as f:
     json.dump(all_themes, f, indent=2, ensure_ascii=False)
 
 print("\nTemas salvos em 'puzzle_themes.json'")
+print(llm_telemetry.get_telemetry().summary())
+print(limiter.summary())
 
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita a API /api/generate do Ollama, para testar e medir o
+pipeline de ponta a ponta sem GPU nem modelo.
+
+As respostas seguem a semântica de stream do Ollama (uma linha JSON por token e
+um último pedaço com done, eval_count, eval_duration, prompt_eval_count e
+load_duration) e são, em ordem de prioridade:
+  - canned: arquivo JSON Lines com {"match": regex, "response": texto}, a primeira
+    regex encontrada no prompt vence;
+  - templates embutidos para os prompts do projeto: domínio e solução de
+    zebra_dataset_gen (respeitando a dimensão e o número de atributos pedidos, ou o
+    JSON Schema em "format"), temas de make_themes e as seções de zebra_base_gen;
+  - um texto genérico de --default-tokens tokens.
+As respostas são determinísticas: dependem só do prompt e de options.seed.
+
+Latência: carga do modelo na primeira requisição (--load-ms), processamento do
+prompt (--prompt-tps), velocidade de geração (--tps), latência fixa (--latency-ms)
+e número de requisições atendidas ao mesmo tempo (--parallel, como
+OLLAMA_NUM_PARALLEL; as demais esperam na fila).
+
+Falhas injetadas (probabilidades, sorteadas com --seed): HTTP 503 (--fail-rate),
+conexão derrubada no meio do stream (--drop-rate), erro no stream (--error-rate)
+e JSON de domínio inválido, com valor repetido (--invalid-rate).
+
+Uso:
+    python mock_ollama.py --port 11434 --tps 200
+    OLLAMA_API_URL=http://localhost:11434/api/generate python zebra_dataset_gen.py --total 20
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_TOKEN = re.compile(r"\S+\s*|\s+")
+_ATTRIBUTE_NAMES = ["Cor", "Animal", "Bebida", "Profissão", "Esporte", "Cidade", "Fruta", "Instrumento",
+                    "Planeta", "Flor", "Carro", "Hobby"]
+_VALUE_STEMS = ["Alfa", "Bravo", "Carmim", "Delta", "Eco", "Faísca", "Gama", "Hélio", "Índigo", "Jade",
+                "Kappa", "Lótus"]
+_BASE_DOMAIN = {
+    "Animal": ["Cachorro", "Gato", "Vaca", "Cavalo", "Ovelha"],
+    "Cor": ["Preto", "Branco", "Marrom", "Cinza", "Amarelo"],
+    "Localização": ["Estábulo", "Galpão", "Casa", "Campo", "Sítio"],
+    "Comida": ["Feno", "Ração", "Grãos", "Carne", "Vegetais"],
+    "Som": ["Latido", "Miado", "Mugido", "Relincho", "Balido"],
+}
+
+
+def tokenize(text):
+    """Divide o texto em 'tokens' (palavras com o espaço seguinte) para o stream."""
+    return _TOKEN.findall(text) or [""]
+
+
+def _rng_for(request):
+    options = request.get("options") or {}
+    material = json.dumps([request.get("prompt", ""), options.get("seed")], ensure_ascii=False)
+    return random.Random(int(hashlib.sha256(material.encode("utf-8")).hexdigest()[:16], 16))
+
+
+def _requested_sizes(request):
+    """(dimensão, nº de atributos) pedidos: pelo JSON Schema em "format" ou pelo texto do prompt."""
+    schema = request.get("format")
+    if isinstance(schema, dict):
+        props = schema.get("properties", {})
+        dimension = props.get("solution", {}).get("minItems")
+        n_attributes = props.get("domain", {}).get("minProperties")
+        if dimension:
+            return dimension, n_attributes or dimension
+    prompt = request.get("prompt", "")
+    values = re.search(r"exatamente (\d+) valores", prompt)
+    attributes = re.search(r"exatamente (\d+) atributos", prompt)
+    dimension = int(values.group(1)) if values else 5
+    return dimension, int(attributes.group(1)) if attributes else dimension
+
+
+def template_entries(request, rng, invalid=False):
+    dimension, n_attributes = _requested_sizes(request)
+    names = rng.sample(_ATTRIBUTE_NAMES, min(n_attributes, len(_ATTRIBUTE_NAMES)))
+    names += [f"Atributo{i}" for i in range(len(names) + 1, n_attributes + 1)]
+    domain = {}
+    for name in names:
+        stems = rng.sample(_VALUE_STEMS, min(dimension, len(_VALUE_STEMS)))
+        domain[name] = [f"{name} {stem}" for stem in stems]
+    if invalid and dimension > 1:
+        first = names[0]
+        domain[first][1] = domain[first][0]
+    columns = {name: rng.sample(values, len(values)) for name, values in domain.items()}
+    solution = [{name: columns[name][i] for name in names} for i in range(dimension)]
+    return json.dumps({"domain": domain, "solution": solution}, ensure_ascii=False, indent=2)
+
+
+def template_theme(request, rng):
+    subject = rng.choice(["Festival de bandas", "Feira de ciências", "Corrida de barcos", "Mercado medieval",
+                          "Estação espacial", "Clube de xadrez", "Jardim botânico", "Oficina de robôs"])
+    return (f"{subject}! Cada participante tem um nome, uma especialidade e um objeto preferido; "
+            f"os atributos devem combinar com o tema de {subject.lower()}.")
+
+
+def template_base_section(request, rng):
+    prompt = request.get("prompt", "")
+    if '"name" e "dimension"' in prompt:
+        return '"name": "Quebra-cabeça: Animais na Fazenda",\n"dimension": 5'
+    domain = {attr: rng.sample(values, len(values)) for attr, values in _BASE_DOMAIN.items()}
+    if 'seção "domain"' in prompt:
+        return json.dumps(domain, ensure_ascii=False, indent=2)
+    if 'seção "constraints"' in prompt:
+        attrs = list(domain)
+        constraints = []
+        for i in range(6):
+            a, b = rng.sample(attrs, 2)
+            constraints.append({"type": "direct", "if": {"attribute": a, "value": domain[a][i % 5]},
+                                "then": {"attribute": b, "value": domain[b][i % 5]}})
+        return json.dumps(constraints, ensure_ascii=False, indent=2)
+    attr = rng.choice(list(domain))
+    return json.dumps({"0": {attr: domain[attr][0]}, "2": {attr: domain[attr][2]}}, ensure_ascii=False, indent=2)
+
+
+def template_text(request, rng, tokens):
+    words = ["o", "item", "com", "atributo", "valor", "está", "à", "esquerda", "direita", "do", "logo",
+             "portanto", "dica", "solução", "posição", "vizinho"]
+    return "Resposta simulada: " + " ".join(rng.choice(words) for _ in range(max(1, tokens - 2))) + "."
+
+
+class MockOllama:
+    """Estado do servidor: opções, respostas prontas, sorteio de falhas e contadores."""
+
+    def __init__(self, canned=None, default_tokens=200, tps=50.0, prompt_tps=2000.0, load_ms=0.0,
+                 latency_ms=0.0, parallel=4, fail_rate=0.0, drop_rate=0.0, error_rate=0.0,
+                 invalid_rate=0.0, seed=None):
+        self.canned = [(re.compile(c["match"]), c["response"]) for c in (canned or [])]
+        self.default_tokens = default_tokens
+        self.tps = tps
+        self.prompt_tps = prompt_tps
+        self.load_ms = load_ms
+        self.latency_ms = latency_ms
+        self.fail_rate = fail_rate
+        self.drop_rate = drop_rate
+        self.error_rate = error_rate
+        self.invalid_rate = invalid_rate
+        self.slots = threading.Semaphore(max(1, parallel))
+        self.loaded = set()
+        self.stats = {"requests": 0, "completed": 0, "failed": 0, "dropped": 0, "stream_errors": 0,
+                      "invalid": 0, "tokens": 0, "in_flight": 0, "max_in_flight": 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def roll(self, rate):
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < rate
+
+    def count(self, key, delta=1):
+        with self._lock:
+            self.stats[key] += delta
+            if key == "in_flight":
+                self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+
+    def load_delay(self, model):
+        """Segundos de carga do modelo: só na primeira requisição de cada modelo."""
+        with self._lock:
+            if model in self.loaded:
+                return 0.0
+            self.loaded.add(model)
+        return self.load_ms / 1000.0
+
+    def respond(self, request):
+        """Texto da resposta para a requisição (e se é um JSON inválido injetado)."""
+        prompt = request.get("prompt", "")
+        for pattern, response in self.canned:
+            if pattern.search(prompt):
+                return response, False
+        rng = _rng_for(request)
+        if '"domain"' in prompt and '"solution"' in prompt or isinstance(request.get("format"), dict):
+            invalid = self.roll(self.invalid_rate)
+            return template_entries(request, rng, invalid), invalid
+        if "gerar um tema" in prompt:
+            return template_theme(request, rng), False
+        if "quebra-cabeça de lógica com animais em uma fazenda" in prompt:
+            return template_base_section(request, rng), False
+        return template_text(request, rng, self.default_tokens), False
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    mock = None  # MockOllama, definido por make_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, payload):
+        line = (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path in ("/", "/api/version"):
+            self._send_json(200, {"version": "mock"} if self.path != "/" else {"status": "Ollama is running"})
+        elif self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": name} for name in sorted(self.mock.loaded)]})
+        elif self.path == "/mock/stats":
+            self._send_json(200, dict(self.mock.stats))
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "invalid JSON"})
+            return
+        if self.path != "/api/generate":
+            self._send_json(404, {"error": "not found"})
+            return
+        mock = self.mock
+        mock.count("requests")
+        if mock.latency_ms:
+            time.sleep(mock.latency_ms / 1000.0)
+        if mock.roll(mock.fail_rate):
+            mock.count("failed")
+            self._send_json(503, {"error": "server busy (mock)"})
+            return
+        with mock.slots:
+            mock.count("in_flight")
+            try:
+                self._generate(request)
+            finally:
+                mock.count("in_flight", -1)
+
+    def _generate(self, request):
+        mock = self.mock
+        start = time.perf_counter()
+        if not request.get("prompt"):
+            # Sem prompt o Ollama só carrega (ou, com keep_alive 0, descarrega) o modelo
+            load_s = mock.load_delay(request.get("model", ""))
+            time.sleep(load_s)
+            mock.count("completed")
+            self._send_json(200, {"model": request.get("model", ""), "response": "", "done": True,
+                                  "done_reason": "load", "load_duration": int(load_s * 1e9)})
+            return
+        text, invalid = mock.respond(request)
+        tokens = tokenize(text)
+        prompt_tokens = max(1, len(request.get("prompt", "")) // 4)
+        load_s = mock.load_delay(request.get("model", ""))
+        prompt_s = prompt_tokens / mock.prompt_tps if mock.prompt_tps else 0.0
+        time.sleep(load_s + prompt_s)
+        token_s = 1.0 / mock.tps if mock.tps else 0.0
+        drop_at = len(tokens) // 2 if mock.roll(mock.drop_rate) else None
+        error_at = len(tokens) // 2 if drop_at is None and mock.roll(mock.error_rate) else None
+        if invalid:
+            mock.count("invalid")
+
+        if request.get("stream", True) is False:
+            time.sleep(token_s * len(tokens))
+            mock.count("tokens", len(tokens))
+            mock.count("completed")
+            self._send_json(200, self._final(request, text, tokens, prompt_tokens, load_s, prompt_s, start))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        model = request.get("model", "")
+        try:
+            for i, token in enumerate(tokens):
+                if i == drop_at:
+                    mock.count("dropped")
+                    self.close_connection = True
+                    self.connection.shutdown(2)
+                    return
+                if i == error_at:
+                    mock.count("stream_errors")
+                    self._write_chunk({"error": "model runner has unexpectedly stopped (mock)"})
+                    self.wfile.write(b"0\r\n\r\n")
+                    return
+                time.sleep(token_s)
+                self._write_chunk({"model": model, "response": token, "done": False})
+                mock.count("tokens")
+            final = self._final(request, "", tokens, prompt_tokens, load_s, prompt_s, start)
+            self._write_chunk(final)
+            self.wfile.write(b"0\r\n\r\n")
+            mock.count("completed")
+        except (BrokenPipeError, ConnectionResetError):
+            # O cliente desistiu (por exemplo, validação incremental): para de gerar
+            self.close_connection = True
+
+    @staticmethod
+    def _final(request, text, tokens, prompt_tokens, load_s, prompt_s, start):
+        total_s = time.perf_counter() - start
+        return {
+            "model": request.get("model", ""), "response": text, "done": True, "done_reason": "stop",
+            "total_duration": int(total_s * 1e9), "load_duration": int(load_s * 1e9),
+            "prompt_eval_count": prompt_tokens, "prompt_eval_duration": int(prompt_s * 1e9),
+            "eval_count": len(tokens), "eval_duration": int(max(total_s - load_s - prompt_s, 0) * 1e9),
+        }
+
+
+def load_canned(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def make_server(host="127.0.0.1", port=11434, **options):
+    """Cria o servidor (sem iniciar); a porta 0 escolhe uma livre. Retorna (servidor, MockOllama)."""
+    mock = MockOllama(**options)
+    handler = type("BoundMockHandler", (MockHandler,), {"mock": mock})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server, mock
+
+
+def start_mock_server(host="127.0.0.1", port=0, **options):
+    """
+    Inicia o servidor numa thread em segundo plano (útil em benchmarks e scripts).
+    Retorna (servidor, MockOllama, URL de /api/generate); pare com server.shutdown().
+    """
+    server, mock = make_server(host, port, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://{host}:{server.server_address[1]}/api/generate"
+    return server, mock, url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita o /api/generate do Ollama.")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--canned", type=str, default=None,
+                        help='Respostas prontas (JSON Lines com {"match": regex, "response": texto})')
+    parser.add_argument("--default-tokens", type=int, default=200, help="Tamanho da resposta genérica")
+    parser.add_argument("--tps", type=float, default=50.0, help="Tokens gerados por segundo (0: sem espera)")
+    parser.add_argument("--prompt-tps", type=float, default=2000.0,
+                        help="Tokens de prompt processados por segundo (0: sem espera)")
+    parser.add_argument("--load-ms", type=float, default=0.0, help="Carga do modelo na primeira requisição")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latência fixa antes de cada resposta")
+    parser.add_argument("--parallel", type=int, default=4, help="Requisições atendidas ao mesmo tempo")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Probabilidade de HTTP 503")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Probabilidade de derrubar a conexão")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probabilidade de erro no stream")
+    parser.add_argument("--invalid-rate", type=float, default=0.0,
+                        help="Probabilidade de domínio com valor repetido")
+    parser.add_argument("--seed", type=int, default=None, help="Semente do sorteio das falhas")
+    args = parser.parse_args()
+
+    server, mock = make_server(
+        args.host, args.port, canned=load_canned(args.canned) if args.canned else None,
+        default_tokens=args.default_tokens, tps=args.tps, prompt_tps=args.prompt_tps, load_ms=args.load_ms,
+        latency_ms=args.latency_ms, parallel=args.parallel, fail_rate=args.fail_rate, drop_rate=args.drop_rate,
+        error_rate=args.error_rate, invalid_rate=args.invalid_rate, seed=args.seed)
+    print(f"Ollama simulado em http://{args.host}:{server.server_address[1]}/api/generate")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("Estatísticas:", json.dumps(mock.stats, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Aumento de dados por espelhamento e renomeação, sem solver nem LLM.
+
+Um puzzle resolvido continua válido (e com solução única) quando:
+  - as posições são espelhadas (item i -> item n+1-i): as pistas de posição são
+    renumeradas e as pistas de ordem trocam esquerda e direita;
+  - os valores de cada atributo são permutados de forma consistente em todo o puzzle;
+  - os atributos são reordenados.
+
+As transformações são aplicadas às pistas estruturadas e à solução, e o enunciado,
+a cadeia dedutiva e a pergunta retroalimentada são reescritos a partir delas. Entradas
+antigas sem o campo "constraints" têm as dicas lidas do enunciado.
+
+Como a renomeação preserva a estrutura, as cópias têm o mesmo hash canônico do
+original (puzzle_dedup): a deduplicação deve rodar antes do aumento.
+"""
+import argparse
+import json
+import random
+import re
+
+from puzzle_dedup import iter_entries
+from zebra_dataset_gen import (constraint_to_text, text_to_constraint, parse_enunciado_constraints,
+                               generate_enunciado, extract_feedback_info)
+
+_PAIR_FIELDS = {"direct": ("if", "then"), "neighbor": ("if", "neighbor"), "ordered": ("left", "right")}
+_STEP_PREFIX = re.compile(r"^(\d+)\.\s+(.*)$")
+_FACT_PREFIX = re.compile(r"^O item (\d+) tem (.*)$")
+_UNIQUE_SLOT = re.compile(r"^Nenhum outro valor de (.+) ainda é possível no item (\d+)( \([^()]*\))?\.$")
+
+
+class PuzzleTransform:
+    """
+    Transformação de um puzzle: espelhamento opcional, mapas de valores por atributo
+    ({atributo: {valor antigo: valor novo}}) e nova ordem dos atributos.
+    """
+
+    def __init__(self, dimension, mirror=False, value_maps=None, attribute_order=None):
+        self.dimension = dimension
+        self.mirror = mirror
+        self.value_maps = value_maps or {}
+        self.attribute_order = attribute_order
+
+    def position(self, position):
+        return self.dimension - 1 - position if self.mirror else position
+
+    def value(self, attribute, value):
+        return self.value_maps.get(attribute, {}).get(value, value)
+
+    def ref(self, ref):
+        return {"attribute": ref["attribute"], "value": self.value(ref["attribute"], ref["value"])}
+
+    def constraint(self, constraint):
+        c = dict(constraint)
+        ctype = c["type"]
+        if ctype == "position":
+            c["position"] = self.position(c["position"])
+            c["value"] = self.value(c["attribute"], c["value"])
+        elif ctype in _PAIR_FIELDS:
+            f1, f2 = _PAIR_FIELDS[ctype]
+            first, second = self.ref(c[f1]), self.ref(c[f2])
+            if ctype == "ordered" and self.mirror:
+                # Espelhado, quem estava à esquerda passa a estar à direita
+                first, second = second, first
+            c[f1], c[f2] = first, second
+        else:
+            raise ValueError(f"Tipo de restrição desconhecido: {ctype}")
+        return c
+
+    def domain(self, domain):
+        order = self.attribute_order or list(domain)
+        return {attr: list(domain[attr]) for attr in order}
+
+    def solution(self, solution):
+        items = [solution[self.position(i)] for i in range(len(solution))]
+        order = self.attribute_order or list(solution[0])
+        return [{attr: self.value(attr, item[attr]) for attr in order} for item in items]
+
+    def is_identity(self):
+        return (not self.mirror
+                and all(k == v for m in self.value_maps.values() for k, v in m.items())
+                and self.attribute_order is None)
+
+    def describe(self):
+        return {"mirror": self.mirror,
+                "relabeled": any(k != v for m in self.value_maps.values() for k, v in m.items()),
+                "attribute_order": self.attribute_order}
+
+    # ------------------------------------------------------------------
+    # Texto
+    # ------------------------------------------------------------------
+
+    def clue_text(self, text):
+        """Reescreve o texto de uma dica (formato de constraint_to_text); None se não reconhecer."""
+        constraint = text_to_constraint(text)
+        if constraint is None:
+            return None
+        return constraint_to_text(self.constraint(constraint))
+
+    def fact_text(self, text, domain):
+        """
+        Reescreve "O item N tem A igual a V." no início de `text`, usando o domínio para
+        delimitar atributo e valor. Retorna (fato reescrito, restante) ou None.
+        """
+        m = _FACT_PREFIX.match(text)
+        if not m:
+            return None
+        item, rest = int(m.group(1)), m.group(2)
+        best = None
+        for attr, values in domain.items():
+            for value in values:
+                head = f"{attr} igual a {value}."
+                if rest.startswith(head) and (best is None or len(head) > len(best[2])):
+                    best = (attr, value, head)
+        if best is None:
+            return None
+        attr, value, head = best
+        fact = f"O item {self.position(item - 1) + 1} tem {attr} igual a {self.value(attr, value)}."
+        return fact, rest[len(head):].strip()
+
+    def justification_text(self, text):
+        """Reescreve a justificativa de um passo de generate_deduction_chain."""
+        if not text or text.startswith("Dado pela dica") or text.startswith("As demais posições") \
+                or text.startswith("Por exclusão de casos"):
+            return text
+        if text.startswith("Pela dica"):
+            head, sep, clue = text.partition(": ")
+            new_clue = self.clue_text(clue) if sep else None
+            return None if new_clue is None else f"{head}: {new_clue}"
+        m = _UNIQUE_SLOT.match(text)
+        if m:
+            item = self.position(int(m.group(2)) - 1) + 1
+            return f"Nenhum outro valor de {m.group(1)} ainda é possível no item {item}{m.group(3) or ''}."
+        return None
+
+    def deduction(self, lines, domain):
+        """Reescreve a cadeia dedutiva linha a linha; None se alguma linha não for reconhecida."""
+        result = []
+        for line in lines:
+            m = _STEP_PREFIX.match(line)
+            if not m:
+                return None
+            number, body = m.groups()
+            fact = self.fact_text(body, domain)
+            if fact is not None:
+                new_fact, rest = fact
+                justification = self.justification_text(rest)
+                if justification is None:
+                    return None
+                result.append(f"{number}. {new_fact}" + (f" {justification}" if justification else ""))
+                continue
+            # Cadeias antigas (generate_logical_deduction) listam as próprias dicas
+            clue = self.clue_text(body)
+            if clue is None:
+                return None
+            result.append(f"{number}. {clue}")
+        return result
+
+
+def transform_entry(entry, transform):
+    """
+    Aplica a transformação a uma entrada do dataset e reescreve enunciado, dedução,
+    solução e pergunta retroalimentada. Retorna None se a entrada não puder ser lida.
+    """
+    domain = entry.get("domain")
+    solution = entry.get("solution")
+    enunciado = entry.get("enunciado") or ""
+    if not domain or not solution:
+        return None
+    shown = parse_enunciado_constraints(enunciado)
+    if shown is None:
+        shown = entry.get("constraints")
+    if shown is None:
+        return None
+    try:
+        new_shown = [transform.constraint(c) for c in shown]
+        new_constraints = ([transform.constraint(c) for c in entry["constraints"]]
+                           if entry.get("constraints") is not None else None)
+        new_solution = transform.solution(solution)
+    except (KeyError, ValueError, IndexError):
+        return None
+    new_deduction = transform.deduction(entry.get("deduction") or [], domain)
+    if not new_deduction:
+        return None
+
+    new_domain = transform.domain(domain)
+    name = enunciado.split("\n", 1)[0] or "Puzzle Gerado Automaticamente"
+    feedback_question, correct_answer = extract_feedback_info(new_deduction, new_solution)
+    new_entry = dict(entry)
+    new_entry.update({
+        "domain": new_domain,
+        "enunciado": (generate_enunciado(name, len(new_solution), new_domain, new_shown)
+                      + "\n\nPergunta Retroalimentada: " + feedback_question),
+        "constraints": new_constraints,
+        "deduction": new_deduction,
+        "feedback_question": feedback_question,
+        "correct_answer": correct_answer,
+        "solution": new_solution,
+        "augmentation": transform.describe(),
+    })
+    if new_constraints is None:
+        del new_entry["constraints"]
+    return new_entry
+
+
+def random_transform(entry, rng, mirror=True, relabel=True, reorder=True):
+    """Sorteia uma transformação para a entrada (espelhamento, valores e ordem dos atributos)."""
+    domain = entry["domain"]
+    dimension = len(entry["solution"])
+    value_maps = {}
+    if relabel:
+        for attr, values in domain.items():
+            value_maps[attr] = dict(zip(values, rng.sample(values, len(values))))
+    order = None
+    if reorder:
+        order = rng.sample(list(domain), len(domain))
+        if order == list(domain):
+            order = None
+    return PuzzleTransform(dimension, mirror and rng.random() < 0.5, value_maps, order)
+
+
+def augment_entries(entries, copies, rng=None, include_original=True, max_draws=None, **options):
+    """
+    Gera, para cada entrada, até `copies` variantes distintas (mais o original, se
+    include_original). max_draws (padrão 4 * copies) limita os sorteios por entrada.
+    """
+    rng = rng or random
+    max_draws = max_draws if max_draws is not None else 4 * copies
+    for entry in entries:
+        if include_original:
+            yield entry
+        seen = {entry.get("enunciado")}
+        produced = 0
+        for _ in range(max_draws):
+            if produced >= copies:
+                break
+            transform = random_transform(entry, rng, **options)
+            if transform.is_identity():
+                continue
+            variant = transform_entry(entry, transform)
+            if variant is None:
+                break
+            if variant["enunciado"] in seen:
+                continue
+            seen.add(variant["enunciado"])
+            produced += 1
+            yield variant
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multiplica um dataset de puzzles por espelhamento e renomeação.")
+    parser.add_argument("inputs", nargs="+", help="Arquivos .json (lista) ou .jsonl de entrada")
+    parser.add_argument("-o", "--output", required=True, help="Arquivo JSON Lines de saída")
+    parser.add_argument("--copies", type=int, default=4, help="Variantes por puzzle")
+    parser.add_argument("--seed", type=int, default=None, help="Semente das transformações")
+    parser.add_argument("--no-original", action="store_true", help="Não copiar as entradas originais para a saída")
+    parser.add_argument("--no-mirror", action="store_true", help="Não espelhar posições")
+    parser.add_argument("--no-relabel", action="store_true", help="Não permutar valores")
+    parser.add_argument("--no-reorder", action="store_true", help="Não reordenar atributos")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    entries = (entry for path in args.inputs for entry in iter_entries(path))
+    written = 0
+    with open(args.output, "w", encoding="utf-8") as out:
+        for entry in augment_entries(entries, args.copies, rng, not args.no_original,
+                                     mirror=not args.no_mirror, relabel=not args.no_relabel,
+                                     reorder=not args.no_reorder):
+            out.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            written += 1
+    print(f"{written} entradas gravadas em '{args.output}'.")
+
+
+if __name__ == '__main__':
+    main()
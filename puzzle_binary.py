@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+Formato binário compacto para puzzles compilados e suas soluções.
+
+Cada puzzle é serializado como um registro contendo:
+  - um cabeçalho com a forma do puzzle (dimensão, nº de atributos, de restrições, etc.);
+  - uma tabela de strings internadas (nome, atributos e valores aparecem uma única vez);
+  - a tabela do domínio (índices na tabela de strings);
+  - registros de restrição empacotados com tamanho fixo;
+  - a solução (opcional) como uma matriz de índices.
+
+Vários registros podem ser agrupados em um arquivo contêiner que pode ser mapeado
+em memória (mmap), permitindo recarregar milhares de puzzles sem passar por json.load.
+
+Todos os inteiros são little-endian, com tamanhos fixos (16, 32 e 64 bits), em
+qualquer plataforma. Valores que não são texto (números, booleanos, null) são
+marcados na tabela de strings e voltam com o tipo original.
+
+A fábrica (puzzle_factory --binary) grava seus puzzles neste formato, e
+`python puzzle_binary.py --verify arquivo.zbp` os re-resolve com o motor de
+propagação a partir do contêiner.
+"""
+import argparse
+import json
+import mmap
+import struct
+import sys
+import time
+from array import array
+
+from zebra_propagation import build_state
+
+PUZZLE_MAGIC = b"ZBP1"
+CONTAINER_MAGIC = b"ZBPK"
+FORMAT_VERSION = 2
+
+# magic, versão, dimensão, nº atributos, nº restrições, nº fixações, nº strings, flags
+_HEADER = struct.Struct("<4sHHHHHHB3x")
+# tipo, flags, posição, atributo 1, valor 1, atributo 2, valor 2
+_RECORD = struct.Struct("<BBhHHHH")
+# magic, versão, nº de puzzles, offset do índice
+_CONTAINER_HEADER = struct.Struct("<4sH2xQQ")
+
+_FLAG_HAS_SOLUTION = 0x01
+_FLAG_IMMEDIATE = 0x01
+_MISSING = 0xFFFF
+
+# Tipos dos arrays (16, 32 e 64 bits sem sinal), escolhidos pelo tamanho do item
+_U16 = "H"
+_U32 = next(code for code in "IL" if array(code).itemsize == 4)
+_U64 = "Q"
+assert array(_U16).itemsize == 2 and array(_U64).itemsize == 8, "Plataforma sem inteiros de 16/64 bits"
+_BIG_ENDIAN = sys.byteorder == "big"
+
+# Marca de cada entrada da tabela de strings: texto ou outro valor JSON
+_KIND_TEXT = 0
+_KIND_JSON = 1
+
+CONSTRAINT_CODES = {"position": 0, "direct": 1, "ordered": 2, "neighbor": 3}
+CONSTRAINT_TYPES = {code: name for name, code in CONSTRAINT_CODES.items()}
+DIFFICULTY_CODES = {None: 0, "easy": 1, "medium": 2, "hard": 3}
+DIFFICULTIES = {code: name for name, code in DIFFICULTY_CODES.items()}
+
+# Campos (primário, secundário) de cada tipo de restrição
+_CONSTRAINT_FIELDS = {
+    "direct": ("if", "then"),
+    "ordered": ("left", "right"),
+    "neighbor": ("if", "neighbor"),
+}
+
+
+def _array_bytes(values):
+    """Bytes little-endian de um array."""
+    if _BIG_ENDIAN:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _array_from(typecode, data):
+    """Array a partir de bytes little-endian."""
+    values = array(typecode)
+    values.frombytes(data)
+    if _BIG_ENDIAN:
+        values.byteswap()
+    return values
+
+
+class _StringTable:
+    """
+    Tabela de strings internadas: cada valor distinto recebe um índice. Valores
+    que não são texto são guardados como JSON, com uma marca que restaura o tipo.
+    """
+
+    def __init__(self):
+        self.index = {}
+        self.strings = []
+        self.kinds = bytearray()
+
+    def intern(self, value):
+        if isinstance(value, str):
+            key = (_KIND_TEXT, value)
+        elif value is None or isinstance(value, (bool, int, float)):
+            key = (_KIND_JSON, json.dumps(value))
+        else:
+            raise ValueError(f"Valor não suportado no formato binário: {value!r}")
+        idx = self.index.get(key)
+        if idx is None:
+            idx = len(self.strings)
+            if idx >= _MISSING:
+                raise ValueError("Tabela de strings excede o limite de 65535 entradas")
+            self.index[key] = idx
+            self.strings.append(key[1])
+            self.kinds.append(key[0])
+        return idx
+
+    def to_bytes(self):
+        blobs = [s.encode("utf-8") for s in self.strings]
+        offsets = array(_U32, [0])
+        for blob in blobs:
+            offsets.append(offsets[-1] + len(blob))
+        return _array_bytes(offsets) + bytes(self.kinds) + b"".join(blobs)
+
+
+def _pack_constraint(constraint, strings):
+    ctype = constraint["type"]
+    if ctype not in CONSTRAINT_CODES:
+        raise ValueError("Tipo de restrição desconhecido: " + ctype)
+    flags = DIFFICULTY_CODES.get(constraint.get("difficulty"), 0) << 1
+    if ctype == "position":
+        return _RECORD.pack(
+            CONSTRAINT_CODES[ctype], flags, constraint["position"],
+            strings.intern(constraint["attribute"]), strings.intern(constraint["value"]),
+            _MISSING, _MISSING
+        )
+    first, second = _CONSTRAINT_FIELDS[ctype]
+    if constraint.get("immediate", False):
+        flags |= _FLAG_IMMEDIATE
+    return _RECORD.pack(
+        CONSTRAINT_CODES[ctype], flags, -1,
+        strings.intern(constraint[first]["attribute"]), strings.intern(constraint[first]["value"]),
+        strings.intern(constraint[second]["attribute"]), strings.intern(constraint[second]["value"])
+    )
+
+
+def _unpack_constraint(record, strings):
+    code, flags, position, a1, v1, a2, v2 = record
+    ctype = CONSTRAINT_TYPES[code]
+    if ctype == "position":
+        constraint = {
+            "type": ctype,
+            "position": position,
+            "attribute": strings[a1],
+            "value": strings[v1],
+        }
+    else:
+        first, second = _CONSTRAINT_FIELDS[ctype]
+        constraint = {
+            "type": ctype,
+            first: {"attribute": strings[a1], "value": strings[v1]},
+            second: {"attribute": strings[a2], "value": strings[v2]},
+        }
+        if ctype == "ordered":
+            constraint["immediate"] = bool(flags & _FLAG_IMMEDIATE)
+    difficulty = DIFFICULTIES.get(flags >> 1)
+    if difficulty is not None:
+        constraint["difficulty"] = difficulty
+    return constraint
+
+
+def _normalize_fixed(fixed):
+    """Converte as chaves de 'fixed' (que no JSON são strings) para inteiros."""
+    return {int(pos): assign for pos, assign in (fixed or {}).items()}
+
+
+def encode_puzzle(puzzle):
+    """
+    Serializa um puzzle no formato binário.
+
+    Aceita tanto definições no estilo de puzzle.json (name, dimension, domain,
+    constraints, fixed) quanto entradas do dataset (domain, solution e, quando
+    presente, constraints).
+    """
+    domain = puzzle["domain"]
+    solution = puzzle.get("solution")
+    fixed = _normalize_fixed(puzzle.get("fixed"))
+    constraints = puzzle.get("constraints") or []
+    dimension = puzzle.get("dimension")
+    if dimension is None:
+        dimension = len(solution) if solution else len(next(iter(domain.values()), []))
+
+    strings = _StringTable()
+    strings.intern(puzzle.get("name", ""))
+
+    domain_table = array(_U16)
+    for attr, values in domain.items():
+        domain_table.append(strings.intern(attr))
+        domain_table.append(len(values))
+        domain_table.extend(strings.intern(v) for v in values)
+
+    records = [_pack_constraint(c, strings) for c in constraints]
+    fixed_records = [
+        _pack_constraint({"type": "position", "position": pos, "attribute": attr, "value": val}, strings)
+        for pos, assign in sorted(fixed.items())
+        for attr, val in assign.items()
+    ]
+
+    solution_table = array(_U16)
+    if solution:
+        for item in solution:
+            for attr in domain:
+                val = item.get(attr)
+                solution_table.append(_MISSING if val is None else strings.intern(val))
+
+    flags = _FLAG_HAS_SOLUTION if solution else 0
+    header = _HEADER.pack(
+        PUZZLE_MAGIC, FORMAT_VERSION, dimension, len(domain), len(records),
+        len(fixed_records), len(strings.strings), flags
+    )
+    return b"".join([
+        header,
+        strings.to_bytes(),
+        struct.pack("<I", len(domain_table)),
+        _array_bytes(domain_table),
+        b"".join(records),
+        b"".join(fixed_records),
+        struct.pack("<I", len(solution) if solution else 0),
+        _array_bytes(solution_table),
+    ])
+
+
+def decode_puzzle(buffer, offset=0):
+    """
+    Desserializa um puzzle a partir de um buffer (bytes, memoryview ou mmap).
+    Os registros de restrição são lidos em bloco com Struct.iter_unpack.
+    """
+    view = memoryview(buffer)
+    magic, version, dimension, n_attrs, n_constraints, n_fixed, n_strings, flags = \
+        _HEADER.unpack_from(view, offset)
+    if magic != PUZZLE_MAGIC:
+        raise ValueError("Registro binário de puzzle inválido")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Versão de formato não suportada: {version}")
+    pos = offset + _HEADER.size
+
+    offsets = _array_from(_U32, view[pos:pos + 4 * (n_strings + 1)])
+    pos += 4 * (n_strings + 1)
+    kinds = bytes(view[pos:pos + n_strings])
+    pos += n_strings
+    blob = bytes(view[pos:pos + offsets[-1]])
+    strings = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(n_strings)]
+    for i, kind in enumerate(kinds):
+        if kind == _KIND_JSON:
+            strings[i] = json.loads(strings[i])
+    pos += offsets[-1]
+
+    (domain_len,) = struct.unpack_from("<I", view, pos)
+    pos += 4
+    domain_table = _array_from(_U16, view[pos:pos + 2 * domain_len])
+    pos += 2 * domain_len
+    domain = {}
+    i = 0
+    for _ in range(n_attrs):
+        attr, count = domain_table[i], domain_table[i + 1]
+        domain[strings[attr]] = [strings[v] for v in domain_table[i + 2:i + 2 + count]]
+        i += 2 + count
+
+    end = pos + _RECORD.size * n_constraints
+    constraints = [_unpack_constraint(r, strings) for r in _RECORD.iter_unpack(view[pos:end])]
+    pos = end
+    end = pos + _RECORD.size * n_fixed
+    fixed = {}
+    for _, _, position, a1, v1, _, _ in _RECORD.iter_unpack(view[pos:end]):
+        fixed.setdefault(position, {})[strings[a1]] = strings[v1]
+    pos = end
+
+    (n_items,) = struct.unpack_from("<I", view, pos)
+    pos += 4
+    puzzle = {
+        "name": strings[0],
+        "dimension": dimension,
+        "domain": domain,
+        "constraints": constraints,
+        "fixed": fixed,
+    }
+    if flags & _FLAG_HAS_SOLUTION:
+        solution_table = _array_from(_U16, view[pos:pos + 2 * n_items * n_attrs])
+        attrs = list(domain.keys())
+        puzzle["solution"] = [
+            {attr: (None if solution_table[r * n_attrs + c] == _MISSING else strings[solution_table[r * n_attrs + c]])
+             for c, attr in enumerate(attrs)}
+            for r in range(n_items)
+        ]
+    return puzzle
+
+
+class PuzzleContainerWriter:
+    """
+    Escreve vários puzzles em um único arquivo contêiner.
+    O índice de offsets é gravado no final, permitindo escrita em streaming.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "wb")
+        self.offsets = array(_U64)
+        self.file.write(_CONTAINER_HEADER.pack(CONTAINER_MAGIC, FORMAT_VERSION, 0, 0))
+
+    def append(self, puzzle):
+        self.offsets.append(self.file.tell())
+        self.file.write(encode_puzzle(puzzle))
+
+    def extend(self, puzzles):
+        for puzzle in puzzles:
+            self.append(puzzle)
+
+    def close(self):
+        if self.file.closed:
+            return
+        index_offset = self.file.tell()
+        self.file.write(_array_bytes(self.offsets))
+        self.file.seek(0)
+        self.file.write(_CONTAINER_HEADER.pack(CONTAINER_MAGIC, FORMAT_VERSION, len(self.offsets), index_offset))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class PuzzleContainer:
+    """
+    Leitor de contêiner mapeado em memória. Os puzzles são decodificados sob demanda,
+    portanto abrir um arquivo com milhares de puzzles custa apenas a leitura do índice.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, index_offset = _CONTAINER_HEADER.unpack_from(self.map, 0)
+        if magic != CONTAINER_MAGIC:
+            raise ValueError(f"Arquivo '{path}' não é um contêiner de puzzles")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Versão de formato não suportada: {version}")
+        self.offsets = _array_from(_U64, self.map[index_offset:index_offset + 8 * count])
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, i):
+        return decode_puzzle(self.map, self.offsets[i])
+
+    def __iter__(self):
+        for offset in self.offsets:
+            yield decode_puzzle(self.map, offset)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def save_puzzles(path, puzzles):
+    """Grava uma lista de puzzles em um contêiner binário."""
+    with PuzzleContainerWriter(path) as writer:
+        writer.extend(puzzles)
+
+
+def load_puzzles(path):
+    """Carrega todos os puzzles de um contêiner binário."""
+    with PuzzleContainer(path) as container:
+        return list(container)
+
+
+def load_json_puzzles(path):
+    """
+    Lê um arquivo JSON contendo um puzzle (estilo puzzle.json) ou uma lista
+    de entradas de dataset, ou um arquivo JSON Lines, e retorna sempre uma lista.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        data = json.load(f)
+    return data if isinstance(data, list) else [data]
+
+
+def verify_puzzles(puzzles):
+    """
+    Re-resolve cada puzzle com o motor de propagação (parada antecipada em duas
+    soluções) e confere a unicidade e, quando gravada, a solução. Retorna as
+    contagens por resultado: unique, ambiguous, unsolvable, mismatch e invalid.
+    """
+    counts = {"unique": 0, "ambiguous": 0, "unsolvable": 0, "mismatch": 0, "invalid": 0}
+    for puzzle in puzzles:
+        try:
+            state = build_state(puzzle["domain"], puzzle["constraints"], puzzle.get("fixed"),
+                                dimension=puzzle.get("dimension"))
+        except (KeyError, ValueError):
+            counts["invalid"] += 1
+            continue
+        solved = list(state.search(limit=2))
+        if not solved:
+            counts["unsolvable"] += 1
+        elif len(solved) > 1:
+            counts["ambiguous"] += 1
+        elif puzzle.get("solution") and solved[0].to_solution() != puzzle["solution"]:
+            counts["mismatch"] += 1
+        else:
+            counts["unique"] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Converte puzzles em JSON (puzzle.json ou datasets) para o contêiner binário "
+                    "e re-resolve contêineres."
+    )
+    parser.add_argument("inputs", nargs="+", help="Arquivos JSON ou JSON Lines de entrada (ou .zbp com --verify)")
+    parser.add_argument("--output", "-o", default=None, help="Arquivo contêiner de saída (.zbp)")
+    parser.add_argument("--verify", action="store_true",
+                        help="Re-resolve os puzzles dos contêineres de entrada e confere a solução gravada")
+    args = parser.parse_args()
+    if args.verify == bool(args.output):
+        parser.error("Informe --output para converter ou --verify para re-resolver contêineres.")
+
+    if args.verify:
+        start = time.time()
+        counts = {}
+        for path in args.inputs:
+            with PuzzleContainer(path) as container:
+                for key, value in verify_puzzles(container).items():
+                    counts[key] = counts.get(key, 0) + value
+        total = sum(counts.values())
+        elapsed = time.time() - start
+        print(f"{total} puzzles re-resolvidos em {elapsed:.1f}s: {counts['unique']} com solução única e correta, "
+              f"{counts['ambiguous']} ambíguos, {counts['unsolvable']} sem solução, "
+              f"{counts['mismatch']} com solução diferente da gravada e {counts['invalid']} inválidos.")
+        if total != counts["unique"]:
+            sys.exit(1)
+        return
+
+    total = 0
+    with PuzzleContainerWriter(args.output) as writer:
+        for path in args.inputs:
+            puzzles = load_json_puzzles(path)
+            writer.extend(puzzles)
+            total += len(puzzles)
+    print(f"{total} puzzles salvos em '{args.output}'.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Forma canônica de puzzles e eliminação de duplicatas em escala de dataset.
+
+A forma canônica descreve apenas a estrutura do puzzle: a ordem das dicas, a ordem
+dos atributos e os nomes dos atributos e valores não importam. Dois puzzles que só
+diferem por renomeação (por exemplo, o mesmo puzzle gerado com temas diferentes)
+recebem o mesmo hash. As posições dos itens fazem parte da estrutura.
+
+A rotulação canônica usa refinamento de cores sobre os valores (cada valor é
+caracterizado pelas dicas em que aparece) seguido de individualização dos empates.
+Para puzzles muito simétricos a busca é limitada a max_leaves folhas.
+
+A deduplicação em fluxo combina um conjunto exato de hashes (dentro da execução)
+com um filtro de Bloom que pode ser salvo e carregado entre shards.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+
+from zebra_dataset_gen import parse_enunciado_constraints
+
+_SYMMETRIC_FIELDS = {"direct": ("if", "then"), "neighbor": ("if", "neighbor")}
+
+
+def _puzzle_structure(domain, constraints):
+    """
+    Converte o puzzle em (nós, dicas): cada nó é um valor (índice do atributo, valor)
+    e cada dica é uma tupla (tipo, parâmetros, nós envolvidos).
+    """
+    attributes = list(domain)
+    attr_index = {attr: a for a, attr in enumerate(attributes)}
+    nodes = []
+    node_index = {}
+    for a, attr in enumerate(attributes):
+        for value in domain[attr]:
+            node_index[(a, str(value))] = len(nodes)
+            nodes.append(a)
+
+    def node(ref_attr, ref_value):
+        key = (attr_index[ref_attr], str(ref_value))
+        if key not in node_index:
+            raise ValueError(f"Valor '{ref_value}' não pertence ao atributo '{ref_attr}' do domínio.")
+        return node_index[key]
+
+    clues = []
+    for c in constraints:
+        ctype = c["type"]
+        if ctype == "position":
+            clues.append(("P", c["position"], node(c["attribute"], c["value"])))
+        elif ctype in _SYMMETRIC_FIELDS:
+            f1, f2 = _SYMMETRIC_FIELDS[ctype]
+            tag = "D" if ctype == "direct" else "N"
+            clues.append((tag, 0, node(c[f1]["attribute"], c[f1]["value"]),
+                          node(c[f2]["attribute"], c[f2]["value"])))
+        elif ctype == "ordered":
+            tag = "I" if c.get("immediate", False) else "B"
+            clues.append((tag, 0, node(c["left"]["attribute"], c["left"]["value"]),
+                          node(c["right"]["attribute"], c["right"]["value"])))
+        else:
+            raise ValueError(f"Tipo de restrição desconhecido: {ctype}")
+    return nodes, clues
+
+
+def _incidences(nodes, clues):
+    """Para cada nó, a lista de (tipo, parâmetro, papel, outro nó) das dicas em que aparece."""
+    incidence = [[] for _ in nodes]
+    for clue in clues:
+        tag, param = clue[0], clue[1]
+        if tag == "P":
+            incidence[clue[2]].append((tag, param, 0, None))
+        elif tag in ("D", "N"):
+            incidence[clue[2]].append((tag, param, 0, clue[3]))
+            incidence[clue[3]].append((tag, param, 0, clue[2]))
+        else:
+            incidence[clue[2]].append((tag, param, 0, clue[3]))
+            incidence[clue[3]].append((tag, param, 1, clue[2]))
+    return incidence
+
+
+def _rank(keys):
+    """Renumera chaves comparáveis em cores densas 0..k-1 (preservando a ordem)."""
+    table = {key: i for i, key in enumerate(sorted(set(keys)))}
+    return [table[key] for key in keys]
+
+
+def _refine(colors, nodes, incidence):
+    """Refinamento de cores até estabilizar: valor ~ (cor, cor do atributo, vizinhança)."""
+    n_attrs = max(nodes) + 1 if nodes else 0
+    while True:
+        attr_colors = [[] for _ in range(n_attrs)]
+        for v, a in enumerate(nodes):
+            attr_colors[a].append(colors[v])
+        attr_keys = _rank([tuple(sorted(c)) for c in attr_colors])
+        keys = []
+        for v, a in enumerate(nodes):
+            around = sorted((tag, param, role,
+                             -1 if other is None else colors[other],
+                             -1 if other is None else attr_keys[nodes[other]],
+                             other is not None and nodes[other] == a)
+                            for tag, param, role, other in incidence[v])
+            keys.append((colors[v], attr_keys[a], tuple(around)))
+        refined = _rank(keys)
+        if len(set(refined)) == len(set(colors)):
+            return refined
+        colors = refined
+
+
+def _encode(order, nodes, clues, dimension):
+    """Codifica o puzzle com os nós rotulados por `order` (posição de cada nó na ordem total)."""
+    n_attrs = max(nodes) + 1 if nodes else 0
+    first = [len(nodes)] * n_attrs
+    for v, a in enumerate(nodes):
+        first[a] = min(first[a], order[v])
+    attr_label = _rank(first)
+    labels = [None] * len(nodes)
+    for a in range(n_attrs):
+        members = sorted((order[v], v) for v, attr in enumerate(nodes) if attr == a)
+        for i, (_, v) in enumerate(members):
+            labels[v] = (attr_label[a], i)
+    encoded = []
+    for clue in clues:
+        tag, param = clue[0], clue[1]
+        refs = [labels[v] for v in clue[2:]]
+        if tag in ("D", "N"):
+            refs.sort()
+        encoded.append((tag, param) + tuple(x for ref in refs for x in ref))
+    encoded.sort()
+    return (dimension, n_attrs, tuple(encoded))
+
+
+def canonical_form(domain, constraints, max_leaves=256):
+    """
+    Forma canônica do puzzle: tupla (dimensão, nº de atributos, dicas rotuladas em ordem),
+    invariante à ordem das dicas, à ordem dos atributos e à renomeação de valores.
+    """
+    nodes, clues = _puzzle_structure(domain, constraints)
+    dimension = len(next(iter(domain.values()))) if domain else 0
+    incidence = _incidences(nodes, clues)
+    best = None
+    leaves = 0
+    stack = [_refine([0] * len(nodes), nodes, incidence)]
+    while stack and leaves < max_leaves:
+        colors = stack.pop()
+        classes = {}
+        for v, c in enumerate(colors):
+            classes.setdefault(c, []).append(v)
+        # Valores que não aparecem em nenhuma dica são intercambiáveis e não precisam de desempate
+        tied = next((classes[c] for c in sorted(classes)
+                     if len(classes[c]) > 1 and incidence[classes[c][0]]), None)
+        if tied is None:
+            leaves += 1
+            encoded = _encode(colors, nodes, clues, dimension)
+            if best is None or encoded < best:
+                best = encoded
+            continue
+        # Individualiza cada membro da primeira classe empatada
+        for v in reversed(tied):
+            split = [(c, 0 if u == v else 1) for u, c in enumerate(colors)]
+            stack.append(_refine(_rank(split), nodes, incidence))
+    return best
+
+
+def canonical_hash(domain, constraints, max_leaves=256):
+    """SHA-256 (hex) da forma canônica do puzzle."""
+    form = canonical_form(domain, constraints, max_leaves)
+    return hashlib.sha256(json.dumps(form, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def entry_constraints(entry):
+    """Restrições de uma entrada do dataset; entradas antigas são lidas do enunciado."""
+    constraints = entry.get("constraints")
+    if constraints is None and entry.get("enunciado"):
+        constraints = parse_enunciado_constraints(entry["enunciado"])
+    return constraints
+
+
+def domain_key(domain):
+    """Atributos e valores do domínio, independentes da ordem."""
+    return json.dumps({attr: sorted(str(v) for v in values) for attr, values in (domain or {}).items()},
+                      sort_keys=True, ensure_ascii=False)
+
+
+def entry_hash(entry, max_leaves=256, with_domain=False):
+    """
+    Hash canônico de uma entrada do dataset. Se as restrições não puderem ser
+    recuperadas, usa o hash do enunciado normalizado (sem a pergunta retroalimentada).
+    Com with_domain, os nomes do domínio entram no hash: a mesma estrutura com outro
+    domínio temático deixa de ser duplicata.
+    """
+    digest = None
+    constraints = entry_constraints(entry)
+    if constraints is not None and entry.get("domain"):
+        try:
+            digest = canonical_hash(entry["domain"], constraints, max_leaves)
+        except (KeyError, ValueError):
+            pass
+    if digest is None:
+        text = (entry.get("enunciado") or "").split("Pergunta Retroalimentada:")[0]
+        digest = hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+    if with_domain:
+        digest = hashlib.sha256((digest + domain_key(entry.get("domain"))).encode("utf-8")).hexdigest()
+    return digest
+
+
+class BloomFilter:
+    """Filtro de Bloom sobre hashes hexadecimais (SHA-256), serializável em arquivo."""
+
+    _MAGIC = b"ZBBF"
+
+    def __init__(self, capacity=1_000_000, error_rate=0.001, n_bits=None, n_hashes=None):
+        if n_bits is None:
+            n_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        if n_hashes is None:
+            n_hashes = max(1, round(n_bits / capacity * math.log(2)))
+        self.n_bits = n_bits
+        self.n_hashes = n_hashes
+        self.bits = bytearray((n_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, digest):
+        # Hash duplo (Kirsch-Mitzenmacher) a partir de duas fatias do SHA-256
+        h1 = int(digest[:16], 16)
+        h2 = int(digest[16:32], 16) | 1
+        return ((h1 + i * h2) % self.n_bits for i in range(self.n_hashes))
+
+    def add(self, digest):
+        for pos in self._positions(digest):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, digest):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest))
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self._MAGIC)
+            f.write(self.n_bits.to_bytes(8, "little"))
+            f.write(self.n_hashes.to_bytes(4, "little"))
+            f.write(self.count.to_bytes(8, "little"))
+            f.write(self.bits)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:4] != cls._MAGIC:
+            raise ValueError(f"'{path}' não é um filtro de Bloom válido.")
+        bloom = cls(n_bits=int.from_bytes(data[4:12], "little"),
+                    n_hashes=int.from_bytes(data[12:16], "little"))
+        bloom.count = int.from_bytes(data[16:24], "little")
+        bloom.bits[:] = data[24:]
+        return bloom
+
+
+class PuzzleDeduplicator:
+    """
+    Deduplicação em fluxo: hashes exatos para a execução atual e, opcionalmente,
+    um filtro de Bloom compartilhado entre shards (falsos positivos descartam um
+    puzzle único com probabilidade ~error_rate; falsos negativos não ocorrem).
+    Com with_domain, só é duplicata um puzzle isomorfo com o mesmo domínio.
+    """
+
+    def __init__(self, bloom=None, max_leaves=256, with_domain=False):
+        self.seen = set()
+        self.bloom = bloom
+        self.max_leaves = max_leaves
+        self.with_domain = with_domain
+        self.duplicates = 0
+
+    def is_duplicate(self, entry):
+        """Registra a entrada e retorna True se ela (ou um puzzle isomorfo) já foi vista."""
+        digest = entry_hash(entry, self.max_leaves, self.with_domain)
+        if digest in self.seen or (self.bloom is not None and digest in self.bloom):
+            self.duplicates += 1
+            return True
+        self.seen.add(digest)
+        if self.bloom is not None:
+            self.bloom.add(digest)
+        return False
+
+    def filter(self, entries):
+        """Gera apenas as entradas inéditas."""
+        for entry in entries:
+            if not self.is_duplicate(entry):
+                yield entry
+
+
+def open_bloom(path, capacity=1_000_000, error_rate=0.001):
+    """Carrega o filtro de Bloom de `path` se existir; caso contrário cria um novo."""
+    if path and os.path.exists(path):
+        return BloomFilter.load(path)
+    return BloomFilter(capacity, error_rate)
+
+
+def iter_entries(path):
+    """Lê entradas de um arquivo JSON (lista) ou JSON Lines."""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            data = json.load(f)
+            yield from (data if isinstance(data, list) else [data])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove puzzles estruturalmente duplicados de datasets.")
+    parser.add_argument("inputs", nargs="+", help="Arquivos .json (lista) ou .jsonl de entrada")
+    parser.add_argument("-o", "--output", required=True, help="Arquivo JSON Lines com as entradas inéditas")
+    parser.add_argument("--bloom", type=str, default=None,
+                        help="Filtro de Bloom compartilhado entre shards (carregado e atualizado)")
+    parser.add_argument("--capacity", type=int, default=1_000_000, help="Capacidade de um novo filtro de Bloom")
+    parser.add_argument("--error-rate", type=float, default=0.001, help="Taxa de falsos positivos do filtro")
+    args = parser.parse_args()
+
+    bloom = open_bloom(args.bloom, args.capacity, args.error_rate) if args.bloom else None
+    dedup = PuzzleDeduplicator(bloom)
+    written = 0
+    with open(args.output, "w", encoding="utf-8") as out:
+        for path in args.inputs:
+            for entry in dedup.filter(iter_entries(path)):
+                out.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                written += 1
+    if bloom is not None:
+        bloom.save(args.bloom)
+    print(f"{written} entradas inéditas gravadas em '{args.output}' ({dedup.duplicates} duplicatas removidas).")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,6 @@
 # Exemplos de puzzles lógicos
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 import random
 from collections import defaultdict
@@ -36,7 +36,8 @@ class Puzzle:
 def generate_puzzle(
     dimension: int,
     attributes: List[str],
-    values_per_attribute: Dict[str, List[str]]
+    values_per_attribute: Dict[str, List[str]],
+    rng: Optional[random.Random] = None
 ) -> Puzzle:
     """
     Gera um puzzle com solução garantida.
@@ -45,7 +46,10 @@ def generate_puzzle(
         dimension: Número de posições no puzzle.
         attributes: Lista de atributos (ex: ["Cor", "Animal"]).
         values_per_attribute: Valores possíveis para cada atributo.
+        rng: Gerador aleatório (random.Random) para geração reproduzível;
+            se omitido, usa o módulo random global.
     """
+    rng = rng or random
     # 1. Gera uma solução válida aleatória
     solution = []
     used = {attr: set() for attr in attributes}
@@ -54,7 +58,7 @@ def generate_puzzle(
         item = {}
         for attr in attributes:
             available = [v for v in values_per_attribute[attr] if v not in used[attr]]
-            value = random.choice(available)
+            value = rng.choice(available)
             item[attr] = value
             used[attr].add(value)
         solution.append(item)
@@ -63,10 +67,10 @@ def generate_puzzle(
     constraints = []
     
     # Aumenta o número de restrições diretas
-    num_direct = random.randint(dimension * 2, dimension * 3)
+    num_direct = rng.randint(dimension * 2, dimension * 3)
     for _ in range(num_direct):
-        pos = random.randint(0, dimension - 1)
-        attr1, attr2 = random.sample(attributes, 2)
+        pos = rng.randint(0, dimension - 1)
+        attr1, attr2 = rng.sample(attributes, 2)
         constraints.append({
             "type": "direct",
             "if": {"attribute": attr1, "value": solution[pos][attr1]},
@@ -74,10 +78,10 @@ def generate_puzzle(
         })
     
     # Aumenta o número de restrições de vizinhança
-    num_neighbor = random.randint(dimension, dimension * 2)
+    num_neighbor = rng.randint(dimension, dimension * 2)
     for _ in range(num_neighbor):
-        pos = random.randint(0, dimension - 2)
-        attr1, attr2 = random.sample(attributes, 2)
+        pos = rng.randint(0, dimension - 2)
+        attr1, attr2 = rng.sample(attributes, 2)
         constraints.append({
             "type": "neighbor",
             "if": {"attribute": attr1, "value": solution[pos][attr1]},
@@ -85,24 +89,24 @@ def generate_puzzle(
         })
     
     # Aumenta o número de restrições de ordem
-    num_ordered = random.randint(dimension, dimension * 2)
+    num_ordered = rng.randint(dimension, dimension * 2)
     for _ in range(num_ordered):
-        pos1, pos2 = sorted(random.sample(range(dimension), 2))
-        attr = random.choice(attributes)
+        pos1, pos2 = sorted(rng.sample(range(dimension), 2))
+        attr = rng.choice(attributes)
         constraints.append({
             "type": "ordered",
             "left": {"attribute": attr, "value": solution[pos1][attr]},
             "right": {"attribute": attr, "value": solution[pos2][attr]},
-            "immediate": random.choice([True, False])
+            "immediate": rng.choice([True, False])
         })
     
     # 3. Seleção de posições fixas com dicas iniciais
-    num_fixed = random.randint(1, max(2, dimension // 2))
-    fixed_positions = random.sample(range(dimension), num_fixed)
+    num_fixed = rng.randint(1, max(2, dimension // 2))
+    fixed_positions = rng.sample(range(dimension), num_fixed)
     fixed = {}
     
     for pos in fixed_positions:
-        attr = random.choice(attributes)
+        attr = rng.choice(attributes)
         fixed[pos] = {attr: solution[pos][attr]}
     
     return Puzzle(
@@ -114,7 +118,7 @@ def generate_puzzle(
     )
 
 # Exemplo de uso:
-def create_sample_puzzle(dimension: int = 5) -> Puzzle:
+def create_sample_puzzle(dimension: int = 5, rng: Optional[random.Random] = None) -> Puzzle:
     """Cria um puzzle de exemplo com dimensão específica"""
     attributes = ["Cor", "Animal", "Bebida", "Profissão", "Hobby"]
     
@@ -126,7 +130,7 @@ def create_sample_puzzle(dimension: int = 5) -> Puzzle:
         "Hobby": [f"Hobby_{i}" for i in range(dimension)]
     }
     
-    return generate_puzzle(dimension, attributes, values_per_attribute)
+    return generate_puzzle(dimension, attributes, values_per_attribute, rng)
 
 # Exemplos de puzzles pré-definidos (podem ser movidos para outro arquivo se necessário)
 ZEBRA_PUZZLE = Puzzle(
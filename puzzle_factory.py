@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Fábrica sintética de puzzles, sem LLM no laço.
+
+Os domínios são sorteados de um banco de vocabulário local (VOCABULARY_BANK) e,
+opcionalmente, dos domínios já gerados pela LLM e salvos em datasets/. Para cada
+puzzle sorteia-se uma solução aleatória, gera-se um puzzle único e mínimo com
+generate_unique_puzzle e a entrada é gravada em JSON Lines. O trabalho é
+distribuído em um pool de processos.
+
+Cada puzzle usa a semente derivada de (semente do shard, índice), de modo que
+shards diferentes não se sobrepõem e qualquer shard pode ser recriado bit a bit
+(com o mesmo banco de vocabulário).
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import time
+from multiprocessing import Pool
+
+from puzzle_binary import PuzzleContainerWriter
+from puzzle_dedup import PuzzleDeduplicator, open_bloom
+from puzzle_questions import expand_entry
+from zebra_dataset_gen import DIFFICULTY_BANDS, generate_unique_puzzle, make_dataset_entry
+from zebra_seeding import derive_seed, shard_seed
+
+VOCABULARY_BANK = {
+    "Cor": ["Vermelho", "Azul", "Verde", "Amarelo", "Preto", "Branco", "Roxo", "Laranja", "Rosa", "Cinza"],
+    "Animal": ["Gato", "Cachorro", "Cavalo", "Pássaro", "Peixe", "Coelho", "Tartaruga", "Hamster", "Papagaio", "Zebra"],
+    "Bebida": ["Água", "Chá", "Café", "Leite", "Suco", "Refrigerante", "Cerveja", "Vinho", "Chocolate", "Limonada"],
+    "Profissão": ["Médico", "Professor", "Engenheiro", "Pintor", "Músico", "Advogado", "Chef", "Piloto", "Jardineiro", "Escritor"],
+    "Hobby": ["Xadrez", "Pintura", "Leitura", "Corrida", "Natação", "Dança", "Jardinagem", "Fotografia", "Culinária", "Pesca"],
+    "Nacionalidade": ["Brasileiro", "Argentino", "Português", "Japonês", "Alemão", "Francês", "Italiano", "Mexicano", "Canadense", "Sueco"],
+    "Comida": ["Pizza", "Sushi", "Feijoada", "Lasanha", "Taco", "Salada", "Churrasco", "Sopa", "Risoto", "Pastel"],
+    "Esporte": ["Futebol", "Vôlei", "Basquete", "Tênis", "Handebol", "Judô", "Surfe", "Ciclismo", "Golfe", "Rúgbi"],
+    "Instrumento": ["Violão", "Piano", "Flauta", "Bateria", "Violino", "Saxofone", "Trompete", "Harpa", "Cello", "Acordeão"],
+    "Fruta": ["Maçã", "Banana", "Manga", "Uva", "Laranja", "Abacaxi", "Morango", "Kiwi", "Pera", "Melancia"],
+    "Cidade": ["Recife", "Salvador", "Curitiba", "Manaus", "Belém", "Natal", "Fortaleza", "Goiânia", "Vitória", "Santos"],
+    "Carro": ["Fusca", "Gol", "Uno", "Civic", "Corolla", "Onix", "Kombi", "Opala", "Celta", "Palio"],
+    "Flor": ["Rosa", "Tulipa", "Girassol", "Orquídea", "Lírio", "Margarida", "Violeta", "Cravo", "Hortênsia", "Lavanda"],
+    "Planeta": ["Mercúrio", "Vênus", "Terra", "Marte", "Júpiter", "Saturno", "Urano", "Netuno", "Plutão", "Ceres"],
+}
+
+
+def load_dataset_vocabulary(pattern="datasets/*.json", min_values=3):
+    """
+    Extrai pares (atributo, valores) dos domínios gerados pela LLM em execuções anteriores.
+    Atributos com valores repetidos ou com menos de min_values valores são descartados.
+    """
+    bank = []
+    seen = set()
+    for path in sorted(glob.glob(pattern)):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if not isinstance(entries, list):
+            continue
+        for entry in entries:
+            for attr, values in (entry.get("domain") or {}).items():
+                if not isinstance(values, list) or len(values) < min_values:
+                    continue
+                values = [str(v) for v in values]
+                if len(set(values)) != len(values):
+                    continue
+                key = (attr, tuple(sorted(values)))
+                if key not in seen:
+                    seen.add(key)
+                    bank.append((attr, values))
+    return bank
+
+
+def build_vocabulary(vocab_path=None, include_datasets=True):
+    """Monta o banco de vocabulário como uma lista de pares (atributo, valores)."""
+    if vocab_path:
+        with open(vocab_path, "r", encoding="utf-8") as f:
+            bank = list(json.load(f).items())
+    else:
+        bank = list(VOCABULARY_BANK.items())
+    if include_datasets:
+        bank.extend(load_dataset_vocabulary())
+    return bank
+
+
+def sample_domain(bank, dimension, n_attributes, rng):
+    """
+    Sorteia n_attributes atributos distintos com pelo menos `dimension` valores e
+    `dimension` valores de cada um. Retorna None se o banco não for suficiente.
+    """
+    eligible = [(attr, values) for attr, values in bank if len(values) >= dimension]
+    rng.shuffle(eligible)
+    domain = {}
+    for attr, values in eligible:
+        if attr in domain:
+            continue
+        domain[attr] = rng.sample(values, dimension)
+        if len(domain) == n_attributes:
+            return domain
+    return None
+
+
+def sample_solution(domain, dimension, rng):
+    """Sorteia uma solução: uma permutação independente dos valores de cada atributo."""
+    columns = {attr: rng.sample(values, dimension) for attr, values in domain.items()}
+    return [{attr: columns[attr][i] for attr in domain} for i in range(dimension)]
+
+
+def build_entry(domain, solution, rng, clue_counts=None):
+    """Gera o puzzle único e mínimo e monta a entrada no formato do dataset."""
+    dimension = len(solution)
+    clue_counts = clue_counts or {"easy": dimension, "medium": dimension, "hard": dimension}
+    puzzle = generate_unique_puzzle(solution, domain, clue_counts, rng)
+    if puzzle is None or not puzzle["deduction"]:
+        return None
+    return make_dataset_entry(domain, solution, puzzle)
+
+
+_WORKER_BANK = None
+
+
+def _init_worker(bank):
+    global _WORKER_BANK
+    _WORKER_BANK = bank
+
+
+def _factory_task(task):
+    """
+    Tarefa executada em cada processo: (semente, dimensões, nº de atributos, faixa de
+    dificuldade, orçamento) -> entrada. Com uma faixa, novos tamanhos, domínios e
+    soluções são sorteados até que o puzzle caia nela ou o orçamento se esgote
+    (amostragem por rejeição). O tamanho pesa muito na dificuldade, então a
+    distribuição de tamanhos dentro de cada faixa acompanha a faixa.
+    """
+    seed, dimensions, attribute_counts, band, budget = task
+    rng = random.Random(seed)
+    for _ in range(budget if band is not None else 1):
+        dimension = rng.choice(dimensions)
+        n_attributes = rng.choice(attribute_counts)
+        domain = sample_domain(_WORKER_BANK, dimension, n_attributes, rng)
+        if domain is None:
+            continue
+        solution = sample_solution(domain, dimension, rng)
+        entry = build_entry(domain, solution, rng)
+        if entry is None or (band is not None and entry["difficulty"]["band"] != band):
+            continue
+        entry["seed"] = seed
+        return entry
+    return None
+
+
+def run_factory(total, output, dimensions=(3, 4, 5), attribute_counts=(3, 4, 5),
+                workers=None, seed=0, vocab_path=None, include_datasets=True, chunksize=64, shard=0,
+                dedup=True, bloom_path=None, band=None, band_budget=20, questions=0, binary_path=None,
+                max_tasks=None):
+    """
+    Gera puzzles em paralelo até gravar `total` em `output` (JSON Lines), na ordem
+    das tarefas, para que a saída do shard seja reproduzível. Puzzles estruturalmente
+    repetidos são descartados; com bloom_path o filtro de Bloom é compartilhado
+    entre shards (carregado antes e salvo depois da execução). Com `band`, só são
+    gravados puzzles da faixa de dificuldade (até band_budget tentativas por tarefa).
+    Os descartes são repostos por novas tarefas, até max_tasks (padrão 10 * total)
+    tarefas no total; se o limite for atingido, menos de `total` puzzles são gravados.
+    Com questions > 0, cada puzzle é gravado como `questions` amostras pergunta/resposta.
+    Com binary_path, os puzzles também são gravados no contêiner binário de
+    puzzle_binary (domínio, pistas e solução), para recarga e re-resolução rápidas.
+    Retorna o número de puzzles gravados.
+    """
+    bank = build_vocabulary(vocab_path, include_datasets)
+    bloom = open_bloom(bloom_path) if bloom_path else None
+    deduplicator = PuzzleDeduplicator(bloom) if dedup or bloom is not None else None
+    base = shard_seed(seed, shard)
+    max_tasks = max_tasks if max_tasks is not None else 10 * total
+    directory = os.path.dirname(output)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    written = 0
+    tasks_done = 0
+    start = time.time()
+    binary = PuzzleContainerWriter(binary_path) if binary_path else None
+    with open(output, "w", encoding="utf-8") as f, \
+            Pool(processes=workers, initializer=_init_worker, initargs=(bank,)) as pool:
+        # Rodadas de tarefas com folga para os descartes; a tarefa i sempre usa a
+        # semente derivada de i, então a saída não depende do tamanho das rodadas
+        while written < total and tasks_done < max_tasks:
+            first = tasks_done
+            count = min(max(2 * (total - written), chunksize), max_tasks - first)
+            tasks = ((derive_seed(base, i), tuple(dimensions), tuple(attribute_counts), band, band_budget)
+                     for i in range(first, first + count))
+            for entry in pool.imap(_factory_task, tasks, chunksize=chunksize):
+                tasks_done += 1
+                if entry is None:
+                    continue
+                if deduplicator is not None and deduplicator.is_duplicate(entry):
+                    continue
+                if questions > 0:
+                    rng = random.Random(derive_seed(entry["seed"], "questions"))
+                    for sample in expand_entry(entry, questions, rng):
+                        f.write(json.dumps(sample, ensure_ascii=False) + "\n")
+                else:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                if binary is not None:
+                    binary.append(entry)
+                written += 1
+                if written >= total:
+                    break
+    if binary is not None:
+        binary.close()
+    elapsed = time.time() - start
+    rate = written / elapsed if elapsed > 0 else float("inf")
+    print(f"{written} puzzles gravados em '{output}' em {elapsed:.1f}s ({rate:.0f} puzzles/s, "
+          f"{tasks_done} tarefas).")
+    if written < total:
+        print(f"Limite de {max_tasks} tarefas atingido: {written} de {total} puzzles gravados.")
+    if binary is not None:
+        print(f"Contêiner binário gravado em '{binary_path}'.")
+    if deduplicator is not None:
+        print(f"{deduplicator.duplicates} puzzles duplicados descartados.")
+    if bloom is not None:
+        bloom.save(bloom_path)
+    return written
+
+
+def add_factory_arguments(parser):
+    """Argumentos de linha de comando do modo fábrica (reutilizados por outros scripts)."""
+    parser.add_argument("--total", type=int, default=1000,
+                        help="Número de puzzles a gravar (descartados são repostos por novas tarefas)")
+    parser.add_argument("--max-tasks", type=int, default=None,
+                        help="Limite de tarefas para repor os descartes (padrão: 10 * --total)")
+    parser.add_argument("--output", type=str, default="datasets/factory_puzzles.jsonl",
+                        help="Arquivo JSON Lines de saída")
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[3, 4, 5],
+                        help="Dimensões possíveis (número de itens)")
+    parser.add_argument("--attributes", type=int, nargs="+", default=[3, 4, 5],
+                        help="Quantidades possíveis de atributos")
+    parser.add_argument("--workers", type=int, default=None, help="Processos no pool (padrão: nº de CPUs)")
+    parser.add_argument("--seed", type=int, default=0, help="Semente base")
+    parser.add_argument("--shard", type=int, default=0,
+                        help="Índice do shard (a semente do shard é derivada da semente base e do índice)")
+    parser.add_argument("--vocab", type=str, default=None,
+                        help="Arquivo JSON {atributo: [valores]} substituindo o banco embutido")
+    parser.add_argument("--no-datasets", action="store_true",
+                        help="Não usar os domínios gerados pela LLM em datasets/")
+    parser.add_argument("--difficulty", choices=sorted(DIFFICULTY_BANDS), default=None,
+                        help="Faixa de dificuldade desejada (medida pelo esforço do solver)")
+    parser.add_argument("--difficulty-budget", type=int, default=20,
+                        help="Tentativas por puzzle para atingir a faixa de dificuldade")
+    parser.add_argument("--questions", type=int, default=0,
+                        help="Gravar cada puzzle como N amostras pergunta/resposta (0: uma entrada por puzzle)")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Não descartar puzzles estruturalmente duplicados")
+    parser.add_argument("--bloom", type=str, default=None,
+                        help="Filtro de Bloom compartilhado entre shards para a deduplicação")
+    parser.add_argument("--binary", type=str, default=None,
+                        help="Também grava os puzzles neste contêiner binário (.zbp; ver puzzle_binary --verify)")
+
+
+def run_from_args(args):
+    return run_factory(args.total, args.output, args.dimensions, args.attributes,
+                       args.workers, args.seed, args.vocab, not args.no_datasets, shard=args.shard,
+                       dedup=not args.no_dedup, bloom_path=args.bloom,
+                       band=args.difficulty, band_budget=args.difficulty_budget,
+                       questions=args.questions, binary_path=args.binary, max_tasks=args.max_tasks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera puzzles únicos e mínimos sem chamar a LLM.")
+    add_factory_arguments(parser)
+    run_from_args(parser.parse_args())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 import sys
-from call_llm import call_llm
+from call_llm import call_llm, LLMError
 
 def main():
     # Se o usuário não informar tema, usa um padrão.
@@ -16,7 +16,11 @@ def main():
         "2) Lista de restrições (dicas) que conectam os atributos."
     )
     
-    resposta = call_llm(prompt)
+    try:
+        resposta = call_llm(prompt)
+    except LLMError as e:
+        print(f"Falha na chamada à LLM: {e}")
+        sys.exit(1)
     print("Resposta da LLM para geração do puzzle:")
     print(resposta)
 
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Expansão de um puzzle resolvido em vários pares pergunta/resposta.
+
+extract_feedback_info gera uma única pergunta por puzzle, a partir do último passo
+dedutivo. Aqui as perguntas são derivadas diretamente da solução estruturada, em
+vários tipos (atributo de um item, item com um valor, mesmo item, vizinhança,
+esquerda/direita, ordem), e cada puzzle resolvido vira N amostras de treino.
+
+Todas as amostras de um puzzle compartilham o mesmo prefixo (o enunciado); só a
+pergunta final muda, o que também favorece o cache de prefixo na inferência.
+O formato das amostras é o mesmo das entradas do dataset, com os campos extras
+"question_type", "answer" e "puzzle_id".
+"""
+import argparse
+import json
+import random
+
+from puzzle_dedup import entry_hash, iter_entries
+
+
+def _pick_cell(solution, rng):
+    """Sorteia (índice do item, atributo, valor)."""
+    i = rng.randrange(len(solution))
+    attr = rng.choice(list(solution[i]))
+    return i, attr, solution[i][attr]
+
+
+def _other_attribute(solution, attr, rng):
+    others = [a for a in solution[0] if a != attr]
+    return rng.choice(others) if others else None
+
+
+def question_attribute_of_item(solution, rng):
+    i, attr, value = _pick_cell(solution, rng)
+    return (f"Com base na dedução, qual é o {attr} do item {i + 1}?",
+            f"O {attr} do item {i + 1} é {value}.")
+
+
+def question_item_with_value(solution, rng):
+    i, attr, value = _pick_cell(solution, rng)
+    return (f"Com base na dedução, qual item tem {attr} igual a {value}?",
+            f"O item {i + 1} tem {attr} igual a {value}.")
+
+
+def question_same_item(solution, rng):
+    i, attr, value = _pick_cell(solution, rng)
+    other = _other_attribute(solution, attr, rng)
+    if other is None:
+        return None
+    return (f"Com base na dedução, qual é o {other} do item que tem {attr} igual a {value}?",
+            f"O item com {attr} igual a {value} tem {other} igual a {solution[i][other]}.")
+
+
+def _question_adjacent(solution, rng, offset, side):
+    i, attr, value = _pick_cell(solution, rng)
+    other = _other_attribute(solution, attr, rng) or attr
+    j = i + offset
+    question = (f"Com base na dedução, qual é o {other} do item imediatamente à {side} "
+                f"do item com {attr} igual a {value}?")
+    if 0 <= j < len(solution):
+        answer = f"O item imediatamente à {side} (item {j + 1}) tem {other} igual a {solution[j][other]}."
+    else:
+        answer = f"Nenhum: o item com {attr} igual a {value} é o item {i + 1}, sem item à {side}."
+    return question, answer
+
+
+def question_left_of(solution, rng):
+    return _question_adjacent(solution, rng, -1, "esquerda")
+
+
+def question_right_of(solution, rng):
+    return _question_adjacent(solution, rng, +1, "direita")
+
+
+def question_neighbors(solution, rng):
+    i, attr, value = _pick_cell(solution, rng)
+    other = _other_attribute(solution, attr, rng) or attr
+    neighbors = [j for j in (i - 1, i + 1) if 0 <= j < len(solution)]
+    values = [f"{solution[j][other]} (item {j + 1})" for j in neighbors]
+    if not values:
+        return None
+    if len(values) > 1:
+        answer = f"Os vizinhos têm {other} igual a " + " e ".join(values) + "."
+    else:
+        answer = f"O único vizinho tem {other} igual a {values[0]}."
+    return (f"Com base na dedução, quais são os valores de {other} dos vizinhos do item "
+            f"com {attr} igual a {value}?", answer)
+
+
+def question_before(solution, rng):
+    if len(solution) < 2:
+        return None
+    i, attr, value = _pick_cell(solution, rng)
+    j = rng.choice([k for k in range(len(solution)) if k != i])
+    other = rng.choice(list(solution[j]))
+    other_value = solution[j][other]
+    verdict = "Sim" if i < j else "Não"
+    return (f"Com base na dedução, o item com {attr} igual a {value} está à esquerda do item "
+            f"com {other} igual a {other_value}?",
+            f"{verdict}: o item com {attr} igual a {value} é o item {i + 1} e o item com "
+            f"{other} igual a {other_value} é o item {j + 1}.")
+
+
+QUESTION_TYPES = {
+    "atributo_do_item": question_attribute_of_item,
+    "item_com_valor": question_item_with_value,
+    "mesmo_item": question_same_item,
+    "a_esquerda": question_left_of,
+    "a_direita": question_right_of,
+    "vizinhos": question_neighbors,
+    "ordem": question_before,
+}
+
+
+def generate_questions(solution, count, rng=None, types=None, max_draws=None):
+    """
+    Sorteia até `count` perguntas distintas, alternando entre os tipos pedidos
+    (padrão: todos) em ordem aleatória. Retorna uma lista de (tipo, pergunta, resposta).
+    """
+    rng = rng or random
+    types = list(types or QUESTION_TYPES)
+    # Ordem dos tipos sorteada por puzzle: com poucas perguntas, nenhum tipo fica sempre de fora
+    rng.shuffle(types)
+    max_draws = max_draws if max_draws is not None else 10 * count
+    questions = []
+    seen = set()
+    for draw in range(max_draws):
+        if len(questions) >= count:
+            break
+        qtype = types[draw % len(types)]
+        generated = QUESTION_TYPES[qtype](solution, rng)
+        if generated is None or generated[0] in seen:
+            continue
+        seen.add(generated[0])
+        questions.append((qtype,) + generated)
+    return questions
+
+
+def format_solution(solution):
+    return "\n".join(f"Item {i}: " + ", ".join(f"{k}: {v}" for k, v in item.items())
+                     for i, item in enumerate(solution, start=1))
+
+
+def expand_entry(entry, count, rng=None, types=None):
+    """
+    Expande uma entrada do dataset em até `count` amostras, uma por pergunta, todas
+    com o mesmo enunciado como prefixo e a pergunta no final.
+    """
+    solution = entry.get("solution")
+    if not solution:
+        return []
+    prefix = (entry.get("enunciado") or "").split("\n\nPergunta Retroalimentada:")[0]
+    solution_str = format_solution(solution)
+    puzzle_id = entry_hash(entry)
+    samples = []
+    for qtype, question, answer in generate_questions(solution, count, rng, types):
+        sample = dict(entry)
+        sample.update({
+            "enunciado": prefix + "\n\nPergunta Retroalimentada: " + question,
+            "feedback_question": question,
+            "correct_answer": f"Solução Final:\n{solution_str}\n\nResposta: {answer}",
+            "question_type": qtype,
+            "answer": answer,
+            "puzzle_id": puzzle_id,
+        })
+        samples.append(sample)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Expande cada puzzle resolvido em vários pares pergunta/resposta.")
+    parser.add_argument("inputs", nargs="+", help="Arquivos .json (lista) ou .jsonl de entrada")
+    parser.add_argument("-o", "--output", required=True, help="Arquivo JSON Lines de saída")
+    parser.add_argument("--questions", type=int, default=8, help="Perguntas por puzzle")
+    parser.add_argument("--types", nargs="+", choices=sorted(QUESTION_TYPES), default=None,
+                        help="Tipos de pergunta (padrão: todos)")
+    parser.add_argument("--seed", type=int, default=None, help="Semente do sorteio das perguntas")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    written = 0
+    with open(args.output, "w", encoding="utf-8") as out:
+        for path in args.inputs:
+            for entry in iter_entries(path):
+                for sample in expand_entry(entry, args.questions, rng, args.types):
+                    out.write(json.dumps(sample, ensure_ascii=False) + "\n")
+                    written += 1
+    print(f"{written} amostras gravadas em '{args.output}'.")
+
+
+if __name__ == '__main__':
+    main()
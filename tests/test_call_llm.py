@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+from call_llm import CircuitBreaker, LLMCircuitOpenError
+
+
+def test_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == "fechado"
+    breaker.record_failure()
+    assert breaker.state == "aberto" and not breaker.allows()
+    with pytest.raises(LLMCircuitOpenError):
+        breaker.before_call()
+
+
+def test_success_resets_failures():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "fechado"
+
+
+def test_half_open_allows_one_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.state == "meio-aberto" and breaker.allows()
+    breaker.before_call()
+    assert not breaker.allows()
+    with pytest.raises(LLMCircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "fechado"
+
+
+def test_failed_trial_reopens():
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=0.05)
+    for _ in range(5):
+        breaker.record_failure()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "aberto"
+
+
+def test_released_trial_can_be_retried():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.release_trial()
+    assert breaker.state == "meio-aberto" and breaker.allows()
+    breaker.before_call()
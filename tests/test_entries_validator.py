@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from call_llm import LLMValidationError
+from zebra_dataset_gen import EntriesStreamValidator
+
+DOMAIN = {"Cor": ["Azul", "Verde"], "Animal": ["Gato", "Cão"]}
+SOLUTION = [{"Cor": "Azul", "Animal": "Gato"}, {"Cor": "Verde", "Animal": "Cão"}]
+
+
+def feed(text, dimension=2, n_attributes=2, chunk=3):
+    validator = EntriesStreamValidator(dimension, n_attributes)
+    for i in range(0, len(text), chunk):
+        validator(text[i:i + chunk])
+    return validator
+
+
+def test_valid_entries_pass():
+    validator = feed("Aqui está:\n" + json.dumps({"domain": DOMAIN, "solution": SOLUTION}))
+    assert validator.parser.done
+
+
+@pytest.mark.parametrize("entries", [
+    {"domain": {"Cor": ["Azul", "Azul"], "Animal": ["Gato", "Cão"]}, "solution": SOLUTION},
+    {"domain": {"Cor": ["Azul", "Verde"]}, "solution": SOLUTION},
+    {"domain": DOMAIN, "solution": SOLUTION + [{"Cor": "Roxo", "Animal": "Rato"}]},
+    {"domain": DOMAIN, "solution": [{"Cor": "Azul", "Animal": "Gato"}, {"Cor": "Azul", "Animal": "Cão"}]},
+    {"domain": DOMAIN, "solution": [{"Cor": "Azul", "Animal": "Gato"}, {"Cor": "Verde"}]},
+    # JSON válido, mas com a forma errada
+    {"domain": DOMAIN, "solution": {"0": {"Cor": "Azul", "Animal": "Gato"}}},
+    {"domain": DOMAIN, "solution": ["Azul", "Verde"]},
+    {"domain": DOMAIN, "solution": [["Azul", "Gato"], ["Verde", "Cão"]]},
+    {"domain": DOMAIN, "solution": "Azul, Verde"},
+    {"domain": [["Azul", "Verde"], ["Gato", "Cão"]], "solution": SOLUTION},
+    {"domain": {"Cor": "Azul", "Animal": ["Gato", "Cão"]}, "solution": SOLUTION},
+])
+def test_invalid_entries_raise_validation_error(entries):
+    with pytest.raises(LLMValidationError):
+        feed(json.dumps(entries))
+
+
+def test_broken_json_raises_validation_error():
+    with pytest.raises(LLMValidationError):
+        feed('{"domain": {"Cor": ["Azul" "Verde"]}}')
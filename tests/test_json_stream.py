@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from json_stream import IncrementalJSONParser
+
+DOCUMENT = {"a": [1, -2.5e3, True, None, {"b": "x\"yé\\n"}], "c": {}, "d": [], "e": "fim"}
+
+
+def parse(text, chunk):
+    parser = IncrementalJSONParser()
+    events = []
+    for i in range(0, len(text), chunk):
+        events.extend(parser.feed(text[i:i + chunk]))
+    return parser, events
+
+
+@pytest.mark.parametrize("chunk", [1, 2, 3, 7, 1000])
+def test_valid_stream(chunk):
+    text = "Resposta:\n" + json.dumps(DOCUMENT, ensure_ascii=False) + "\nFim."
+    parser, events = parse(text, chunk)
+    assert parser.done and parser.result == DOCUMENT
+    assert events[0] == ("start", (), parser.result)
+    assert events[-1] == ("end", (), parser.result)
+    values = {path: value for kind, path, value in events if kind == "value"}
+    assert values[("a", 1)] == -2500.0
+    assert values[("a", 4, "b")] == DOCUMENT["a"][4]["b"]
+    assert values[("e",)] == "fim"
+
+
+def test_events_arrive_before_document_ends():
+    parser = IncrementalJSONParser()
+    events = parser.feed('{"solution": [{"Cor": "Azul"}, ')
+    assert ("value", ("solution", 0, "Cor"), "Azul") in events
+    assert ("end", ("solution", 0), {"Cor": "Azul"}) in events
+    assert not parser.done
+
+
+@pytest.mark.parametrize("text", [
+    '{"a" 1}',
+    '{"a": 1,}',
+    '{"a": 1]',
+    '[1, 2}',
+    '{"a": tru}',
+    '{1: 2}',
+    '[1 2]',
+    '{"a": @}',
+    '{"a": "\\x"}',
+    '[,1]',
+])
+def test_invalid_stream(text):
+    with pytest.raises(ValueError):
+        parse(text, 1)
@@ -0,0 +1,26 @@
+from call_llm import _cache_put
+from llm_cache import LLMCache, is_cacheable
+
+PAYLOAD = {"model": "m", "prompt": "p", "temperature": 0.2, "options": {"seed": 1}}
+
+
+def test_only_seeded_calls_are_cacheable():
+    assert is_cacheable(0.2, seed=1)
+    assert is_cacheable(1.4, seed=0)
+    assert not is_cacheable(0.0)
+    assert not is_cacheable(None)
+
+
+def test_put_and_get(tmp_path):
+    cache = LLMCache(str(tmp_path))
+    assert cache.get(PAYLOAD) is None
+    cache.put(PAYLOAD, "resposta")
+    assert cache.get(PAYLOAD) == "resposta"
+    assert cache.get(dict(PAYLOAD, prompt="outro")) is None
+
+
+def test_failed_write_does_not_raise(tmp_path, capsys):
+    blocker = tmp_path / "arquivo"
+    blocker.write_text("")
+    _cache_put(LLMCache(str(blocker / "cache")), PAYLOAD, "resposta")
+    assert "cache" in capsys.readouterr().out
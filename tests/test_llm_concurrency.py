@@ -0,0 +1,66 @@
+import asyncio
+
+from llm_concurrency import AdaptiveLimiter
+
+
+class Transient(Exception):
+    retryable = True
+
+
+def run_calls(limiter, n, duration, fail=()):
+    peak = [0]
+
+    async def call(i):
+        async with limiter:
+            peak[0] = max(peak[0], limiter.in_flight)
+            assert limiter.in_flight <= limiter.current_limit
+            await asyncio.sleep(duration)
+            if i in fail:
+                raise Transient()
+
+    async def run():
+        return await asyncio.gather(*(call(i) for i in range(n)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    return peak[0], results
+
+
+def test_in_flight_never_exceeds_limit():
+    limiter = AdaptiveLimiter(max_limit=3, initial=3)
+    peak, _ = run_calls(limiter, 20, 0.005)
+    assert peak == 3
+    assert limiter.in_flight == 0
+    assert limiter.stats["completed"] == 20
+
+
+def test_limit_grows_while_throughput_improves():
+    # Latência constante: mais chamadas simultâneas sempre aumentam a vazão
+    limiter = AdaptiveLimiter(max_limit=6, initial=1)
+    run_calls(limiter, 60, 0.01)
+    assert limiter.current_limit > 1
+    assert limiter.stats["increases"] > 0
+    assert any(entry["action"] == "aumento" for entry in limiter.history)
+
+
+def test_retryable_error_decreases_limit():
+    limiter = AdaptiveLimiter(max_limit=8, initial=8)
+    _, results = run_calls(limiter, 8, 0.005, fail={0, 1, 2})
+    assert sum(isinstance(r, Transient) for r in results) == 3
+    assert limiter.stats["errors"] == 3
+    # Uma única redução por janela, mesmo com várias falhas
+    assert limiter.current_limit == 5
+    assert limiter.stats["decreases"] == 1
+
+
+def test_non_retryable_error_keeps_limit():
+    limiter = AdaptiveLimiter(max_limit=4, initial=4)
+
+    async def run():
+        try:
+            async with limiter:
+                raise KeyError("x")
+        except KeyError:
+            pass
+
+    asyncio.run(run())
+    assert limiter.current_limit == 4 and limiter.stats["errors"] == 0
@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from zebra_dataset_gen import generate_unique_puzzle, minimize_clues
+from zebra_propagation import build_state
+
+
+def random_domain(dimension, n_attributes):
+    return {f"A{a}": [f"A{a}v{v}" for v in range(dimension)] for a in range(n_attributes)}
+
+
+def random_solution(rng, domain):
+    dimension = len(next(iter(domain.values())))
+    columns = {attr: rng.sample(values, dimension) for attr, values in domain.items()}
+    return [{attr: columns[attr][i] for attr in domain} for i in range(dimension)]
+
+
+def is_irreducible(domain, clues):
+    return all(build_state(domain, clues[:i] + clues[i + 1:]).count_solutions(limit=2) == 2
+               for i in range(len(clues)))
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_generated_puzzles_are_unique_and_irreducible(seed):
+    rng = random.Random(seed)
+    domain = random_domain(rng.choice([3, 4, 5]), rng.choice([3, 4]))
+    solution = random_solution(rng, domain)
+    puzzle = generate_unique_puzzle(solution, domain, {"easy": 2, "medium": 3, "hard": 3}, rng=rng)
+    clues = puzzle["constraints"]
+    solved = list(build_state(domain, clues).search(limit=2))
+    assert len(solved) == 1 and solved[0].to_solution() == solution
+    assert is_irreducible(domain, clues)
+
+
+def test_minimize_clues_removes_redundant_clues():
+    rng = random.Random(7)
+    domain = random_domain(4, 3)
+    solution = random_solution(rng, domain)
+    # Todas as pistas de posição: muito redundante
+    clues = [{"type": "position", "position": i, "attribute": attr, "value": item[attr]}
+             for i, item in enumerate(solution) for attr in domain]
+    for order in (None, list(range(len(clues)))):
+        minimal = minimize_clues(domain, clues, order=order)
+        assert len(minimal) < len(clues)
+        assert build_state(domain, minimal).count_solutions(limit=2) == 1
+        assert is_irreducible(domain, minimal)
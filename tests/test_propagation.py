@@ -0,0 +1,72 @@
+import itertools
+import random
+
+import pytest
+
+from zebra_propagation import build_state
+
+
+def random_domain(dimension, n_attributes):
+    return {f"A{a}": [f"A{a}v{v}" for v in range(dimension)] for a in range(n_attributes)}
+
+
+def random_clue(rng, domain):
+    """Pista aleatória, não necessariamente compatível com alguma solução."""
+    dimension = len(next(iter(domain.values())))
+    (a1, v1), (a2, v2) = [(attr, rng.choice(domain[attr])) for attr in rng.sample(list(domain), 2)]
+    ctype = rng.choice(["position", "direct", "ordered", "neighbor"])
+    if ctype == "position":
+        return {"type": "position", "position": rng.randrange(dimension), "attribute": a1, "value": v1}
+    if ctype == "direct":
+        return {"type": "direct", "if": {"attribute": a1, "value": v1}, "then": {"attribute": a2, "value": v2}}
+    if ctype == "neighbor":
+        return {"type": "neighbor", "if": {"attribute": a1, "value": v1},
+                "neighbor": {"attribute": a2, "value": v2}}
+    return {"type": "ordered", "left": {"attribute": a1, "value": v1},
+            "right": {"attribute": a2, "value": v2}, "immediate": rng.random() < 0.5}
+
+
+def brute_force(domain, clues):
+    """Todas as soluções, testando cada combinação de permutações."""
+    attrs = list(domain)
+    dimension = len(domain[attrs[0]])
+    solutions = []
+    for perms in itertools.product(*(itertools.permutations(domain[attr]) for attr in attrs)):
+        pos = {(attr, value): i for attr, perm in zip(attrs, perms) for i, value in enumerate(perm)}
+
+        def at(ref):
+            return pos[(ref["attribute"], ref["value"])]
+
+        ok = True
+        for clue in clues:
+            ctype = clue["type"]
+            if ctype == "position":
+                ok = pos[(clue["attribute"], clue["value"])] == clue["position"]
+            elif ctype == "direct":
+                ok = at(clue["if"]) == at(clue["then"])
+            elif ctype == "neighbor":
+                ok = abs(at(clue["if"]) - at(clue["neighbor"])) == 1
+            elif clue["immediate"]:
+                ok = at(clue["right"]) == at(clue["left"]) + 1
+            else:
+                ok = at(clue["left"]) < at(clue["right"])
+            if not ok:
+                break
+        if ok:
+            solutions.append([{attr: perm[i] for attr, perm in zip(attrs, perms)} for i in range(dimension)])
+    return solutions
+
+
+def canonical(solutions):
+    return sorted(tuple(tuple(sorted(item.items())) for item in solution) for solution in solutions)
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_engine_matches_brute_force(seed):
+    rng = random.Random(seed)
+    domain = random_domain(rng.choice([3, 4]), rng.choice([2, 3]))
+    clues = [random_clue(rng, domain) for _ in range(rng.randint(1, 7))]
+    expected = brute_force(domain, clues)
+    found = [state.to_solution() for state in build_state(domain, clues).search()]
+    assert canonical(found) == canonical(expected)
+    assert build_state(domain, clues).count_solutions(limit=2) == min(len(expected), 2)
@@ -0,0 +1,93 @@
+import json
+import random
+import struct
+
+import pytest
+
+from puzzle_binary import (PuzzleContainer, PuzzleContainerWriter, decode_puzzle, encode_puzzle,
+                           load_puzzles, save_puzzles, verify_puzzles)
+from zebra_dataset_gen import generate_unique_puzzle
+
+PUZZLE = {
+    "name": "Números",
+    "dimension": 3,
+    "domain": {"Casa": [1, 2, 3], "Dono": ["Ana", "Bia", "Caio"], "Pet": [True, False, 2.5]},
+    "constraints": [
+        {"type": "position", "position": 0, "attribute": "Dono", "value": "Ana", "difficulty": "easy"},
+        {"type": "direct", "if": {"attribute": "Casa", "value": 2}, "then": {"attribute": "Pet", "value": False}},
+        {"type": "ordered", "left": {"attribute": "Dono", "value": "Bia"},
+         "right": {"attribute": "Pet", "value": 2.5}, "immediate": True, "difficulty": "hard"},
+        {"type": "neighbor", "if": {"attribute": "Casa", "value": 1}, "neighbor": {"attribute": "Pet", "value": True}},
+    ],
+    "fixed": {2: {"Casa": 3}},
+    "solution": [
+        {"Casa": 1, "Dono": "Ana", "Pet": True},
+        {"Casa": 2, "Dono": "Bia", "Pet": False},
+        {"Casa": 3, "Dono": "Caio", "Pet": 2.5},
+    ],
+}
+
+
+def generated_puzzles(count, seed=0):
+    rng = random.Random(seed)
+    puzzles = []
+    for _ in range(count):
+        domain = {f"A{a}": [f"A{a}v{v}" for v in range(4)] for a in range(3)}
+        columns = {attr: rng.sample(values, 4) for attr, values in domain.items()}
+        solution = [{attr: columns[attr][i] for attr in domain} for i in range(4)]
+        entry = generate_unique_puzzle(solution, domain, {"easy": 2, "medium": 3, "hard": 3}, rng=rng)
+        puzzles.append({"domain": domain, "constraints": entry["constraints"], "solution": solution})
+    return puzzles
+
+
+def test_round_trip_keeps_types():
+    decoded = decode_puzzle(encode_puzzle(PUZZLE))
+    assert decoded == PUZZLE
+    # "1" (texto) e 1 (número) são entradas distintas
+    assert decode_puzzle(encode_puzzle({**PUZZLE, "name": "1"}))["name"] == "1"
+    assert [type(v) for v in decoded["domain"]["Pet"]] == [bool, bool, float]
+
+
+def test_json_fixed_keys_become_integers():
+    data = json.loads(json.dumps(PUZZLE))
+    assert decode_puzzle(encode_puzzle(data))["fixed"] == {2: {"Casa": 3}}
+
+
+def test_header_is_little_endian():
+    header = encode_puzzle(PUZZLE)[:8]
+    assert header[:4] == b"ZBP1"
+    assert struct.unpack("<HH", header[4:8]) == (2, 3)
+
+
+def test_unsupported_value_is_rejected():
+    with pytest.raises(ValueError):
+        encode_puzzle({**PUZZLE, "domain": {**PUZZLE["domain"], "Pet": [[1], 2, 3]}})
+
+
+def test_container_round_trip(tmp_path):
+    puzzles = [PUZZLE] + generated_puzzles(5)
+    path = str(tmp_path / "puzzles.zbp")
+    save_puzzles(path, puzzles)
+    assert load_puzzles(path)[0] == PUZZLE
+    with PuzzleContainer(path) as container:
+        assert len(container) == len(puzzles)
+        assert container[3] == decode_puzzle(encode_puzzle(puzzles[3]))
+        assert [p["solution"] for p in container] == [p["solution"] for p in puzzles]
+
+
+def test_verify_resolves_container(tmp_path):
+    path = str(tmp_path / "puzzles.zbp")
+    puzzles = generated_puzzles(4, seed=1)
+    wrong = dict(puzzles[0], solution=puzzles[1]["solution"])
+    with PuzzleContainerWriter(path) as writer:
+        writer.extend(puzzles)
+        writer.append(wrong)
+        writer.append(dict(puzzles[0], constraints=puzzles[0]["constraints"][:1]))
+    with PuzzleContainer(path) as container:
+        counts = verify_puzzles(container)
+    assert counts == {"unique": 4, "ambiguous": 1, "unsolvable": 0, "mismatch": 1, "invalid": 0}
+
+
+def test_invalid_record_is_rejected():
+    with pytest.raises(ValueError):
+        decode_puzzle(b"XXXX" + encode_puzzle(PUZZLE)[4:])
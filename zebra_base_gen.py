@@ -1,55 +1,7 @@
-import requests
 import json
-import traceback
+from call_llm import call_llm, LLMError
 
-OLLAMA_API_URL = "http://localhost:11434/api/generate"
-DEBUG = True
-
-def call_llm(prompt, show_tokens=True):
-    """
-    Chama a API do Ollama para gerar uma resposta a partir do prompt fornecido.
-    A resposta é processada em stream, concatenando os tokens recebidos.
-    Retorna o texto completo gerado.
-    """
-    data = {
-        "model": "mistral-small-pt",  # ou outro modelo que você prefira
-        "prompt": prompt,
-        "stream": True
-    }
-    
-    if DEBUG:
-        print(f"DEBUG: Enviando prompt para a API. Tamanho do prompt: {len(prompt)} caracteres.")
-    
-    try:
-        response = requests.post(OLLAMA_API_URL, json=data, stream=True, timeout=30)
-        if response.status_code == 200:
-            full_response = ""
-            print("\nGerando resposta da LLM:", end=" ", flush=True)
-            for line in response.iter_lines():
-                if line:
-                    try:
-                        json_response = json.loads(line)
-                    except Exception as e:
-                        if DEBUG:
-                            print(f"\nDEBUG: Erro ao decodificar JSON: {e}")
-                        continue
-                    if 'response' in json_response:
-                        token = json_response['response']
-                        full_response += token
-                        if show_tokens:
-                            print(token, end="", flush=True)
-            print()  # Nova linha ao final
-            return full_response.strip()
-        else:
-            print(f"Erro na API: Código {response.status_code}")
-            if DEBUG:
-                print(f"DEBUG: Resposta da API: {response.text}")
-            return prompt
-    except Exception as e:
-        print(f"Erro na chamada à LLM: {str(e)}")
-        if DEBUG:
-            traceback.print_exc()
-        return prompt
+MODEL = "mistral-small-pt"  # ou outro modelo que você prefira
 
 def generate_name_and_dimension():
     prompt = """
@@ -61,7 +13,7 @@ Gere a saída no seguinte formato (sem as chaves externas):
 "name": "Quebra-cabeça: Animais na Fazenda",
 "dimension": 5
 """
-    return call_llm(prompt)
+    return call_llm(prompt, model=MODEL)
 
 def generate_domain():
     prompt = """
@@ -78,7 +30,7 @@ Exemplo (a saída deve ser semelhante a isto, mas com valores diferentes):
 }
 Gere apenas o conteúdo do domain (sem a chave "domain").
 """
-    return call_llm(prompt)
+    return call_llm(prompt, model=MODEL)
 
 def generate_constraints():
     prompt = """
@@ -90,7 +42,7 @@ A lista deve conter pelo menos 6 restrições, usando os seguintes tipos:
 - "neighbor": ex.: { "type": "neighbor", "if": {"attribute": "Som", "value": "Latido"}, "neighbor": {"attribute": "Animal", "value": "Cachorro"} }
 Gere a lista completa (sem a chave "constraints").
 """
-    return call_llm(prompt)
+    return call_llm(prompt, model=MODEL)
 
 def generate_fixed():
     prompt = """
@@ -103,21 +55,25 @@ Exemplo de saída:
 }
 Gere apenas o conteúdo do fixed (sem a chave "fixed").
 """
-    return call_llm(prompt)
+    return call_llm(prompt, model=MODEL)
 
 def main():
     # Gera cada parte separadamente
-    print("\nGerando name e dimension...")
-    name_dimension = generate_name_and_dimension()
-    
-    print("\nGerando domain...")
-    domain = generate_domain()
-    
-    print("\nGerando constraints...")
-    constraints = generate_constraints()
-    
-    print("\nGerando fixed...")
-    fixed = generate_fixed()
+    try:
+        print("\nGerando name e dimension...")
+        name_dimension = generate_name_and_dimension()
+        
+        print("\nGerando domain...")
+        domain = generate_domain()
+        
+        print("\nGerando constraints...")
+        constraints = generate_constraints()
+        
+        print("\nGerando fixed...")
+        fixed = generate_fixed()
+    except LLMError as e:
+        print(f"\nFalha na chamada à LLM: {e}")
+        return
 
     # Monta o JSON final
     final_json_str = "{\n"
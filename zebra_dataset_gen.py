@@ -4,7 +4,15 @@ import copy
 import random
 import json
 import re
-from call_llm import call_llm
+import argparse
+from call_llm import (call_llm, gather_llm_sync, configure_endpoints, get_pool, preload_model, LLMError,
+                      LLMCircuitOpenError, LLMValidationError)
+from json_stream import IncrementalJSONParser
+import llm_cache
+import llm_telemetry
+from llm_concurrency import AdaptiveLimiter
+from zebra_propagation import PropagationState, ClueImplicationIndex, build_state, deduction_trace
+from zebra_seeding import derive_seed, shard_seed
 import os
 import time  # Adicionar no topo do arquivo
 
@@ -35,6 +43,57 @@ def constraint_to_text(constraint):
     else:
         return "Restrição desconhecida."
 
+# Inverso de constraint_to_text, para entradas antigas que só guardam o enunciado
+_CLUE_PATTERNS = [
+    ("position", re.compile(r"^O item (\d+) tem (.+?) igual a (.+)\.$")),
+    ("direct", re.compile(r"^Se um item tem (.+?) igual a (.+?), então esse mesmo item tem (.+?) igual a (.+)\.$")),
+    ("neighbor", re.compile(r"^Se um item tem (.+?) igual a (.+?), então pelo menos um dos itens vizinhos tem (.+?) igual a (.+)\.$")),
+    ("immediate", re.compile(r"^O item com (.+?) igual a (.+?) está imediatamente à esquerda do item com (.+?) igual a (.+)\.$")),
+    ("before", re.compile(r"^Todos os itens com (.+?) igual a (.+?) devem vir antes de um item com (.+?) igual a (.+)\.$")),
+]
+
+def text_to_constraint(text):
+    """Reconstrói a restrição a partir do texto gerado por constraint_to_text (None se não reconhecer)."""
+    text = text.strip()
+    for kind, pattern in _CLUE_PATTERNS:
+        m = pattern.match(text)
+        if not m:
+            continue
+        g = m.groups()
+        if kind == "position":
+            return {"type": "position", "position": int(g[0]) - 1, "attribute": g[1],
+                    "value": g[2], "difficulty": "easy"}
+        first = {"attribute": g[0], "value": g[1]}
+        second = {"attribute": g[2], "value": g[3]}
+        if kind == "direct":
+            return {"type": "direct", "if": first, "then": second, "difficulty": "medium"}
+        if kind == "neighbor":
+            return {"type": "neighbor", "if": first, "neighbor": second, "difficulty": "hard"}
+        return {"type": "ordered", "left": first, "right": second,
+                "immediate": kind == "immediate", "difficulty": "hard"}
+    return None
+
+def parse_enunciado_constraints(enunciado):
+    """
+    Extrai as restrições da seção "Dicas do puzzle" de um enunciado gerado por
+    generate_enunciado. Retorna None se alguma dica não puder ser reconhecida.
+    """
+    _, found, clues_text = enunciado.partition("Dicas do puzzle:")
+    if not found:
+        return None
+    constraints = []
+    for line in clues_text.splitlines():
+        m = re.match(r"^\s*\d+\.\s+(.*)$", line)
+        if not m:
+            if line.strip():
+                break
+            continue
+        constraint = text_to_constraint(m.group(1))
+        if constraint is None:
+            return None
+        constraints.append(constraint)
+    return constraints
+
 def check_constraints_param(items, constraints):
     for constraint in constraints:
         ctype = constraint["type"]
@@ -148,7 +207,12 @@ def backtrack(i, items, used, log, domain, fixed_assignments, constraints, start
         items[i] = {cat: None for cat in domain.keys()}
     return None
 
-def solve_puzzle(domain, constraints, fixed_assignments, dimension):
+def solve_puzzle_backtracking(domain, constraints, fixed_assignments, dimension, timeout=120):
+    """
+    Solucionador original: backtracking item a item sobre o produto cartesiano dos
+    valores. Cresce como (dimensão!)^atributos e só é viável para puzzles pequenos;
+    mantido como referência para os benchmarks de escala.
+    """
     items = [{cat: None for cat in domain.keys()} for _ in range(dimension)]
     for i, fixed in fixed_assignments.items():
         for cat, val in fixed.items():
@@ -159,9 +223,26 @@ def solve_puzzle(domain, constraints, fixed_assignments, dimension):
             used[cat].add(val)
     log = []
     start_time = time.time()
-    solution = backtrack(0, items, used, log, domain, fixed_assignments, constraints, start_time)
-    if solution is None and time.time() - start_time >= 2:
-        log.append("Timeout: O backtracking excedeu o tempo limite de 2 segundos")
+    solution = backtrack(0, items, used, log, domain, fixed_assignments, constraints, start_time, timeout)
+    if solution is None and time.time() - start_time >= timeout:
+        log.append(f"Timeout: O backtracking excedeu o tempo limite de {timeout} segundos")
+    return solution, log
+
+def solve_puzzle(domain, constraints, fixed_assignments, dimension):
+    """
+    Resolve o puzzle com o motor de propagação, que escala para 8-10 itens e 6-8
+    atributos. Domínios que o motor não aceita (valores repetidos ou em número
+    diferente da dimensão) caem no backtracking original.
+    """
+    try:
+        state = build_state(domain, constraints, fixed_assignments, dimension)
+    except (ValueError, KeyError):
+        return solve_puzzle_backtracking(domain, constraints, fixed_assignments, dimension)
+    solution = state.solve()
+    stats = state.stats
+    log = [f"Propagação: {stats['rounds']} rodadas, {stats['branches']} ramificações, "
+           f"{stats['backtracks']} retrocessos."]
+    log.append("Solução completa encontrada!" if solution is not None else "Nenhuma solução encontrada.")
     return solution, log
 
 def generate_enunciado(puzzle_name, dimension, domain, constraints):
@@ -241,6 +322,155 @@ def generate_candidate_clues(solution, domain):
                         candidates.append(clue)
     return candidates
 
+CLUE_TIERS = ("easy", "medium", "hard")
+
+def clue_tier_size(dimension, n_attributes, tier):
+    """Número de pistas distintas (antes da deduplicação) de um nível de dificuldade."""
+    pairs = n_attributes * (n_attributes - 1)
+    if tier == "easy":
+        return dimension * n_attributes
+    elif tier == "medium":
+        return dimension * pairs
+    elif tier == "hard":
+        return 3 * max(dimension - 1, 0) * pairs
+    raise ValueError("Nível de dificuldade desconhecido: " + tier)
+
+def clue_from_index(solution, attributes, tier, index):
+    """
+    Constrói a pista de índice `index` dentro do espaço de pistas do nível `tier`,
+    lendo os valores diretamente da solução (sem gerar as demais pistas).
+    """
+    n_attrs = len(attributes)
+    if tier == "easy":
+        i, a = divmod(index, n_attrs)
+        attr = attributes[a]
+        return {"type": "position", "position": i, "attribute": attr,
+                "value": solution[i][attr], "difficulty": "easy"}
+
+    pairs = n_attrs * (n_attrs - 1)
+
+    def attr_pair(p):
+        a1, a2 = divmod(p, n_attrs - 1)
+        if a2 >= a1:
+            a2 += 1
+        return attributes[a1], attributes[a2]
+
+    if tier == "medium":
+        i, p = divmod(index, pairs)
+        attr1, attr2 = attr_pair(p)
+        return {"type": "direct",
+                "if": {"attribute": attr1, "value": solution[i][attr1]},
+                "then": {"attribute": attr2, "value": solution[i][attr2]},
+                "difficulty": "medium"}
+
+    n_ordered = (len(solution) - 1) * pairs
+    if index < n_ordered:
+        i, p = divmod(index, pairs)
+        attr1, attr2 = attr_pair(p)
+        return {"type": "ordered",
+                "left": {"attribute": attr1, "value": solution[i][attr1]},
+                "right": {"attribute": attr2, "value": solution[i+1][attr2]},
+                "immediate": True,
+                "difficulty": "hard"}
+    edge, rest = divmod(index - n_ordered, 2 * pairs)
+    direction, p = divmod(rest, pairs)
+    attr1, attr2 = attr_pair(p)
+    i, j = (edge, edge + 1) if direction == 0 else (edge + 1, edge)
+    return {"type": "neighbor",
+            "if": {"attribute": attr1, "value": solution[i][attr1]},
+            "neighbor": {"attribute": attr2, "value": solution[j][attr2]},
+            "difficulty": "hard"}
+
+def clue_key(clue):
+    """
+    Chave canônica de uma pista. Como cada valor ocupa um único item, as pistas
+    "direct" e "neighbor" são simétricas e A→B equivale a B→A.
+    """
+    ctype = clue["type"]
+    if ctype == "position":
+        return (ctype, clue["position"], clue["attribute"], clue["value"])
+    elif ctype == "direct":
+        return (ctype, frozenset([(clue["if"]["attribute"], clue["if"]["value"]),
+                                  (clue["then"]["attribute"], clue["then"]["value"])]))
+    elif ctype == "neighbor":
+        return (ctype, frozenset([(clue["if"]["attribute"], clue["if"]["value"]),
+                                  (clue["neighbor"]["attribute"], clue["neighbor"]["value"])]))
+    elif ctype == "ordered":
+        return (ctype, clue["left"]["attribute"], clue["left"]["value"],
+                clue["right"]["attribute"], clue["right"]["value"], clue.get("immediate", False))
+    return (ctype, json.dumps(clue, sort_keys=True, ensure_ascii=False))
+
+def _random_indices(size, rng):
+    """
+    Percorre range(size) em ordem aleatória sem materializar a permutação enquanto
+    a maior parte dos índices ainda não foi sorteada.
+    """
+    seen = set()
+    while len(seen) < size // 2:
+        index = rng.randrange(size)
+        if index not in seen:
+            seen.add(index)
+            yield index
+    rest = [index for index in range(size) if index not in seen]
+    rng.shuffle(rest)
+    yield from rest
+
+def iter_candidate_clues(solution, domain, tiers=CLUE_TIERS, rng=None):
+    """
+    Versão preguiçosa de generate_candidate_clues: produz as pistas candidatas em ordem
+    aleatória, alternando entre os níveis de dificuldade, sem repetir pistas equivalentes.
+    Cada pista é construída apenas quando consumida.
+    """
+    rng = rng or random
+    attributes = list(domain.keys())
+    M = len(solution)
+    streams = []
+    for tier in tiers:
+        size = clue_tier_size(M, len(attributes), tier)
+        if size > 0:
+            streams.append((tier, _random_indices(size, rng)))
+    seen = set()
+    while streams:
+        for stream in list(streams):
+            tier, indices = stream
+            for index in indices:
+                clue = clue_from_index(solution, attributes, tier, index)
+                key = clue_key(clue)
+                if key not in seen:
+                    seen.add(key)
+                    yield clue
+                    break
+            else:
+                streams.remove(stream)
+
+def sample_candidate_clues(solution, domain, clue_counts, rng=None):
+    """
+    Amostragem estratificada: sorteia diretamente clue_counts[nível] pistas distintas
+    de cada nível, construindo apenas as pistas sorteadas.
+    """
+    rng = rng or random
+    attributes = list(domain.keys())
+    M = len(solution)
+    selected = []
+    seen = set()
+    for tier in CLUE_TIERS:
+        wanted = clue_counts.get(tier, 0)
+        if wanted <= 0:
+            continue
+        size = clue_tier_size(M, len(attributes), tier)
+        taken = 0
+        for index in _random_indices(size, rng):
+            if taken >= wanted:
+                break
+            clue = clue_from_index(solution, attributes, tier, index)
+            key = clue_key(clue)
+            if key in seen:
+                continue
+            seen.add(key)
+            selected.append(clue)
+            taken += 1
+    return selected
+
 def generate_logical_deduction(selected_clues):
     difficulty_order = {"easy": 1, "medium": 2, "hard": 3}
     sorted_clues = sorted(selected_clues, key=lambda clue: difficulty_order.get(clue.get("difficulty", "medium"), 2))
@@ -249,17 +479,55 @@ def generate_logical_deduction(selected_clues):
         deduction_steps.append(f"{i}. {constraint_to_text(clue)}")
     return deduction_steps
 
-def generate_puzzle(solution, domain, clue_counts):
-    candidates = generate_candidate_clues(solution, domain)
-    random.shuffle(candidates)
-    clues_easy = [c for c in candidates if c.get("difficulty") == "easy"]
-    clues_medium = [c for c in candidates if c.get("difficulty") == "medium"]
-    clues_hard = [c for c in candidates if c.get("difficulty") == "hard"]
-    
-    selected_clues = []
-    selected_clues.extend(clues_easy[:clue_counts.get("easy", 0)])
-    selected_clues.extend(clues_medium[:clue_counts.get("medium", 0)])
-    selected_clues.extend(clues_hard[:clue_counts.get("hard", 0)])
+def join_numbers(numbers):
+    """[1, 3, 4] -> "1, 3 e 4"."""
+    numbers = [str(n) for n in numbers]
+    return numbers[0] if len(numbers) == 1 else ", ".join(numbers[:-1]) + " e " + numbers[-1]
+
+def generate_deduction_chain(steps, clues):
+    """
+    Converte os passos registrados pelo motor de propagação (deduction_trace) em
+    texto: cada linha afirma uma célula deduzida e justifica com a dica, a eliminação
+    dentro do atributo ou a exclusão de casos que a fixou, citando as dicas que
+    sustentam a dedução, na ordem em que ocorreram. As dicas são numeradas como no
+    enunciado.
+    """
+    clue_numbers = {id(clue): i for i, clue in enumerate(clues, start=1)}
+    deduction_steps = []
+    for i, step in enumerate(steps, start=1):
+        item = step["position"] + 1
+        line = f"{i}. O item {item} tem {step['attribute']} igual a {step['value']}."
+        support = sorted(n for n in (clue_numbers.get(id(c)) for c in step.get("support", [])) if n)
+        reason = step["reason"]
+        if reason == "clue":
+            clue = step["constraint"]
+            number = clue_numbers.get(id(clue))
+            others = [n for n in support if n != number]
+            prefix = f"Pela dica {number}" if number else "Pela dica"
+            if not others:
+                if clue["type"] == "position":
+                    line += f" Dado {prefix.lower()}."
+                else:
+                    line += f" {prefix}: {constraint_to_text(clue)}"
+            else:
+                line += (f" {prefix}, combinada com {'a dica' if len(others) == 1 else 'as dicas'} "
+                         f"{join_numbers(others)}: {constraint_to_text(clue)}")
+        elif reason in ("elimination", "unique_slot"):
+            if reason == "elimination":
+                line += (f" As demais posições já foram descartadas ou pertencem a outros "
+                         f"valores de {step['detail']}")
+            else:
+                line += f" Nenhum outro valor de {step['detail']} ainda é possível no item {item}"
+            if support:
+                line += f" ({'dica' if len(support) == 1 else 'combinando as dicas'} {join_numbers(support)})"
+            line += "."
+        else:
+            line += " Por exclusão de casos: qualquer outra posição leva a uma contradição."
+        deduction_steps.append(line)
+    return deduction_steps
+
+def generate_puzzle(solution, domain, clue_counts, rng=None):
+    selected_clues = sample_candidate_clues(solution, domain, clue_counts, rng)
     
     fixed_assignments = {}
     other_constraints = []
@@ -288,6 +556,245 @@ def generate_puzzle(solution, domain, clue_counts):
         "log": log
     }
 
+def domain_matches_solution(solution, domain):
+    """
+    Verifica se cada atributo do domínio é exatamente uma permutação dos valores
+    usados na solução (requisito do motor de propagação).
+    """
+    for attr, values in domain.items():
+        used = [item.get(attr) for item in solution]
+        if len(values) != len(solution) or len(set(values)) != len(values) or set(used) != set(values):
+            return False
+    return True
+
+def minimize_clues(domain, clues, dimension=None, order=None):
+    """
+    Remove pistas redundantes de um puzzle com solução única.
+
+    Cada pista é testada uma vez: se o puzzle continua com solução única sem ela
+    (contagem de soluções com parada antecipada em 2), a remoção é mantida. As
+    tentativas são ordenadas pela redundância estimada: primeiro as pistas que
+    não eliminam nada quando as demais já foram propagadas, depois as de menor
+    ganho e, em caso de empate, as mais fáceis. Como remover pistas só aumenta o
+    número de soluções, uma única passada produz um conjunto irredutível.
+
+    Se `order` (lista de índices) for dada, ela substitui a estimativa de redundância.
+    """
+    difficulty_order = {"easy": 1, "medium": 2, "hard": 3}
+
+    def estimated_gain(i):
+        others = build_state(domain, clues[:i] + clues[i+1:], dimension=dimension)
+        before = others.remaining()
+        others.add_constraint(clues[i])
+        return before - others.remaining()
+
+    if order is None:
+        order = sorted(range(len(clues)),
+                       key=lambda i: (estimated_gain(i),
+                                      difficulty_order.get(clues[i].get("difficulty", "medium"), 2)))
+    kept = set(range(len(clues)))
+    for i in order:
+        trial = [clues[j] for j in sorted(kept) if j != i]
+        if build_state(domain, trial, dimension=dimension).count_solutions(limit=2) == 1:
+            kept.discard(i)
+    return [clues[j] for j in sorted(kept)]
+
+# Pesos do esforço do solver na pontuação de dificuldade e faixas [mínimo, máximo)
+DIFFICULTY_WEIGHTS = {"rounds": 0.5, "inferences": 1.0, "branches": 5.0, "backtracks": 5.0, "max_depth": 3.0}
+DIFFICULTY_BANDS = {"easy": (0, 18), "medium": (18, 28), "hard": (28, None)}
+
+def solver_effort(state, steps):
+    """
+    Esforço medido na resolução do puzzle: contadores do solver (rodadas de propagação,
+    ramificações, retrocessos, profundidade) mais o tamanho da cadeia dedutiva e quantos
+    passos exigiram inferência (não vieram diretamente de uma pista de posição).
+    """
+    effort = dict(state.stats)
+    effort["chain_length"] = len(steps)
+    effort["inferences"] = sum(1 for step in steps
+                               if step["reason"] != "assumption"
+                               and not (step["reason"] == "clue" and step["constraint"]["type"] == "position"))
+    return effort
+
+def difficulty_score(effort):
+    return round(sum(weight * effort.get(key, 0) for key, weight in DIFFICULTY_WEIGHTS.items()), 2)
+
+def difficulty_band(score):
+    for band, (low, high) in DIFFICULTY_BANDS.items():
+        if score >= low and (high is None or score < high):
+            return band
+    return None
+
+def generate_unique_puzzle(solution, domain, clue_counts=None, rng=None, minimize=True):
+    """
+    Gera um puzzle com solução única adicionando pistas uma a uma.
+
+    As pistas candidatas ficam em um ClueImplicationIndex, que mantém incrementalmente
+    quantas possibilidades cada uma elimina; a cada passo é escolhida a de maior ganho
+    de informação. Pistas de um nível de dificuldade cuja cota em clue_counts ainda não
+    foi atingida têm preferência, mantendo a mistura de pistas fáceis, médias e difíceis.
+    A geração para assim que a solução se torna única, sem novas tentativas.
+    Com minimize=True, as pistas redundantes são removidas em seguida (minimize_clues).
+    """
+    rng = rng or random
+    clue_counts = clue_counts or {}
+    if not domain_matches_solution(solution, domain):
+        return None
+
+    # A escolha pelo maior ganho precisa avaliar todas as candidatas, então aqui o
+    # fluxo é materializado (O(M·A²) pistas, já sem equivalentes repetidas)
+    candidates = list(iter_candidate_clues(solution, domain, rng=rng))
+    dimension = len(solution)
+    state = PropagationState(domain, dimension)
+    index = ClueImplicationIndex(state, candidates)
+    selected_clues = []
+    accepted_gains = []
+    used_per_tier = {}
+    log = []
+
+    while True:
+        preferred = [tier for tier in CLUE_TIERS if used_per_tier.get(tier, 0) < clue_counts.get(tier, 0)]
+        best = index.best(preferred)
+        if best is None:
+            # Nenhuma pista elimina possibilidades: o estado já está determinado
+            break
+
+        clue = candidates[best]
+        gain = index.gain(best)
+        index.accept(best)
+        selected_clues.append(clue)
+        accepted_gains.append(gain)
+        tier = clue.get("difficulty")
+        used_per_tier[tier] = used_per_tier.get(tier, 0) + 1
+        log.append(f"Pista {len(selected_clues)} ({tier}): ganho imediato {gain}, "
+                   f"{state.remaining()} possibilidades restantes")
+        if state.is_solved() or state.count_solutions(limit=2) == 1:
+            break
+
+    if minimize:
+        total = len(selected_clues)
+        # Redundância estimada sem propagação extra: o ganho de cada pista quando foi
+        # aceita. As que eliminaram menos são as mais prováveis de estarem implícitas
+        # nas demais e são testadas antes (empates na ordem de aceitação)
+        order = sorted(range(len(selected_clues)), key=lambda i: accepted_gains[i])
+        selected_clues = minimize_clues(domain, selected_clues, dimension, order=order)
+        log.append(f"Minimização: {total - len(selected_clues)} pistas redundantes removidas, "
+                   f"{len(selected_clues)} restantes.")
+
+    # Uma única resolução com rastro prova a unicidade e fornece a cadeia dedutiva
+    final_state = build_state(domain, selected_clues, dimension=dimension, record=True)
+    solved = list(final_state.search(limit=2))
+    if len(solved) != 1:
+        return None
+    log.append(f"Solução única garantida com {len(selected_clues)} pistas.")
+
+    enunciado = generate_enunciado("Puzzle Gerado Automaticamente", dimension, domain, selected_clues)
+    steps = deduction_trace(solved[0])
+    deduction = generate_deduction_chain(steps, selected_clues)
+    effort = solver_effort(final_state, steps)
+    score = difficulty_score(effort)
+
+    return {
+        "enunciado": enunciado,
+        "constraints": selected_clues,
+        "deduction": deduction,
+        "solution": [dict(item) for item in solution],
+        "difficulty": {"score": score, "band": difficulty_band(score), "effort": effort},
+        "log": log
+    }
+
+def repair_domain(solution, domain):
+    """
+    Ajusta o domínio gerado pela LLM à solução: mantém a ordem do domínio, descarta
+    valores que a solução não usa e inclui valores usados que faltaram no domínio.
+    Retorna None se algum atributo se repete ou falta em algum item da solução,
+    caso em que só uma nova chamada à LLM resolve.
+    """
+    repaired = {}
+    for attr, values in domain.items():
+        used = [item.get(attr) for item in solution]
+        if any(v is None for v in used) or len(set(used)) != len(used):
+            return None
+        used_set = set(used)
+        ordered = [v for v in values if v in used_set]
+        ordered += [v for v in used if v not in ordered]
+        repaired[attr] = ordered
+    return repaired
+
+def generate_puzzle_with_resampling(solution, domain, clue_counts, rng=None, budget=20, band=None):
+    """
+    Tenta gerar o puzzle com o domínio e a solução já validados, reamostrando as
+    pistas localmente até `budget` vezes antes de desistir. Cada reamostragem custa
+    microssegundos, enquanto uma nova chamada à LLM custa segundos.
+    Com `band` (chave de DIFFICULTY_BANDS), puzzles fora da faixa de dificuldade
+    também são rejeitados (amostragem por rejeição).
+    Retorna (puzzle ou None, número de amostras usadas).
+    """
+    rng = rng or random
+    for sample in range(budget + 1):
+        puzzle = generate_unique_puzzle(solution, domain, clue_counts, rng)
+        if puzzle is None or not puzzle.get("deduction"):
+            continue
+        if band is not None and puzzle["difficulty"]["band"] != band:
+            continue
+        return puzzle, sample + 1
+    return None, budget + 1
+
+def permute_solution(domain, rng=None):
+    """Sorteia uma nova solução para o mesmo domínio permutando os valores de cada atributo."""
+    rng = rng or random
+    dimension = len(next(iter(domain.values())))
+    columns = {attr: rng.sample(values, dimension) for attr, values in domain.items()}
+    return [{attr: columns[attr][i] for attr in domain} for i in range(dimension)]
+
+def amplify_domain(domain, solution, count, clue_counts, rng=None, budget=20, max_draws=None, band=None):
+    """
+    Gera até `count` puzzles para um mesmo domínio temático: o primeiro usa a solução
+    dada (a da LLM) e os demais usam permutações locais dos valores. Soluções e
+    perguntas de retroalimentação repetidas são descartadas para manter a diversidade;
+    max_draws (padrão 4 * count) limita o número de soluções sorteadas. `band`
+    restringe os puzzles a uma faixa de dificuldade (ver generate_puzzle_with_resampling).
+    Retorna uma lista de (solução, puzzle).
+    """
+    rng = rng or random
+    max_draws = max_draws if max_draws is not None else 4 * count
+    results = []
+    seen_solutions = set()
+    seen_questions = set()
+    for draw in range(max_draws):
+        if len(results) >= count:
+            break
+        candidate = solution if draw == 0 else permute_solution(domain, rng)
+        key = tuple(tuple(item[attr] for attr in domain) for item in candidate)
+        if key in seen_solutions:
+            continue
+        seen_solutions.add(key)
+        puzzle, _ = generate_puzzle_with_resampling(candidate, domain, clue_counts, rng, budget, band)
+        if puzzle is None:
+            continue
+        question, _ = extract_feedback_info(puzzle["deduction"], candidate)
+        if question in seen_questions:
+            continue
+        seen_questions.add(question)
+        results.append((candidate, puzzle))
+    return results
+
+def make_dataset_entry(domain, solution, puzzle):
+    """Monta a entrada do dataset (com a pergunta de retroalimentação) a partir de um puzzle."""
+    deduction_list = puzzle.get("deduction", [])
+    feedback_question, correct_answer = extract_feedback_info(deduction_list, solution)
+    return {
+        "domain": domain,
+        "enunciado": puzzle["enunciado"] + "\n\nPergunta Retroalimentada: " + feedback_question,
+        "constraints": puzzle.get("constraints"),
+        "deduction": deduction_list,
+        "feedback_question": feedback_question,
+        "correct_answer": correct_answer,
+        "solution": puzzle.get("solution"),
+        "difficulty": puzzle.get("difficulty"),
+        "log": puzzle.get("log")
+    }
+
 # ======================================================
 # FUNÇÕES DE GERAÇÃO VIA LLM
 # ======================================================
@@ -306,35 +813,134 @@ def extract_json(response_text):
     else:
         return response_text
 
-def generate_entries(theme, dimension):
-    """
-    Solicita à LLM que gere uma estrutura JSON contendo as entradas para um puzzle,
-    conforme o tema e a dimensão desejada.
-    Retorna um JSON com as chaves "domain" e "solution".
-    """
-    prompt = f"""
-Você é um gerador de puzzles e deve produzir uma estrutura JSON válida, sem nenhum texto adicional, com o seguinte formato:
+# Parte fixa do prompt de generate_entries: vem primeiro e é idêntica em todas as
+# chamadas, então o servidor reaproveita o cache de contexto (KV) desse prefixo e
+# só processa o final, com o tema e as quantidades
+ENTRIES_PROMPT_PREFIX = """
+Você é um gerador de puzzles e deve produzir uma estrutura JSON válida, sem nenhum texto adicional, com o seguinte formato (N é o número de valores por atributo e M o número de atributos, dados ao final):
 
-{{
-  "domain": {{
-    "Attribute1": ["Value1", "Value2", ..., "Value{dimension}"],
-    "Attribute2": ["Value1", "Value2", ..., "Value{dimension}"],
+{
+  "domain": {
+    "Attribute1": ["Value1", "Value2", ..., "ValueN"],
+    "Attribute2": ["Value1", "Value2", ..., "ValueN"],
     ...,
-    "Attribute{dimension}": ["Value1", "Value2", ..., "Value{dimension}"]
-  }},
+    "AttributeM": ["Value1", "Value2", ..., "ValueN"]
+  },
   "solution": [
-    {{"Attribute1": "V1", "Attribute2": "V1", ..., "Attribute{dimension}": "V1"}},
-    {{"Attribute1": "V2", "Attribute2": "V2", ..., "Attribute{dimension}": "V2"}},
+    {"Attribute1": "V1", "Attribute2": "V1", ..., "AttributeM": "V1"},
+    {"Attribute1": "V2", "Attribute2": "V2", ..., "AttributeM": "V2"},
     ...,
-    {{"Attribute1": "V{dimension}", "Attribute2": "V{dimension}", ..., "Attribute{dimension}": "V{dimension}"}}
+    {"Attribute1": "VN", "Attribute2": "VN", ..., "AttributeM": "VN"}
   ]
-}}
+}
 
-Utilize o tema "{theme}" para definir nomes criativos e coerentes para os atributos e para os valores.
-Cada atributo deve ter exatamente {dimension} valores e a solução deve conter exatamente {dimension} itens, com cada item usando um valor único por atributo.
+Utilize o tema dado ao final para definir nomes criativos e coerentes para os atributos e para os valores.
+A solução deve conter exatamente N itens, com cada item usando um valor único por atributo.
 Certifique-se de retornar APENAS o JSON, sem nenhum texto adicional.
 """
-    response_text = call_llm(prompt, show_tokens=True)
+
+def build_entries_prompt(theme, dimension, n_attributes=None):
+    """
+    Prompt que pede à LLM o domínio e a solução (n_attributes padrão: a própria dimensão).
+    Começa pelo prefixo fixo ENTRIES_PROMPT_PREFIX; o que muda entre chamadas vem no final.
+    """
+    n_attributes = n_attributes or dimension
+    return ENTRIES_PROMPT_PREFIX + f"""
+Tema: "{theme}"
+N = {dimension}, M = {n_attributes}: devem existir exatamente {n_attributes} atributos. Cada atributo deve ter exatamente {dimension} valores e a solução deve conter exatamente {dimension} itens.
+"""
+
+def entries_schema(dimension, n_attributes=None):
+    """
+    JSON Schema de {"domain", "solution"} para a saída estruturada do Ollama. Os nomes
+    dos atributos vêm do tema, então só as quantidades são fixadas no schema.
+    """
+    n_attributes = n_attributes or dimension
+    values = {"type": "array", "items": {"type": "string"}, "minItems": dimension, "maxItems": dimension}
+    return {
+        "type": "object",
+        "properties": {
+            "domain": {"type": "object", "additionalProperties": values,
+                       "minProperties": n_attributes, "maxProperties": n_attributes},
+            "solution": {"type": "array",
+                         "items": {"type": "object", "additionalProperties": {"type": "string"},
+                                   "minProperties": n_attributes, "maxProperties": n_attributes},
+                         "minItems": dimension, "maxItems": dimension},
+        },
+        "required": ["domain", "solution"],
+    }
+
+class EntriesStreamValidator:
+    """
+    Valida o JSON de generate_entries enquanto ele chega pelo stream e levanta
+    LLMValidationError assim que a resposta se torna com certeza inválida: número
+    de atributos diferente do pedido, valor repetido num atributo do domínio, mais
+    itens na solução do que a dimensão, item sem algum atributo do domínio ou valor
+    repetido entre itens da solução (que repair_domain rejeitaria de qualquer forma).
+    """
+
+    def __init__(self, dimension, n_attributes=None):
+        self.dimension = dimension
+        self.n_attributes = n_attributes or dimension
+        self.parser = IncrementalJSONParser()
+        self.domain = None
+        self.domain_values = {}
+        self.used = {}
+
+    def __call__(self, chunk):
+        try:
+            events = self.parser.feed(chunk)
+        except ValueError as e:
+            raise LLMValidationError(f"JSON inválido: {e}") from e
+        for kind, path, value in events:
+            self._check(kind, path, value)
+
+    def _fail(self, message):
+        raise LLMValidationError(f"Resposta interrompida: {message}")
+
+    def _check(self, kind, path, value):
+        if len(path) == 1 and path[0] in ("domain", "solution"):
+            expected = dict if path[0] == "domain" else list
+            if kind != "end" and not isinstance(value, expected):
+                self._fail(f"'{path[0]}' deveria ser {'um objeto' if expected is dict else 'uma lista'}.")
+            if kind == "end" and path[0] == "domain":
+                self.domain = value
+                if len(value) != self.n_attributes:
+                    self._fail(f"{len(value)} atributos no domínio (esperado {self.n_attributes}).")
+            return
+        if len(path) < 2 or path[0] not in ("domain", "solution"):
+            return
+        if path[0] == "domain":
+            attr = path[1]
+            if len(path) == 2 and kind != "end":
+                if not isinstance(value, list):
+                    self._fail(f"o atributo '{attr}' do domínio deveria ser uma lista de valores.")
+                self.domain_values[attr] = set()
+                if len(self.domain_values) > self.n_attributes:
+                    self._fail(f"mais de {self.n_attributes} atributos no domínio.")
+            elif kind == "value" and len(path) == 3:
+                if value in self.domain_values[attr]:
+                    self._fail(f"valor '{value}' repetido no atributo '{attr}'.")
+                self.domain_values[attr].add(value)
+            return
+        index = path[1]
+        if len(path) == 2 and kind != "end":
+            if not isinstance(value, dict):
+                self._fail(f"item {index + 1} da solução deveria ser um objeto.")
+            if index >= self.dimension:
+                self._fail(f"solução com mais de {self.dimension} itens.")
+        elif kind == "value" and len(path) == 3:
+            seen = self.used.setdefault(path[2], set())
+            if value in seen:
+                self._fail(f"valor '{value}' de '{path[2]}' repetido na solução.")
+            seen.add(value)
+        elif kind == "end" and len(path) == 2 and self.domain is not None:
+            missing = [attr for attr in self.domain if attr not in value]
+            if missing:
+                self._fail(f"item {index + 1} da solução sem o atributo '{missing[0]}'.")
+
+def parse_entries_response(response_text):
+    """Extrai e decodifica o JSON da resposta da LLM (levanta a exceção do json se inválido)."""
     json_str = extract_json(response_text)
     try:
         entries = json.loads(json_str)
@@ -345,6 +951,22 @@ Certifique-se de retornar APENAS o JSON, sem nenhum texto adicional.
         raise e
     return entries
 
+def generate_entries(theme, dimension, seed=None, n_attributes=None):
+    """
+    Solicita à LLM que gere uma estrutura JSON contendo as entradas para um puzzle,
+    conforme o tema e a dimensão desejada.
+    Retorna um JSON com as chaves "domain" e "solution".
+    Se seed for dada, ela é repassada ao Ollama para amostragem reproduzível.
+    n_attributes (padrão: a própria dimensão) é o número de atributos pedidos.
+    A saída usa o modo estruturado do Ollama (entries_schema) e é validada durante o
+    stream (EntriesStreamValidator): respostas inválidas são interrompidas na hora.
+    """
+    prompt = build_entries_prompt(theme, dimension, n_attributes)
+    response_text = call_llm(prompt, show_tokens=True, seed=seed,
+                             format=entries_schema(dimension, n_attributes),
+                             validator=EntriesStreamValidator(dimension, n_attributes))
+    return parse_entries_response(response_text)
+
 def finalize_puzzle_output(context_json, enunciado, deduction, solution):
     """
     Usa os termos gerados anteriormente para produzir um texto final organizado.
@@ -352,8 +974,11 @@ def finalize_puzzle_output(context_json, enunciado, deduction, solution):
     deduction_text = "\n".join(deduction)
     solution_text = "\n".join([f"Item {i+1}: " + ", ".join([f"{k}: {v}" for k, v in item.items()]) for i, item in enumerate(solution)])
     
+    # Instruções fixas primeiro (prefixo reaproveitado pelo servidor), dados do puzzle depois
     prompt = f"""
 Você é um redator de puzzles e deve compor um texto final que apresente de forma clara e organizada as seguintes seções:
+Contexto de Geração, Enunciado do Puzzle, Passos Dedutivos (Caminho Lógico) e Solução Final.
+Formate o texto final com títulos para cada seção e utilize uma linguagem clara e precisa.
 
 1. Contexto de Geração:
 Mostre o objeto JSON abaixo, que contém os termos gerados anteriormente (domínio e solução):
@@ -368,8 +993,6 @@ Mostre o objeto JSON abaixo, que contém os termos gerados anteriormente (domín
 
 4. Solução Final:
 {solution_text}
-
-Formate o texto final com títulos para cada seção e utilize uma linguagem clara e precisa.
 """
     final_text = call_llm(prompt, show_tokens=True)
     return final_text.strip()
@@ -438,6 +1061,60 @@ def extract_feedback_info(deduction_list, solution):
 # ======================================================
 
 def main():
+    parser = argparse.ArgumentParser(description="Gera o dataset de puzzles usando a LLM.")
+    parser.add_argument("--total", type=int, default=500, help="Número de entradas a gerar")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Semente base; com ela cada entrada pode ser recriada bit a bit")
+    parser.add_argument("--shard", type=int, default=None,
+                        help="Índice do shard (a semente do shard é derivada da semente base e do índice)")
+    parser.add_argument("--resample-budget", type=int, default=20,
+                        help="Reamostragens locais de pistas (também para puzzles duplicados) "
+                             "antes de pedir um novo domínio à LLM")
+    parser.add_argument("--puzzles-per-domain", type=int, default=1,
+                        help="Puzzles gerados por domínio da LLM (soluções locais diferentes)")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="Não descartar puzzles estruturalmente duplicados")
+    parser.add_argument("--bloom", type=str, default=None,
+                        help="Filtro de Bloom compartilhado entre shards para descartar puzzles duplicados")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Chamadas simultâneas à LLM (1: sequencial)")
+    parser.add_argument("--adaptive-concurrency", action="store_true",
+                        help="Ajusta as chamadas simultâneas pela vazão e latência observadas (até --concurrency)")
+    parser.add_argument("--questions-per-puzzle", type=int, default=0,
+                        help="Também salvar N amostras pergunta/resposta por puzzle (JSON Lines)")
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[3, 4, 5],
+                        help="Dimensões possíveis (nº de itens); o motor de propagação suporta até 10")
+    parser.add_argument("--attributes", type=int, nargs="+", default=None,
+                        help="Quantidades possíveis de atributos (padrão: igual à dimensão)")
+    parser.add_argument("--difficulty", choices=sorted(DIFFICULTY_BANDS), default=None,
+                        help="Faixa de dificuldade desejada (puzzles fora dela são rejeitados)")
+    parser.add_argument("--cache-dir", type=str, default=None,
+                        help="Diretório do cache em disco das respostas da LLM")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Não ler nem gravar o cache de respostas da LLM")
+    parser.add_argument("--telemetry-jsonl", type=str, default=None,
+                        help="Grava a telemetria de cada chamada à LLM neste arquivo JSON Lines")
+    parser.add_argument("--telemetry-prom", type=str, default=None,
+                        help="Grava os agregados da telemetria neste textfile do Prometheus (a cada checkpoint)")
+    parser.add_argument("--llm-url", type=str, nargs="+", default=None,
+                        help="Servidores Ollama (URLs de /api/generate); as chamadas vão para o menos ocupado")
+    parser.add_argument("--health-check-interval", type=float, default=10.0,
+                        help="Intervalo em segundos da verificação de saúde dos servidores (0: desliga)")
+    args = parser.parse_args()
+
+    llm_telemetry.configure_telemetry(args.telemetry_jsonl)
+    if args.llm_url:
+        configure_endpoints(args.llm_url, args.health_check_interval if len(args.llm_url) > 1 else None)
+    # Carrega o modelo antes da primeira entrada; com keep_alive ele fica residente
+    preload_model()
+
+    llm_cache.configure_cache(directory=args.cache_dir, enabled=False if args.no_cache else None)
+
+    shard = args.shard if args.shard is not None else 0
+    prefix = f"datasets/dataset_shard{args.shard}_" if args.shard is not None else "datasets/dataset_"
+    if args.seed is not None:
+        print(f"Semente base {args.seed}, shard {shard} (semente do shard {shard_seed(args.seed, shard)}).")
+
     # Criar pasta datasets se não existir
     if not os.path.exists("datasets"):
         os.makedirs("datasets")
@@ -458,101 +1135,221 @@ def main():
         ]
         print("Arquivo puzzle_themes.json não encontrado. Usando temas padrão.")
     
-    # Lista de dimensões possíveis para os puzzles
-    dimensions = [3, 4, 5]
+    # Dimensões (nº de itens) e quantidades de atributos possíveis para os puzzles
+    dimensions = args.dimensions
+    attribute_counts = args.attributes
     
+    # Importação local: puzzle_dedup depende deste módulo
+    from puzzle_dedup import PuzzleDeduplicator, open_bloom
+    bloom = open_bloom(args.bloom) if args.bloom else None
+    # Com poucos itens há poucas estruturas distintas: aqui o domínio temático da LLM
+    # também entra na chave, e só a mesma estrutura com o mesmo domínio é duplicata
+    deduplicator = PuzzleDeduplicator(bloom, with_domain=True) if not args.no_dedup or bloom is not None else None
+
     dataset = []
-    total_entries = 500
+    total_entries = args.total
     checkpoint_interval = 5  # Salvar a cada 5 entradas
+    last_checkpoint = 0
     
-    for i in range(total_entries):
-        theme = random.choice(themes)
-        dim = random.choice(dimensions)
-        print(f"\n=== Gerando entrada {i+1} com dimensão {dim} usando o tema '{theme}' ===")
+    def entry_plan(i):
+        # Cada entrada tem seu próprio gerador, derivado de (semente do shard, índice)
+        entry_seed = derive_seed(shard_seed(args.seed, shard), i) if args.seed is not None else None
+        rng = random.Random(entry_seed)
+        theme = rng.choice(themes)
+        dim = rng.choice(dimensions)
+        n_attributes = rng.choice(attribute_counts) if attribute_counts else dim
+        return entry_seed, rng, theme, dim, n_attributes
+
+    def llm_seed(entry_seed, attempt):
+        return derive_seed(entry_seed, "llm", attempt) % (2 ** 31) if entry_seed is not None else None
+
+    def add_unique(domain, puzzles, entry_seed):
+        # Descarta puzzles estruturalmente idênticos aos já gerados
+        added = 0
+        for puzzle_solution, puzzle in puzzles:
+            dataset_entry = make_dataset_entry(domain, puzzle_solution, puzzle)
+            if deduplicator is not None and deduplicator.is_duplicate(dataset_entry):
+                continue
+            if entry_seed is not None:
+                dataset_entry["seed"] = entry_seed
+            dataset.append(dataset_entry)
+            added += 1
+        return added
+
+    # As entradas são processadas em lotes de `concurrency`: a primeira chamada à LLM
+    # de todo o lote é feita em paralelo e o restante (validação, geração local e
+    # novas tentativas) segue em ordem, então o dataset sai igual ao sequencial
+    batch_size = max(1, args.concurrency)
+    # Com --adaptive-concurrency o lote continua com --concurrency entradas, mas quantas
+    # chamadas ficam em andamento ao mesmo tempo é decidido pelo AdaptiveLimiter
+    limiter = AdaptiveLimiter(max_limit=args.concurrency) if args.adaptive_concurrency and args.concurrency > 1 else None
+    aborted = False  # servidor da LLM fora do ar: encerra e salva o que já foi gerado
+    for batch_start in range(0, total_entries, batch_size):
+        if aborted:
+            break
+        batch = range(batch_start, min(batch_start + batch_size, total_entries))
+        plans = {i: entry_plan(i) for i in batch}
+        prefetched = {}
+        if args.concurrency > 1:
+            prompts = [build_entries_prompt(plans[i][2], plans[i][3], plans[i][4]) for i in batch]
+            seeds = [llm_seed(plans[i][0], 0) for i in batch]
+            formats = [entries_schema(plans[i][3], plans[i][4]) for i in batch]
+            validators = [EntriesStreamValidator(plans[i][3], plans[i][4]) for i in batch]
+            print(f"\nSolicitando {len(prompts)} domínios à LLM em paralelo...")
+            with llm_telemetry.stage("dominios"):
+                responses = gather_llm_sync(prompts, args.concurrency, seeds=seeds, return_exceptions=True,
+                                            formats=formats, validators=validators, limiter=limiter)
+            prefetched = dict(zip(batch, responses))
+            if limiter is not None:
+                print(limiter.summary())
+
+        for i in batch:
+            entry_seed, rng, theme, dim, n_attributes = plans[i]
+            print(f"\n=== Gerando entrada {i+1} com dimensão {dim}x{n_attributes} usando o tema '{theme}' ===")
         
-        # Tentativas máximas por entrada
-        max_attempts = 2
-        success = False
+            # Tentativas máximas por entrada
+            max_attempts = 2
+            success = False
         
-        for attempt in range(max_attempts):
-            try:
-                # Gerar os termos (domain e solution) via LLM
-                entries = generate_entries(theme, dim)
+            for attempt in range(max_attempts):
+                try:
+                    # Gerar os termos (domain e solution) via LLM
+                    if attempt == 0 and i in prefetched:
+                        response_text = prefetched.pop(i)
+                        if isinstance(response_text, BaseException):
+                            raise response_text
+                        entries = parse_entries_response(response_text)
+                    else:
+                        with llm_telemetry.stage("dominios" if attempt == 0 else "dominios_retentativa"):
+                            entries = generate_entries(theme, dim, seed=llm_seed(entry_seed, attempt),
+                                                       n_attributes=n_attributes)
                 
-                domain = entries.get("domain")
-                solution = entries.get("solution")
-                if domain is None or solution is None:
-                    print(f"Tentativa {attempt + 1}: Estrutura inválida gerada pela LLM.")
-                    continue
+                    domain = entries.get("domain")
+                    solution = entries.get("solution")
+                    if domain is None or solution is None:
+                        print(f"Tentativa {attempt + 1}: Estrutura inválida gerada pela LLM.")
+                        continue
 
-                # Validar se todos os atributos do domínio existem na solução
-                valid_structure = True
-                for item in solution:
-                    if not all(attr in item for attr in domain.keys()):
-                        print(f"Tentativa {attempt + 1}: Solução não contém todos os atributos do domínio.")
-                        valid_structure = False
-                        break
+                    # Validar se todos os atributos do domínio existem na solução
+                    valid_structure = True
+                    for item in solution:
+                        if not all(attr in item for attr in domain.keys()):
+                            print(f"Tentativa {attempt + 1}: Solução não contém todos os atributos do domínio.")
+                            valid_structure = False
+                            break
                 
-                if not valid_structure:
-                    continue
+                    if not valid_structure:
+                        continue
+
+                    domain = repair_domain(solution, domain)
+                    if domain is None:
+                        print(f"Tentativa {attempt + 1}: Solução com valores repetidos ou ausentes.")
+                        continue
 
-                context_json = json.dumps(entries, indent=2, ensure_ascii=False)
-                clue_counts = {"easy": dim, "medium": dim, "hard": dim}
-                puzzle = generate_puzzle(solution, domain, clue_counts)
+                    context_json = json.dumps(entries, indent=2, ensure_ascii=False)
+                    clue_counts = {"easy": dim, "medium": dim, "hard": dim}
+                    # Domínio e solução já validados: reamostra as pistas localmente
+                    # antes de gastar outra chamada à LLM, e amplifica o domínio em
+                    # vários puzzles com soluções diferentes
+                    puzzles = amplify_domain(domain, solution, args.puzzles_per_domain, clue_counts,
+                                             rng, args.resample_budget, band=args.difficulty)
                 
-                if puzzle is None:
-                    print(f"Tentativa {attempt + 1}: Não foi possível gerar um puzzle com as configurações escolhidas.")
-                    continue
+                    if not puzzles:
+                        print(f"Tentativa {attempt + 1}: Não foi possível gerar um puzzle com as configurações escolhidas.")
+                        continue
 
-                deduction_list = puzzle.get("deduction", [])
-                if not deduction_list:
-                    print(f"Tentativa {attempt + 1}: Nenhum passo dedutivo gerado.")
-                    continue
+                    entries_added = add_unique(domain, puzzles, entry_seed)
+                    # Domínio repetido (ex.: resposta igual da LLM): reamostra as pistas
+                    # localmente em busca de outra estrutura antes de chamar a LLM de novo
+                    resamples = 0
+                    while entries_added == 0 and resamples < args.resample_budget:
+                        resamples += 1
+                        puzzles = amplify_domain(domain, solution, args.puzzles_per_domain,
+                                                 clue_counts, rng, args.resample_budget, band=args.difficulty)
+                        entries_added = add_unique(domain, puzzles, entry_seed)
+                    if entries_added == 0:
+                        print(f"Tentativa {attempt + 1}: Puzzle duplicado de uma entrada anterior "
+                              f"(após {resamples} reamostragens locais).")
+                        continue
+                    if resamples:
+                        print(f"Puzzle duplicado; {resamples} reamostragem(ns) local(is) até um inédito.")
 
-                # Se chegou até aqui, tudo deu certo
-                last_deduction = deduction_list[-1]
-                feedback_question, correct_answer = extract_feedback_info(deduction_list, solution)
-                enunciado_final = puzzle["enunciado"] + "\n\nPergunta Retroalimentada: " + feedback_question
-
-                dataset_entry = {
-                    "domain": domain,
-                    "enunciado": enunciado_final,
-                    "deduction": deduction_list,
-                    "feedback_question": feedback_question,
-                    "correct_answer": correct_answer,
-                    "solution": puzzle.get("solution"),
-                    "log": puzzle.get("log")
-                }
-                dataset.append(dataset_entry)
-                success = True
-                break
+                    # Se chegou até aqui, tudo deu certo
+                    if entries_added > 1:
+                        print(f"{entries_added} puzzles gerados a partir do mesmo domínio.")
+                    success = True
+                    break
 
-            except Exception as ex:
-                print(f"Tentativa {attempt + 1}: Erro durante a geração: {str(ex)}")
-                if attempt + 1 < max_attempts:
-                    print("Tentando novamente...")
-                continue
+                except LLMCircuitOpenError as ex:
+                    print(f"\n{str(ex)} Encerrando a geração.")
+                    aborted = True
+                    break
+                except LLMValidationError as ex:
+                    # Geração interrompida por ser inválida: conta como tentativa
+                    print(f"Tentativa {attempt + 1}: {str(ex)}")
+                    continue
+                except LLMError as ex:
+                    # call_llm já esgotou as novas tentativas de rede: não gasta outra tentativa
+                    print(f"Tentativa {attempt + 1}: Falha na comunicação com a LLM: {str(ex)}")
+                    break
+                except Exception as ex:
+                    print(f"Tentativa {attempt + 1}: Erro durante a geração: {str(ex)}")
+                    if attempt + 1 < max_attempts:
+                        print("Tentando novamente...")
+                    continue
         
-        if not success:
-            print(f"Falha em todas as tentativas para entrada {i+1}. Continuando para a próxima...")
-            continue
+            if aborted:
+                break
+            if not success:
+                print(f"Falha em todas as tentativas para entrada {i+1}. Continuando para a próxima...")
+                continue
 
-        # Checkpoint a cada 5 entradas bem sucedidas
-        if success and len(dataset) % checkpoint_interval == 0:
-            checkpoint_file = f"datasets/dataset_checkpoint_{len(dataset)}.json"
-            try:
-                with open(checkpoint_file, "w", encoding="utf-8") as f:
-                    json.dump(dataset, f, indent=2, ensure_ascii=False)
-                print(f"\nCheckpoint salvo em '{checkpoint_file}'")
-            except Exception as e:
-                print(f"\nErro ao salvar checkpoint: {str(e)}")
+            # Checkpoint a cada 5 entradas bem sucedidas
+            if success and len(dataset) - last_checkpoint >= checkpoint_interval:
+                last_checkpoint = len(dataset)
+                checkpoint_file = f"{prefix}checkpoint_{len(dataset)}.json"
+                try:
+                    with open(checkpoint_file, "w", encoding="utf-8") as f:
+                        json.dump(dataset, f, indent=2, ensure_ascii=False)
+                    print(f"\nCheckpoint salvo em '{checkpoint_file}'")
+                    if args.telemetry_prom:
+                        llm_telemetry.get_telemetry().write_prometheus(args.telemetry_prom)
+                except Exception as e:
+                    print(f"\nErro ao salvar checkpoint: {str(e)}")
     
+    if bloom is not None:
+        bloom.save(args.bloom)
+    if deduplicator is not None and deduplicator.duplicates:
+        print(f"{deduplicator.duplicates} puzzles duplicados descartados.")
+
     # Salvar dataset final
-    final_file = f"datasets/dataset_final_{len(dataset)}_entries.json"
+    final_file = f"{prefix}final_{len(dataset)}_entries.json"
     with open(final_file, "w", encoding="utf-8") as f:
         json.dump(dataset, f, indent=2, ensure_ascii=False)
     
     print(f"\nDataset final com {len(dataset)} entradas foi gerado e salvo em '{final_file}'.")
+    if llm_cache.CACHE_ENABLED:
+        print(llm_cache.get_cache().summary())
+    print(llm_telemetry.get_telemetry().summary())
+    if limiter is not None:
+        print(limiter.summary())
+    if len(get_pool().endpoints) > 1:
+        print(get_pool().summary())
+    if args.telemetry_prom:
+        llm_telemetry.get_telemetry().write_prometheus(args.telemetry_prom)
+
+    if args.questions_per_puzzle > 0:
+        from puzzle_questions import expand_entry
+        questions_file = f"{prefix}questions_{len(dataset)}_entries.jsonl"
+        samples = 0
+        with open(questions_file, "w", encoding="utf-8") as f:
+            for entry in dataset:
+                entry_seed = entry.get("seed")
+                rng = random.Random(derive_seed(entry_seed, "questions") if entry_seed is not None else None)
+                for sample in expand_entry(entry, args.questions_per_puzzle, rng):
+                    f.write(json.dumps(sample, ensure_ascii=False) + "\n")
+                    samples += 1
+        print(f"{samples} amostras pergunta/resposta salvas em '{questions_file}'.")
 
 if __name__ == '__main__':
     main()
@@ -4,6 +4,8 @@ from functools import lru_cache
 from typing import Dict, List, Set, Optional, Tuple
 from dataclasses import dataclass
 from puzzle_examples import Puzzle, ZEBRA_PUZZLE, CARS_PUZZLE
+from zebra_propagation import PropagationState, ClueImplicationIndex, build_state, deduction_trace
+from zebra_dataset_gen import iter_candidate_clues, join_numbers
 import random
 from collections import defaultdict
 
@@ -189,7 +191,24 @@ def solve_puzzle(puzzle: Puzzle):
     )
 
 def solve_puzzle_internal(domain, constraints, fixed_assignments, dimension=5):
-    """Implementação interna do solucionador"""
+    """
+    Implementação interna do solucionador: usa o motor de propagação, que escala
+    para puzzles grandes; domínios que ele não aceita caem no backtracking.
+    """
+    try:
+        state = build_state(domain, constraints, fixed_assignments, dimension)
+    except (ValueError, KeyError):
+        return solve_puzzle_backtracking(domain, constraints, fixed_assignments, dimension)
+    solution = state.solve()
+    if solution is None:
+        raise NoSolutionError("Não foi possível encontrar uma solução para o puzzle")
+    stats = state.stats
+    log = [f"Propagação: {stats['rounds']} rodadas, {stats['branches']} ramificações, "
+           f"{stats['backtracks']} retrocessos."]
+    return solution, log
+
+def solve_puzzle_backtracking(domain, constraints, fixed_assignments, dimension=5):
+    """Solucionador original por backtracking (viável só para puzzles pequenos)."""
     try:
         items = [{cat: None for cat in domain.keys()} for _ in range(dimension)]
         for i, fixed in fixed_assignments.items():
@@ -322,13 +341,16 @@ class LogicalChain:
         self.steps.append(DeductiveStep(premise, conclusion, explanation))
 
 def generate_solution_first(dimension: int, attributes: List[str], 
-                          values_per_attribute: Dict[str, List[str]]) -> Tuple[List[Dict], List[Dict], LogicalChain]:
+                          values_per_attribute: Dict[str, List[str]],
+                          rng: Optional[random.Random] = None) -> Tuple[List[Dict], List[Dict], LogicalChain]:
     """
     Gera primeiro uma solução válida, depois deriva as restrições mínimas necessárias.
+    O parâmetro rng permite geração reproduzível (padrão: módulo random global).
     
     Returns:
         Tuple[solution, constraints, logical_chain]
     """
+    rng = rng or random
     # 1. Gerar uma solução válida (matriz de atributos x items)
     solution = []
     used = {attr: set() for attr in attributes}
@@ -337,7 +359,7 @@ def generate_solution_first(dimension: int, attributes: List[str],
         item = {}
         for attr in attributes:
             available = [v for v in values_per_attribute[attr] if v not in used[attr]]
-            value = random.choice(available)
+            value = rng.choice(available)
             item[attr] = value
             used[attr].add(value)
         solution.append(item)
@@ -347,8 +369,8 @@ def generate_solution_first(dimension: int, attributes: List[str],
     constraints = []
     
     # 2.1 Começar com uma ou duas fixações estratégicas
-    start_pos = random.randint(0, dimension-1)
-    start_attr = random.choice(attributes)
+    start_pos = rng.randint(0, dimension-1)
+    start_attr = rng.choice(attributes)
     start_value = solution[start_pos][start_attr]
     
     constraints.append({
@@ -364,169 +386,196 @@ def generate_solution_first(dimension: int, attributes: List[str],
         explanation="Informação fornecida no enunciado"
     )
     logical_chain.known_facts.add((start_pos, start_attr, start_value))
+
+    # O estado de propagação registra quais células cada pista fixa, então os
+    # fatos conhecidos e os passos da cadeia saem da própria propagação
+    domain = {attr: [item[attr] for item in solution] for attr in attributes}
+    state = PropagationState(domain, dimension, record=True)
+    state.add_constraint(constraints[0])
+    index = ClueImplicationIndex(
+        state, [clue for clue in iter_candidate_clues(solution, domain, rng=rng) if clue["type"] != "position"]
+    )
+    recorded = len(state.trace)
     
     # 2.2 Identificar relações dedutivas necessárias
     while not is_solution_unique(solution, constraints):
         # Encontrar próxima dedução mais forte
-        next_deduction = find_strongest_deduction(solution, logical_chain.known_facts)
-        if next_deduction is None:
+        # Consulta de ganho feita uma vez: a mesma pista é convertida e aceita
+        best = index.best()
+        if best is None:
             break
+        next_deduction = find_strongest_deduction(solution, logical_chain.known_facts, index, best)
             
         pos, attr, value, deduction_type, related = next_deduction
         constraint = create_constraint(deduction_type, pos, attr, value, related)
         constraints.append(constraint)
+        index.accept(best)
         
         logical_chain.add_step(
             premise=f"Considerando {attr}={value} na posição {pos+1}",
             conclusion=format_deduction(deduction_type, related),
             explanation=generate_explanation(deduction_type, related)
         )
-        logical_chain.known_facts.add((pos, attr, value))
+        numbers = {id(clue): r for r, clue in enumerate(state.sources, start=1)}
+        for step in deduction_trace(state)[recorded:]:
+            fact = (step["position"], step["attribute"], step["value"])
+            if fact not in logical_chain.known_facts:
+                # Cita todas as restrições que sustentam a célula, não só a recém-aceita
+                numbered = sorted(numbers[id(clue)] for clue in step["support"])
+                cited = f"{'restrição' if len(numbered) == 1 else 'restrições'} {join_numbers(numbered)}"
+                if step["reason"] != "clue":
+                    article = "pelas" if len(numbered) > 1 else "pela"
+                    premise = f"Valores restantes de {step['attribute']}, {article} {cited}"
+                elif step["support"] == [state.sources[-1]]:
+                    premise = format_deduction(deduction_type, related)
+                else:
+                    premise = f"Combinando as {cited}" if len(numbered) > 1 else cited.capitalize()
+                logical_chain.add_step(
+                    premise=premise,
+                    conclusion=f"Item {fact[0]+1} tem {fact[1]}={fact[2]}",
+                    explanation="Consequência da propagação das restrições"
+                )
+                logical_chain.known_facts.add(fact)
+        recorded = len(state.trace)
     
     return solution, constraints, logical_chain
 
-def find_strongest_deduction(solution: List[Dict], known_facts: Set[Tuple]) -> Optional[Tuple]:
+def build_deduction_index(solution: List[Dict], known_facts: Set[Tuple],
+                          rng: Optional[random.Random] = None) -> ClueImplicationIndex:
+    """
+    Monta o índice de implicações para as pistas relacionais (direct, neighbor e
+    ordered) da solução, com os fatos conhecidos já propagados.
+    """
+    domain = {attr: [item[attr] for item in solution] for attr in solution[0].keys()}
+    state = PropagationState(domain, len(solution))
+    for pos, attr, value in known_facts:
+        state.add_constraint({"type": "position", "position": pos, "attribute": attr, "value": value})
+    candidates = [clue for clue in iter_candidate_clues(solution, domain, rng=rng) if clue["type"] != "position"]
+    return ClueImplicationIndex(state, candidates)
+
+def find_strongest_deduction(solution: List[Dict], known_facts: Set[Tuple],
+                             index: Optional[ClueImplicationIndex] = None,
+                             best: Optional[int] = None) -> Optional[Tuple]:
     """
     Encontra a próxima dedução mais forte possível dado o que já sabemos.
     Retorna uma tupla (pos, attr, value, deduction_type, related) ou None se não encontrar.
+
+    A força de uma dedução é o número de possibilidades que ela elimina no estado de
+    propagação atual, consultado no ClueImplicationIndex (que pode ser reaproveitado
+    entre chamadas através do parâmetro index). Se o chamador já consultou a melhor
+    pista do índice, pode passá-la em best para evitar uma segunda consulta.
     
     Tipos de dedução:
     - "direct": relação direta entre dois atributos
     - "neighbor": relação de vizinhança
     - "ordered": relação de ordem
     """
-    dimension = len(solution)
-    all_attributes = set(solution[0].keys())
-    
-    # 1. Primeiro, procura por relações diretas fortes
-    for pos, item in enumerate(solution):
-        for attr1 in all_attributes:
-            val1 = item[attr1]
-            if (pos, attr1, val1) in known_facts:
-                # Procura por correlações diretas com outros atributos
-                for attr2 in all_attributes:
-                    if attr2 != attr1:
-                        val2 = item[attr2]
-                        # Se encontrarmos um par único na solução
-                        pair_count = sum(1 for other_item in solution 
-                                       if other_item[attr1] == val1 
-                                       and other_item[attr2] == val2)
-                        if pair_count == 1:
-                            return (pos, attr2, val2, "direct", {
-                                "if_attr": attr1,
-                                "if_val": val1,
-                                "then_attr": attr2,
-                                "then_val": val2
-                            })
-    
-    # 2. Procura por relações de vizinhança
-    for pos in range(dimension - 1):
-        current = solution[pos]
-        next_item = solution[pos + 1]
-        for attr1 in all_attributes:
-            val1 = current[attr1]
-            if (pos, attr1, val1) in known_facts:
-                for attr2 in all_attributes:
-                    val2 = next_item[attr2]
-                    # Verifica se essa relação de vizinhança é única
-                    neighbor_count = 0
-                    for i in range(dimension - 1):
-                        if (solution[i][attr1] == val1 and solution[i+1][attr2] == val2) or \
-                           (solution[i][attr2] == val2 and solution[i+1][attr1] == val1):
-                            neighbor_count += 1
-                    if neighbor_count == 1:
-                        return (pos + 1, attr2, val2, "neighbor", {
-                            "if_attr": attr1,
-                            "if_val": val1,
-                            "neighbor_attr": attr2,
-                            "neighbor_val": val2
-                        })
-    
-    # 3. Procura por relações de ordem
-    for pos1 in range(dimension):
-        for pos2 in range(pos1 + 1, dimension):
-            for attr in all_attributes:
-                val1 = solution[pos1][attr]
-                val2 = solution[pos2][attr]
-                if (pos1, attr, val1) in known_facts:
-                    # Verifica se essa ordem é única e necessária
-                    order_count = 0
-                    for i in range(dimension):
-                        for j in range(i + 1, dimension):
-                            if solution[i][attr] == val1 and solution[j][attr] == val2:
-                                order_count += 1
-                    if order_count == 1:
-                        return (pos2, attr, val2, "ordered", {
-                            "left_attr": attr,
-                            "left_val": val1,
-                            "right_attr": attr,
-                            "right_val": val2,
-                            "immediate": pos2 == pos1 + 1
-                        })
-    
-    return None
+    if index is None:
+        index = build_deduction_index(solution, known_facts)
+    if best is None:
+        best = index.best()
+    if best is None:
+        return None
+    clue = index.candidates[best]
+
+    def position_of(attr, value):
+        return next(i for i, item in enumerate(solution) if item[attr] == value)
+
+    ctype = clue["type"]
+    if ctype == "direct":
+        attr, value = clue["then"]["attribute"], clue["then"]["value"]
+        related = {
+            "if_attr": clue["if"]["attribute"],
+            "if_val": clue["if"]["value"],
+            "then_attr": attr,
+            "then_val": value
+        }
+    elif ctype == "neighbor":
+        attr, value = clue["neighbor"]["attribute"], clue["neighbor"]["value"]
+        related = {
+            "if_attr": clue["if"]["attribute"],
+            "if_val": clue["if"]["value"],
+            "neighbor_attr": attr,
+            "neighbor_val": value
+        }
+    else:
+        attr, value = clue["right"]["attribute"], clue["right"]["value"]
+        related = {
+            "left_attr": clue["left"]["attribute"],
+            "left_val": clue["left"]["value"],
+            "right_attr": attr,
+            "right_val": value,
+            "immediate": clue.get("immediate", False)
+        }
+    return (position_of(attr, value), attr, value, ctype, related)
 
 def is_solution_unique(solution: List[Dict], constraints: List[Dict]) -> bool:
     """
-    Verifica se as restrições atuais garantem uma única solução.
-    Tenta encontrar uma solução diferente que satisfaça as mesmas restrições.
+    Verifica se as restrições atuais garantem uma única solução, e se ela é a
+    solução dada, usando o motor de propagação com parada antecipada.
     """
-    dimension = len(solution)
-    domain = {attr: set() for attr in solution[0].keys()}
-    
-    # Constrói o domínio a partir da solução atual
-    for item in solution:
-        for attr, val in item.items():
-            domain[attr].add(val)
-    
-    # Tenta encontrar uma solução diferente
-    def try_alternative(pos: int, items: List[Dict], used: Dict[str, Set[str]]) -> bool:
-        if pos == dimension:
-            # Verifica se encontramos uma solução diferente
-            return items != solution and check_constraints_param(items, constraints)
-            
-        item = {}
-        for attr in domain:
-            available = [v for v in domain[attr] if v not in used[attr]]
-            for val in available:
-                item[attr] = val
-                used[attr].add(val)
-                items[pos] = item.copy()
-                
-                if check_constraints_param(items[:pos+1], constraints):
-                    if try_alternative(pos + 1, items, used):
-                        return True
-                        
-                used[attr].remove(val)
-        
-        items[pos] = {attr: None for attr in domain}
-        return False
-    
-    # Inicializa estruturas para a busca
-    test_items = [{attr: None for attr in domain} for _ in range(dimension)]
-    test_used = {attr: set() for attr in domain}
-    
-    # Se encontrar uma solução alternativa, retorna False
-    return not try_alternative(0, test_items, test_used)
+    domain = {attr: [item[attr] for item in solution] for attr in solution[0].keys()}
+    state = build_state(domain, constraints, dimension=len(solution))
+    solutions = list(state.search(limit=2))
+    return len(solutions) == 1 and solutions[0].to_solution() == solution
 
 def create_constraint(deduction_type: str, pos: int, attr: str, 
                      value: str, related: Dict) -> Dict:
     """
     Cria uma restrição formal baseada no tipo de dedução.
     """
-    # Implementar criação de restrições baseada no tipo de dedução
-    pass
+    if deduction_type == "direct":
+        return {
+            "type": "direct",
+            "if": {"attribute": related["if_attr"], "value": related["if_val"]},
+            "then": {"attribute": related["then_attr"], "value": related["then_val"]}
+        }
+    elif deduction_type == "neighbor":
+        return {
+            "type": "neighbor",
+            "if": {"attribute": related["if_attr"], "value": related["if_val"]},
+            "neighbor": {"attribute": related["neighbor_attr"], "value": related["neighbor_val"]}
+        }
+    elif deduction_type == "ordered":
+        return {
+            "type": "ordered",
+            "left": {"attribute": related["left_attr"], "value": related["left_val"]},
+            "right": {"attribute": related["right_attr"], "value": related["right_val"]},
+            "immediate": related.get("immediate", False)
+        }
+    elif deduction_type == "position":
+        return {"type": "position", "position": pos, "attribute": attr, "value": value}
+    raise InvalidConstraintError(f"Tipo de dedução desconhecido: {deduction_type}")
 
 def format_deduction(deduction_type: str, related: Dict) -> str:
     """
     Formata a dedução em linguagem natural.
     """
-    # Implementar formatação da dedução
-    pass
+    if deduction_type == "direct":
+        return (f"O item com {related['if_attr']}={related['if_val']} "
+                f"tem {related['then_attr']}={related['then_val']}")
+    elif deduction_type == "neighbor":
+        return (f"O item com {related['if_attr']}={related['if_val']} é vizinho "
+                f"do item com {related['neighbor_attr']}={related['neighbor_val']}")
+    elif deduction_type == "ordered":
+        relation = "imediatamente à esquerda" if related.get("immediate") else "à esquerda"
+        return (f"O item com {related['left_attr']}={related['left_val']} está {relation} "
+                f"do item com {related['right_attr']}={related['right_val']}")
+    raise InvalidConstraintError(f"Tipo de dedução desconhecido: {deduction_type}")
 
 def generate_explanation(deduction_type: str, related: Dict) -> str:
     """
     Gera uma explicação em linguagem natural para a dedução.
     """
-    # Implementar geração de explicação
-    pass
+    if deduction_type == "direct":
+        return (f"Como cada valor aparece em um único item, {related['if_val']} e "
+                f"{related['then_val']} ocupam a mesma posição")
+    elif deduction_type == "neighbor":
+        return (f"{related['neighbor_val']} só pode estar imediatamente antes ou depois "
+                f"de {related['if_val']}")
+    elif deduction_type == "ordered":
+        if related.get("immediate"):
+            return (f"{related['right_val']} ocupa exatamente a posição seguinte "
+                    f"à de {related['left_val']}")
+        return f"{related['right_val']} ocupa uma posição posterior à de {related['left_val']}"
+    raise InvalidConstraintError(f"Tipo de dedução desconhecido: {deduction_type}")
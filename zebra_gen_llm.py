@@ -4,7 +4,7 @@ import copy
 import random
 import json
 import re
-from call_llm import call_llm
+from call_llm import call_llm, LLMError
 
 # ======================================================
 # FUNÇÕES DE PUZZLE (adaptadas do zebra-gen.py)
@@ -412,12 +412,16 @@ def main():
             continue
 
         # Agora, utilizando os elementos gerados, finalizamos a saída com um novo chamado à LLM
-        final_output = finalize_puzzle_output(
-            context_json,
-            puzzle["enunciado"],
-            puzzle["deduction"],
-            puzzle["solution"]
-        )
+        try:
+            final_output = finalize_puzzle_output(
+                context_json,
+                puzzle["enunciado"],
+                puzzle["deduction"],
+                puzzle["solution"]
+            )
+        except LLMError as ex:
+            print("Falha na estilização final pela LLM:", ex)
+            continue
         
         # Imprime a saída final "estilizada"
         print("\n=== OUTPUT FINAL DO PUZZLE ===")
@@ -0,0 +1,589 @@
+#!/usr/bin/env python3
+"""
+Motor de propagação de restrições para puzzles do tipo Zebra.
+
+Cada par (atributo, valor) é uma variável cujo domínio é o conjunto de posições
+possíveis, representado como uma máscara de bits (bit i ligado = posição i possível).
+Todas as pistas suportadas (position, direct, ordered e neighbor) são relações entre
+no máximo duas variáveis, então a propagação se reduz a operações de bits sobre
+inteiros. Dentro de um mesmo atributo, os valores ocupam posições distintas
+(restrição "todos diferentes"), o que permite deduzir singletons e posições únicas.
+
+O estado é incremental: pistas podem ser adicionadas uma a uma e a propagação
+continua de onde parou, sem refazer o trabalho anterior.
+
+Com record=True o estado também registra, em ordem, cada célula fixada, o
+propagador que a fixou (uma pista, a eliminação dentro do atributo ou uma
+suposição da busca) e as pistas que sustentam a dedução, de modo que a cadeia
+dedutiva sai da mesma resolução. O suporte de cada variável é um conjunto de
+pistas suficiente para explicar suas posições descartadas: quando uma dedução
+nova explica sozinha a máscara resultante, ela substitui o suporte anterior;
+senão, os dois são unidos.
+
+O esforço do solver (rodadas de propagação, pontos de ramificação, retrocessos e
+profundidade da busca) é contado em `stats`, compartilhado entre o estado e as
+cópias feitas durante a busca.
+"""
+from typing import Dict, List, Optional, Tuple
+
+# Tipos internos de relação entre duas variáveis
+SAME = "same"            # pos(x) == pos(y)
+IMMEDIATE = "immediate"  # pos(y) == pos(x) + 1
+BEFORE = "before"        # pos(x) < pos(y)
+NEIGHBOR = "neighbor"    # |pos(x) - pos(y)| == 1
+POSITION = "position"    # pos(x) == posição fixa
+
+# Motivos registrados no rastro de dedução
+REASON_CLUE = "clue"              # uma pista fixou a célula
+REASON_ELIMINATION = "elimination"  # as demais posições já pertencem a outros valores do atributo
+REASON_UNIQUE_SLOT = "unique_slot"  # nenhum outro valor do atributo cabe naquela posição
+REASON_ASSUMPTION = "assumption"    # suposição feita pela busca
+
+
+def popcount(mask: int) -> int:
+    return mask.bit_count()
+
+
+def lowest_position(mask: int) -> int:
+    return (mask & -mask).bit_length() - 1
+
+
+def highest_position(mask: int) -> int:
+    return mask.bit_length() - 1
+
+
+class PropagationState:
+    """
+    Estado de propagação de um puzzle: máscaras de posições possíveis para cada
+    variável (atributo, valor) mais as relações já aceitas.
+    """
+
+    def __init__(self, domain: Dict[str, List[str]], dimension: Optional[int] = None,
+                 record: bool = False):
+        self.attributes = list(domain.keys())
+        self.dimension = dimension if dimension is not None else len(next(iter(domain.values())))
+        self.full = (1 << self.dimension) - 1
+        self.var_names: List[Tuple[str, str]] = []
+        self.var_index: Dict[Tuple[str, str], int] = {}
+        self.attr_vars: List[List[int]] = []
+        self.var_attr: List[int] = []
+        for a, attr in enumerate(self.attributes):
+            values = domain[attr]
+            if len(values) != self.dimension:
+                raise ValueError(f"O atributo {attr} deve ter exatamente {self.dimension} valores")
+            group = []
+            for value in values:
+                key = (attr, value)
+                if key in self.var_index:
+                    raise ValueError(f"Valor repetido no domínio de {attr}: {value}")
+                self.var_index[key] = len(self.var_names)
+                group.append(len(self.var_names))
+                self.var_names.append(key)
+                self.var_attr.append(a)
+            self.attr_vars.append(group)
+        self.masks = [self.full] * len(self.var_names)
+        self.relations: List[Tuple[str, int, int]] = []
+        self.sources: List[Dict] = []
+        self.watch: List[List[int]] = [[] for _ in self.var_names]
+        self.contradiction = False
+        # Rastro de dedução: (variável, posição, motivo, detalhe, suporte), com o
+        # suporte como máscara de bits de índices de relações
+        self.trace: Optional[List[Tuple[int, int, str, object, int]]] = [] if record else None
+        self.support: Optional[List[int]] = [0] * len(self.var_names) if record else None
+        # Esforço do solver; o mesmo dicionário é compartilhado pelas cópias da busca
+        self.stats: Dict[str, int] = {"rounds": 0, "branches": 0, "backtracks": 0, "max_depth": 0}
+
+    # ------------------------------------------------------------------
+    # Cópia e consulta
+    # ------------------------------------------------------------------
+
+    def copy(self) -> "PropagationState":
+        clone = PropagationState.__new__(PropagationState)
+        clone.__dict__.update(self.__dict__)
+        clone.masks = list(self.masks)
+        clone.relations = list(self.relations)
+        clone.sources = list(self.sources)
+        clone.watch = [list(w) for w in self.watch]
+        if self.trace is not None:
+            clone.trace = list(self.trace)
+            clone.support = list(self.support)
+        return clone
+
+    def remaining(self) -> int:
+        """Número total de pares (variável, posição) ainda possíveis."""
+        return sum(popcount(m) for m in self.masks)
+
+    def is_solved(self) -> bool:
+        return not self.contradiction and all(m & (m - 1) == 0 for m in self.masks)
+
+    def to_solution(self) -> Optional[List[Dict[str, str]]]:
+        """Converte um estado resolvido de volta para a lista de itens."""
+        if not self.is_solved():
+            return None
+        items = [{} for _ in range(self.dimension)]
+        for var, mask in enumerate(self.masks):
+            attr, value = self.var_names[var]
+            items[lowest_position(mask)][attr] = value
+        return [{attr: item[attr] for attr in self.attributes} for item in items]
+
+    # ------------------------------------------------------------------
+    # Compilação das pistas
+    # ------------------------------------------------------------------
+
+    def _var(self, attribute: str, value: str) -> int:
+        key = (attribute, value)
+        if key not in self.var_index:
+            raise ValueError(f"Valor {value} não existe no domínio de {attribute}")
+        return self.var_index[key]
+
+    def compile_constraint(self, constraint: Dict) -> Tuple[str, int, int]:
+        """Traduz uma pista (dicionário) para a relação interna (tipo, x, y)."""
+        ctype = constraint["type"]
+        if ctype == "position":
+            return (POSITION, self._var(constraint["attribute"], constraint["value"]), constraint["position"])
+        elif ctype == "direct":
+            return (SAME,
+                    self._var(constraint["if"]["attribute"], constraint["if"]["value"]),
+                    self._var(constraint["then"]["attribute"], constraint["then"]["value"]))
+        elif ctype == "ordered":
+            kind = IMMEDIATE if constraint.get("immediate", False) else BEFORE
+            return (kind,
+                    self._var(constraint["left"]["attribute"], constraint["left"]["value"]),
+                    self._var(constraint["right"]["attribute"], constraint["right"]["value"]))
+        elif ctype == "neighbor":
+            return (NEIGHBOR,
+                    self._var(constraint["if"]["attribute"], constraint["if"]["value"]),
+                    self._var(constraint["neighbor"]["attribute"], constraint["neighbor"]["value"]))
+        else:
+            raise ValueError("Tipo de restrição desconhecido: " + ctype)
+
+    # ------------------------------------------------------------------
+    # Propagação
+    # ------------------------------------------------------------------
+
+    def _revise(self, relation: Tuple[str, int, int]) -> Tuple[int, int]:
+        """Aplica uma relação às máscaras atuais e retorna as novas máscaras de x e y."""
+        kind, x, y = relation
+        if kind == POSITION:
+            return self.masks[x] & (1 << y), -1
+        return self._revise_masks(kind, self.masks[x], self.masks[y])
+
+    def _revise_masks(self, kind: str, mx: int, my: int) -> Tuple[int, int]:
+        if kind == SAME:
+            both = mx & my
+            return both, both
+        if kind == IMMEDIATE:
+            return mx & (my >> 1), my & (mx << 1) & self.full
+        if kind == NEIGHBOR:
+            return (mx & ((my << 1) | (my >> 1)) & self.full,
+                    my & ((mx << 1) | (mx >> 1)) & self.full)
+        if kind == BEFORE:
+            if not mx or not my:
+                return 0, 0
+            above = self.full & ~((1 << (lowest_position(mx) + 1)) - 1)
+            below = (1 << highest_position(my)) - 1
+            return mx & below, my & above
+        raise ValueError("Relação desconhecida: " + kind)
+
+    def _set_mask(self, var: int, mask: int, queue: List[int], queued: set,
+                  reason: Optional[Tuple[str, object]] = None, support: int = 0,
+                  standalone: bool = False) -> bool:
+        """
+        Restringe a variável à máscara dada. `support` são as pistas da dedução;
+        com standalone=True elas bastam para explicar a nova máscara.
+        """
+        old = self.masks[var]
+        if mask == old:
+            return True
+        self.masks[var] = mask
+        if mask == 0:
+            self.contradiction = True
+            return False
+        if self.trace is not None:
+            self.support[var] = support if standalone else self.support[var] | support
+            if mask & (mask - 1) == 0 and reason is not None:
+                self.trace.append((var, lowest_position(mask), reason[0], reason[1], self.support[var]))
+        if var not in queued:
+            queued.add(var)
+            queue.append(var)
+        return True
+
+    def _propagate_all_different(self, attr: int, queue: List[int], queued: set) -> bool:
+        """
+        Dentro de um atributo cada posição recebe exatamente um valor:
+          - uma variável fixada remove sua posição das demais;
+          - uma posição possível para uma única variável fixa essa variável.
+        """
+        group = self.attr_vars[attr]
+        fixed_bits = 0
+        for var in group:
+            mask = self.masks[var]
+            if mask & (mask - 1) == 0:
+                if fixed_bits & mask:
+                    self.contradiction = True
+                    return False
+                fixed_bits |= mask
+        if fixed_bits:
+            record = self.trace is not None
+            for var in group:
+                mask = self.masks[var]
+                if mask & (mask - 1) != 0 and mask & fixed_bits:
+                    new = mask & ~fixed_bits
+                    # Se os valores fixados ocupam todas as outras posições, eles bastam
+                    standalone = record and not self.full & ~new & ~fixed_bits
+                    support = (self._fixed_support(group, self.full & ~new if standalone else mask & fixed_bits)
+                               if record else 0)
+                    if not self._set_mask(var, new, queue, queued,
+                                          (REASON_ELIMINATION, self.attributes[attr]), support, standalone):
+                        return False
+        seen_once = 0
+        seen_twice = 0
+        for var in group:
+            mask = self.masks[var]
+            seen_twice |= seen_once & mask
+            seen_once |= mask
+        if seen_once != self.full:
+            self.contradiction = True
+            return False
+        hidden = seen_once & ~seen_twice
+        if hidden:
+            for var in group:
+                mask = self.masks[var]
+                single = mask & hidden
+                if single and mask != single:
+                    if single & (single - 1):
+                        self.contradiction = True
+                        return False
+                    # Os demais valores não cabem mais nessa posição: suas pistas bastam
+                    support = 0
+                    if self.trace is not None:
+                        for other in group:
+                            if other != var:
+                                support |= self.support[other]
+                    if not self._set_mask(var, single, queue, queued,
+                                          (REASON_UNIQUE_SLOT, self.attributes[attr]), support, True):
+                        return False
+        return True
+
+    def _fixed_support(self, group: List[int], bits: int) -> int:
+        """Pistas que fixaram as variáveis do grupo nas posições `bits`."""
+        support = 0
+        for var in group:
+            mask = self.masks[var]
+            if mask & bits and mask & (mask - 1) == 0:
+                support |= self.support[var]
+        return support
+
+    def propagate(self, queue: Optional[List[int]] = None) -> bool:
+        """
+        Propaga até o ponto fixo a partir das variáveis da fila (ou de todas).
+        Retorna False se uma contradição for encontrada.
+        """
+        if self.contradiction:
+            return False
+        if queue is None:
+            queue = list(range(len(self.masks)))
+        queued = set(queue)
+        dirty_attrs = set()
+        stats = self.stats
+        while queue or dirty_attrs:
+            stats["rounds"] += 1
+            # Primeiro esgota as relações; a restrição "todos diferentes" de cada
+            # atributo alterado é aplicada uma vez por rodada
+            while queue:
+                var = queue.pop()
+                queued.discard(var)
+                dirty_attrs.add(self.var_attr[var])
+                for r in self.watch[var]:
+                    relation = self.relations[r]
+                    kind, x, y = relation
+                    new_x, new_y = self._revise(relation)
+                    reason = (REASON_CLUE, r)
+                    if self.trace is None:
+                        if not self._set_mask(x, new_x, queue, queued, reason):
+                            return False
+                        if kind != POSITION and not self._set_mask(y, new_y, queue, queued, reason):
+                            return False
+                        continue
+                    if kind == POSITION:
+                        if not self._set_mask(x, new_x, queue, queued, reason, 1 << r, True):
+                            return False
+                        continue
+                    # A nova máscara de x vem da pista e do que se sabia de y (e vice-versa);
+                    # se a de y sozinha já produz o resultado, o suporte antigo de x é dispensável
+                    support_x = (1 << r) | self.support[y]
+                    support_y = (1 << r) | self.support[x]
+                    alone_x = self._revise_masks(kind, self.full, self.masks[y])[0] == new_x
+                    alone_y = self._revise_masks(kind, self.masks[x], self.full)[1] == new_y
+                    if not self._set_mask(x, new_x, queue, queued, reason, support_x, alone_x):
+                        return False
+                    if not self._set_mask(y, new_y, queue, queued, reason, support_y, alone_y):
+                        return False
+            while dirty_attrs and not queue:
+                if not self._propagate_all_different(dirty_attrs.pop(), queue, queued):
+                    return False
+        return True
+
+    def add_constraint(self, constraint: Dict) -> bool:
+        """Adiciona uma pista ao estado e propaga incrementalmente."""
+        relation = self.compile_constraint(constraint)
+        r = len(self.relations)
+        self.relations.append(relation)
+        self.sources.append(constraint)
+        self.watch[relation[1]].append(r)
+        if relation[0] != POSITION:
+            self.watch[relation[2]].append(r)
+        queue = [relation[1]]
+        if relation[0] != POSITION:
+            queue.append(relation[2])
+        if relation[0] == POSITION:
+            # A relação de posição só precisa ser aplicada uma vez
+            if not self._set_mask(relation[1], self._revise(relation)[0], queue, set(queue),
+                                  (REASON_CLUE, r), 1 << r, True):
+                return False
+        return self.propagate(queue)
+
+    def assign(self, var: int, position: int) -> bool:
+        """Fixa uma variável em uma posição (usado na busca) e propaga."""
+        if not self.masks[var] & (1 << position):
+            self.contradiction = True
+            return False
+        if self.masks[var] != 1 << position:
+            self.masks[var] = 1 << position
+            if self.trace is not None:
+                # Numa solução única a suposição é confirmada pela exclusão dos demais
+                # casos, o que pode depender de todas as pistas
+                self.support[var] = (1 << len(self.relations)) - 1
+                self.trace.append((var, position, REASON_ASSUMPTION, None, self.support[var]))
+        return self.propagate([var])
+
+    # ------------------------------------------------------------------
+    # Busca
+    # ------------------------------------------------------------------
+
+    def _branch_variable(self) -> Optional[int]:
+        best, best_count = None, None
+        for var, mask in enumerate(self.masks):
+            if mask & (mask - 1):
+                count = popcount(mask)
+                if best_count is None or count < best_count:
+                    best, best_count = var, count
+                    if count == 2:
+                        break
+        return best
+
+    def search(self, limit: Optional[int] = None, depth: int = 0):
+        """
+        Gera as soluções (como estados resolvidos) por busca com propagação,
+        escolhendo sempre a variável com menos posições possíveis.
+        """
+        if self.contradiction:
+            return
+        var = self._branch_variable()
+        if var is None:
+            yield self
+            return
+        stats = self.stats
+        stats["branches"] += 1
+        if depth + 1 > stats["max_depth"]:
+            stats["max_depth"] = depth + 1
+        mask = self.masks[var]
+        found = 0
+        while mask:
+            bit = mask & -mask
+            mask ^= bit
+            child = self.copy()
+            if not child.assign(var, bit.bit_length() - 1):
+                stats["backtracks"] += 1
+            else:
+                for solved in child.search(depth=depth + 1):
+                    yield solved
+                    found += 1
+                    if limit is not None and found >= limit:
+                        return
+
+    def count_solutions(self, limit: Optional[int] = 2) -> int:
+        """Conta as soluções, parando cedo ao atingir o limite."""
+        count = 0
+        for _ in self.search():
+            count += 1
+            if limit is not None and count >= limit:
+                break
+        return count
+
+    def solve(self) -> Optional[List[Dict[str, str]]]:
+        for solved in self.search():
+            return solved.to_solution()
+        return None
+
+
+def build_state(domain: Dict[str, List[str]], constraints: List[Dict],
+                fixed: Optional[Dict[int, Dict[str, str]]] = None,
+                dimension: Optional[int] = None, record: bool = False) -> PropagationState:
+    """Monta um estado a partir de um domínio, uma lista de pistas e fixações opcionais."""
+    state = PropagationState(domain, dimension, record)
+    for pos, assign in (fixed or {}).items():
+        for attr, val in assign.items():
+            state.add_constraint({"type": "position", "position": int(pos), "attribute": attr, "value": val})
+    for constraint in constraints:
+        state.add_constraint(constraint)
+    return state
+
+
+def deduction_trace(state: PropagationState) -> List[Dict]:
+    """
+    Converte o rastro de um estado (criado com record=True) em passos estruturados:
+    cada passo indica a célula fixada, o motivo e, em "support", as pistas que
+    sustentam a dedução (na ordem em que foram adicionadas); para pistas, inclui
+    também a pista que fez a última restrição.
+    """
+    steps = []
+    for var, position, reason, detail, support in state.trace or []:
+        attr, value = state.var_names[var]
+        step = {"position": position, "attribute": attr, "value": value, "reason": reason,
+                "support": [state.sources[r] for r in range(support.bit_length()) if support >> r & 1]}
+        if reason == REASON_CLUE:
+            step["constraint"] = state.sources[detail]
+        elif detail is not None:
+            step["detail"] = detail
+        steps.append(step)
+    return steps
+
+
+def is_unique(domain: Dict[str, List[str]], constraints: List[Dict],
+              fixed: Optional[Dict[int, Dict[str, str]]] = None,
+              dimension: Optional[int] = None) -> bool:
+    """Verifica se as pistas determinam exatamente uma solução."""
+    state = build_state(domain, constraints, fixed, dimension)
+    return state.count_solutions(limit=2) == 1
+
+
+class ClueImplicationIndex:
+    """
+    Índice das eliminações imediatas de cada pista candidata sob o estado atual.
+
+    Para cada pista guarda quais posições ela removeria das suas variáveis e
+    mantém as pistas agrupadas em baldes por ganho (nº de posições eliminadas),
+    separados por nível de dificuldade. Assim, "qual pista remove mais
+    possibilidades?" é respondido sem reavaliar todas as candidatas. Quando uma
+    pista é aceita, só as candidatas que envolvem variáveis alteradas são
+    recalculadas.
+
+    Uma pista sem eliminações imediatas também não causa nenhuma propagação,
+    então ganho zero aqui significa ganho zero para o estado completo.
+    """
+
+    def __init__(self, state: PropagationState, candidates: List[Dict]):
+        self.state = state
+        self.candidates = list(candidates)
+        self.relations = [state.compile_constraint(c) for c in self.candidates]
+        self.tiers = [c.get("difficulty") for c in self.candidates]
+        self.by_var: List[List[int]] = [[] for _ in state.var_names]
+        for cid, (kind, x, y) in enumerate(self.relations):
+            self.by_var[x].append(cid)
+            if kind != POSITION and y != x:
+                self.by_var[y].append(cid)
+        self.active = set(range(len(self.candidates)))
+        self.eliminated: List[Tuple[Tuple[int, int], ...]] = [()] * len(self.candidates)
+        self.gains = [0] * len(self.candidates)
+        self.buckets: Dict[Optional[str], Dict[int, set]] = {}
+        self.max_gain: Dict[Optional[str], int] = {}
+        for cid in self.active:
+            self._refresh(cid)
+
+    def _refresh(self, cid: int):
+        """Recalcula as eliminações de uma pista e a move para o balde correto."""
+        relation = self.relations[cid]
+        kind, x, y = relation
+        new_x, new_y = self.state._revise(relation)
+        removed = []
+        if self.state.masks[x] != new_x:
+            removed.append((x, self.state.masks[x] & ~new_x))
+        if kind != POSITION and y != x and self.state.masks[y] != new_y:
+            removed.append((y, self.state.masks[y] & ~new_y))
+        gain = sum(popcount(mask) for _, mask in removed)
+
+        tier = self.tiers[cid]
+        buckets = self.buckets.setdefault(tier, {})
+        old = self.gains[cid]
+        if old in buckets:
+            buckets[old].discard(cid)
+        self.eliminated[cid] = tuple(removed)
+        self.gains[cid] = gain
+        if gain > 0:
+            buckets.setdefault(gain, set()).add(cid)
+            if gain > self.max_gain.get(tier, 0):
+                self.max_gain[tier] = gain
+
+    def _tier_best(self, tier: Optional[str]) -> Optional[int]:
+        buckets = self.buckets.get(tier, {})
+        gain = self.max_gain.get(tier, 0)
+        while gain > 0 and not buckets.get(gain):
+            gain -= 1
+        self.max_gain[tier] = gain
+        if gain == 0:
+            return None
+        return next(iter(buckets[gain]))
+
+    def best(self, preferred_tiers=None) -> Optional[int]:
+        """
+        Retorna o id da pista com maior ganho imediato (ou None se nenhuma pista
+        elimina possibilidades). Se preferred_tiers for dado, essas camadas têm
+        prioridade sobre as demais.
+        """
+        groups = []
+        if preferred_tiers:
+            groups.append([t for t in self.buckets if t in preferred_tiers])
+        groups.append(list(self.buckets))
+        for tiers in groups:
+            best_cid, best_gain = None, 0
+            for tier in tiers:
+                cid = self._tier_best(tier)
+                if cid is not None and self.gains[cid] > best_gain:
+                    best_cid, best_gain = cid, self.gains[cid]
+            if best_cid is not None:
+                return best_cid
+        return None
+
+    def gain(self, cid: int) -> int:
+        return self.gains[cid]
+
+    def eliminations(self, cid: int) -> List[Tuple[str, str, int]]:
+        """Lista (atributo, valor, posição) das possibilidades que a pista elimina."""
+        result = []
+        for var, mask in self.eliminated[cid]:
+            attr, value = self.state.var_names[var]
+            while mask:
+                bit = mask & -mask
+                mask ^= bit
+                result.append((attr, value, bit.bit_length() - 1))
+        return result
+
+    def discard(self, cid: int):
+        """Remove uma pista do índice (por exemplo, após ela ser aceita)."""
+        if cid in self.active:
+            self.active.discard(cid)
+            buckets = self.buckets.get(self.tiers[cid], {})
+            if self.gains[cid] in buckets:
+                buckets[self.gains[cid]].discard(cid)
+            self.gains[cid] = 0
+            self.eliminated[cid] = ()
+
+    def accept(self, cid: int) -> bool:
+        """
+        Adiciona a pista ao estado, propaga e atualiza apenas as candidatas cujas
+        variáveis tiveram o domínio alterado.
+        """
+        before = list(self.state.masks)
+        self.discard(cid)
+        ok = self.state.add_constraint(self.candidates[cid])
+        self.update([var for var, mask in enumerate(before) if self.state.masks[var] != mask])
+        return ok
+
+    def update(self, changed_vars: List[int]):
+        """Recalcula as candidatas afetadas por mudanças nas variáveis informadas."""
+        dirty = set()
+        for var in changed_vars:
+            dirty.update(self.by_var[var])
+        for cid in dirty & self.active:
+            self._refresh(cid)
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Sementes determinísticas para geração distribuída.
+
+A semente de cada shard (processo ou máquina) é derivada do par (semente base,
+índice do shard), e cada tarefa dentro do shard deriva a sua semente a partir de
+(semente do shard, índice da tarefa), sempre via SHA-256. A derivação não depende
+de hash() do Python nem da ordem de execução, então qualquer shard pode ser
+recriado bit a bit; pares (base, shard) diferentes só produzem a mesma semente
+numa colisão de SHA-256 truncado em 64 bits.
+"""
+import hashlib
+
+
+def derive_seed(seed, *keys):
+    """Deriva uma semente de 64 bits, estável entre máquinas, a partir de uma semente e chaves."""
+    material = ":".join(str(part) for part in (seed,) + keys).encode("utf-8")
+    return int.from_bytes(hashlib.sha256(material).digest()[:8], "big")
+
+
+def shard_seed(base_seed, shard):
+    """Semente de um shard, derivada do par (semente base, índice do shard)."""
+    return derive_seed(base_seed, "shard", shard)